@@ -0,0 +1,488 @@
+#Latenz-Vergleich gegen eine lokale Mock-Börse (BingX + Firebase), kein Zugriff auf echte APIs.
+#
+#   python benchmark.py --delay 0.08 --runs 20
+#
+#Jeder Aufruf an die Mock-Börse wartet "delay" Sekunden (simulierte Netzwerklatenz).
+#Der Ticker-Stream (WebSocket) spielt aufgezeichnete Ticks ab, z.B. --ticks ticks.jsonl mit Zeilen wie
+#   {"dataType": "BTC-USDT@lastPrice", "data": {"c": "60000.5"}}
+#Telegram läuft gegen einen lokalen Stand-in (TELEGRAM_API_URL), der die Nachrichten mitschreibt.
+
+import argparse
+import base64
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import socketserver
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+# Latenzvergleich ohne Rate-Limit (die Mock-Börse lehnt nichts ab); muss vor dem Import stehen,
+# weil main den RateLimiter von bingx_client beim Laden aus BINGX_LIMITS baut
+os.environ["BINGX_LIMITS"] = ""
+
+import main
+
+
+class MockExchange:
+    # Zustand der Mock-Börse: Positionsgrössen und Hebel pro Seite
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.positionen = {"LONG": 0.01, "SHORT": 0.01}
+            self.hebel = {"LONG": 1, "SHORT": 1}
+            self.user_sockets = []    # verbundene User-Data-Streams (listenKey)
+            self.offene_orders = {}   # orderId → Limit-/Stop-Order
+            self.client_ids = {}      # clientOrderID → Order
+            self.naechste_id = 1
+            self.verlorene_antworten = 0   # so viele Order-Antworten gehen verloren (Order wird trotzdem ausgeführt)
+
+    def sende_user_event(self, ereignis):
+        frame = ws_frame(gzip.compress(json.dumps(ereignis).encode()))
+        for sock in list(self.user_sockets):
+            try:
+                sock.sendall(frame)
+            except OSError:
+                self.user_sockets.remove(sock)
+
+    def order(self, params):
+        menge = float(params.get("quantity", 0))
+        with self.lock:
+            order_id = self.naechste_id
+            self.naechste_id += 1
+            if params.get("clientOrderID"):
+                self.client_ids[params["clientOrderID"]] = {"orderId": order_id, "clientOrderId": params["clientOrderID"],
+                                                            "type": params.get("type"), "executedQty": str(menge), "status": "FILLED"}
+        seite = params.get("positionSide", "LONG")
+        oeffnen = (params.get("side") == "BUY") == (seite == "LONG")
+        if params.get("type") == "MARKET":
+            with self.lock:
+                self.positionen[seite] = max(self.positionen[seite] + (menge if oeffnen else -menge), 0)
+                neu = self.positionen[seite]
+            self.sende_user_event({"e": "ORDER_TRADE_UPDATE", "o": {"s": params.get("symbol"), "x": "TRADE", "X": "FILLED", "ps": seite}})
+            self.sende_user_event({"e": "ACCOUNT_UPDATE", "a": {"m": "ORDER", "B": [{"a": "USDT", "wb": "1000"}],
+                                                                "P": [{"s": params.get("symbol"), "ps": seite, "pa": str(neu), "ep": "60000"}]}})
+        else:
+            with self.lock:
+                self.offene_orders[order_id] = {"orderId": order_id, "symbol": params.get("symbol"), "side": params.get("side"),
+                                                "positionSide": seite, "type": params.get("type"), "origQty": str(menge)}
+            self.sende_user_event({"e": "ORDER_TRADE_UPDATE", "o": {"s": params.get("symbol"), "x": "NEW", "X": "NEW", "ps": seite}})
+        return {"code": 0, "data": {"order": {"orderId": order_id, "executedQty": str(menge), "status": "FILLED"}}}
+
+    def loeschen(self, order_ids):
+        with self.lock:
+            geloescht = [self.offene_orders.pop(int(order_id), None) for order_id in order_ids]
+        for order in geloescht:
+            if order:
+                self.sende_user_event({"e": "ORDER_TRADE_UPDATE", "o": {"s": order["symbol"], "x": "CANCELED", "X": "CANCELED", "ps": order["positionSide"]}})
+        return {
+            "success": [{"orderId": order["orderId"], "status": "CANCELLED"} for order in geloescht if order],
+            "failed": [{"orderId": int(order_id), "errorCode": 80018, "errorMessage": "order not exist"}
+                       for order_id, order in zip(order_ids, geloescht) if not order],
+        }
+
+    def order_antwort(self, client_order_id):
+        with self.lock:
+            order = self.client_ids.get(client_order_id)
+        if order is None:
+            return {"code": 109414, "msg": "order not exist"}
+        return {"code": 0, "data": {"order": order}}
+
+    def offene_orders_antwort(self):
+        with self.lock:
+            return {"code": 0, "data": {"orders": list(self.offene_orders.values())}}
+
+    def positionen_antwort(self):
+        with self.lock:
+            return {"code": 0, "data": [
+                {"symbol": "BTC-USDT", "positionSide": seite, "positionAmt": str(menge), "avgPrice": "60000",
+                 "liquidationPrice": "40000" if seite == "LONG" else "90000"}
+                for seite, menge in self.positionen.items()
+            ]}
+
+
+mock_exchange = MockExchange()
+
+
+class MockExchangeHandler(BaseHTTPRequestHandler):
+    delay = 0.05
+
+    def _antwort(self, body):
+        url = urlparse(self.path)
+        pfad = url.path
+        params = dict(parse_qsl(url.query))
+        if isinstance(body, dict):
+            params.update(body)
+        if pfad.endswith("/user/balance"):
+            return {"code": 0, "data": {"balance": {"balance": "1000", "availableMargin": "1000", "usedMargin": "0"}}}
+        if pfad.endswith("/user/positions"):
+            return mock_exchange.positionen_antwort()
+        if pfad.endswith("/trade/openOrders"):
+            return mock_exchange.offene_orders_antwort()
+        if pfad.endswith("/user/auth/userDataStream"):
+            return {"listenKey": "mock-listen-key"}
+        if pfad.endswith("/quote/contracts"):
+            return {"code": 0, "data": [{"symbol": "BTC-USDT", "pricePrecision": 1, "quantityPrecision": 6,
+                                         "tradeMinQuantity": 0.000001, "tradeMinUSDT": 0.5}]}
+        if pfad.endswith("/quote/price"):
+            return {"code": 0, "data": {"price": "60000"}}
+        if pfad.endswith("/trade/order"):
+            if self.command == "POST":
+                return mock_exchange.order(params)
+            if self.command == "GET":
+                return mock_exchange.order_antwort(params.get("clientOrderId"))
+            mock_exchange.loeschen([params.get("orderId")])
+            return {"code": 0, "data": {"order": {"orderId": params.get("orderId"), "status": "CANCELLED"}}}
+        if pfad.endswith("/trade/batchOrders") and self.command == "POST":
+            orders = []
+            for order in json.loads(params.get("batchOrders", "[]")):
+                orders.append(dict(mock_exchange.order(order)["data"]["order"], type=order.get("type"), status="NEW"))
+            return {"code": 0, "data": {"orders": orders}}
+        if pfad.endswith("/trade/batchOrders") and self.command == "DELETE":
+            return {"code": 0, "data": mock_exchange.loeschen(json.loads(params.get("orderIdList", "[]")))}
+        if pfad.endswith("/trade/leverage"):
+            if self.command == "POST":
+                mock_exchange.hebel[params.get("side", "LONG")] = int(params.get("leverage", 1))
+            return {"code": 0, "data": {"longLeverage": mock_exchange.hebel["LONG"], "shortLeverage": mock_exchange.hebel["SHORT"]}}
+        if pfad.startswith("/MA/"):
+            return 0
+        if pfad.startswith("/kaufpreise/"):
+            return {"-a": {"price": 60000, "usdt_amount": 10}, "-b": {"price": 59000, "usdt_amount": 14}}
+        return None
+
+    def _senden(self):
+        time.sleep(self.delay)
+        laenge = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(laenge) or b"null") if laenge else None
+        antwort = json.dumps(self._antwort(body)).encode()
+        status = 200
+        if self.command == "POST" and urlparse(self.path).path.endswith("/trade/order"):
+            with mock_exchange.lock:
+                if mock_exchange.verlorene_antworten > 0:
+                    mock_exchange.verlorene_antworten -= 1
+                    antwort, status = b'{"error": "gateway timeout"}', 504
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(antwort)))
+        self.end_headers()
+        self.wfile.write(antwort)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _senden
+
+    def log_message(self, *args):
+        pass
+
+
+def starte_mock_exchange(delay):
+    MockExchangeHandler.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockExchangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    main.BASE_URL = url
+    main.FIREBASE_URL = url
+    main.markt_daten.url = ""   # ohne starte_ticker_stream() kommen Preise und Konto-Daten per REST von der Mock-Börse
+    main.USER_WS_URL = ""
+    return server
+
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def ws_frame(payload, opcode=0x2):
+    # Server → Client: unmaskiert, ein Frame pro Nachricht
+    kopf = bytes([0x80 | opcode])
+    n = len(payload)
+    if n < 126:
+        kopf += bytes([n])
+    elif n < 65536:
+        kopf += bytes([126]) + n.to_bytes(2, "big")
+    else:
+        kopf += bytes([127]) + n.to_bytes(8, "big")
+    return kopf + payload
+
+
+def lese_ws_frame(sock):
+    # Client → Server (maskiert); None bei Verbindungsende oder Close-Frame
+    kopf = sock.recv(2)
+    if len(kopf) < 2 or kopf[0] & 0x0F == 0x8:
+        return None
+    n = kopf[1] & 0x7F
+    if n == 126:
+        n = int.from_bytes(sock.recv(2), "big")
+    elif n == 127:
+        n = int.from_bytes(sock.recv(8), "big")
+    maske = sock.recv(4)
+    daten = b""
+    while len(daten) < n:
+        teil = sock.recv(n - len(daten))
+        if not teil:
+            return None
+        daten += teil
+    return bytes(b ^ maske[i % 4] for i, b in enumerate(daten))
+
+
+class MockTickerStream(socketserver.BaseRequestHandler):
+    # Stand-in für wss://open-api-swap.bingx.com/swap-market: spielt ticks in Schleife ab (gzip wie BingX).
+    # Mit ?listenKey=... ist es der User-Data-Stream: Ereignisse kommen von MockExchange.order().
+    ticks = []
+    intervall = 0.01
+
+    def handle(self):
+        anfrage = self.request.recv(4096).decode()
+        key = next(z.split(":", 1)[1].strip() for z in anfrage.split("\r\n") if z.lower().startswith("sec-websocket-key"))
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.request.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+
+        if "listenKey=" in anfrage.split("\r\n", 1)[0]:
+            mock_exchange.user_sockets.append(self.request)
+            while lese_ws_frame(self.request) is not None:
+                pass
+            return
+
+        offen = threading.Event()
+        offen.set()
+
+        def lesen():
+            # Abos und Pongs lesen, damit der Puffer nicht vollläuft
+            while lese_ws_frame(self.request) is not None:
+                pass
+            offen.clear()
+
+        threading.Thread(target=lesen, daemon=True).start()
+        i = 0
+        while offen.is_set() and self.ticks:
+            try:
+                self.request.sendall(ws_frame(gzip.compress(json.dumps(self.ticks[i % len(self.ticks)]).encode())))
+            except OSError:
+                break
+            i += 1
+            time.sleep(self.intervall)
+
+
+def erzeuge_ticks(symbol="BTC-USDT", anzahl=100):
+    ticks = []
+    for i in range(anzahl):
+        preis = 60000 + (i % 20) * 0.5
+        ticks.append({"code": 0, "dataType": f"{symbol}@lastPrice", "data": {"e": "lastPriceUpdate", "s": symbol, "c": str(preis)}})
+    return ticks
+
+
+def starte_ticker_stream(ticks=None, intervall=0.01):
+    MockTickerStream.ticks = ticks or erzeuge_ticks()
+    MockTickerStream.intervall = intervall
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), MockTickerStream)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    main.markt_daten.url = f"ws://127.0.0.1:{server.server_address[1]}"
+    main.USER_WS_URL = main.markt_daten.url
+    return server
+
+
+class MockTelegram(BaseHTTPRequestHandler):
+    # Stand-in für api.telegram.org: schreibt (Zeit, Chat, Text) mit; die ersten Antworten aus "ablehnen" (z.B. 429)
+    delay = 0.05
+    eingang = []
+    ablehnen = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        time.sleep(self.delay)
+        with self.lock:
+            status = self.ablehnen.pop(0) if self.ablehnen else 200
+            if status == 200:
+                self.eingang.append((time.monotonic(), body["chat_id"], body["text"]))
+        antwort = {"ok": status == 200}
+        if status == 429:
+            antwort["parameters"] = {"retry_after": 0.3}
+        daten = json.dumps(antwort).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(daten)))
+        self.end_headers()
+        self.wfile.write(daten)
+
+    def log_message(self, *args):
+        pass
+
+
+def starte_telegram(delay):
+    MockTelegram.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockTelegram)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    main.TELEGRAM_API_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    main.TELEGRAM_TOKEN = "bench-token"
+    main.TELEGRAM_CHAT_ID = "bench-chat"
+    return server
+
+
+def lese_sequentiell(api_key, secret_key, symbol):
+    # bisheriger Ablauf: ein Aufruf nach dem anderen
+    main.firebase_cache.leeren()   # wie ein kalter Prozess: MA kommt jedes Mal aus Firebase
+    return {
+        "position": main.get_current_position(api_key, secret_key, symbol, "LONG"),
+        "balance": main.get_futures_balance(api_key, secret_key),
+        "open_orders": main.get_open_orders(api_key, secret_key, symbol),
+        "ma": main.firebase_lese_ma_wert("1", "secret"),
+        "kaufsummen": main.firebase_lese_kaufsummen("Bench_Bot", "secret"),
+    }
+
+
+def lese_parallel(api_key, secret_key, symbol):
+    main.firebase_cache.leeren()
+    return main.lade_parallel(
+        position=(main.get_current_position, (api_key, secret_key, symbol, "LONG")),
+        balance=(main.get_futures_balance, (api_key, secret_key)),
+        open_orders=(main.get_open_orders, (api_key, secret_key, symbol)),
+        ma=(main.firebase_lese_ma_wert, ("1", "secret")),
+        kaufsummen=(main.firebase_lese_kaufsummen, ("Bench_Bot", "secret")),
+    )
+
+
+def messe(name, funktion, runs):
+    dauer = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        funktion()
+        dauer.append((time.perf_counter() - start) * 1000)
+    print(f"{name:<28} median {statistics.median(dauer):8.2f} ms   max {max(dauer):8.2f} ms")
+    return statistics.median(dauer)
+
+
+def benchmark_preis(runs):
+    if main.websocket is None:
+        print("--- Preis für Ordergrösse: übersprungen (websocket-client nicht installiert) ---")
+        return
+    print(f"--- Preis für Ordergrösse, {runs} Läufe ---")
+    rest = messe("REST (get_current_price)", lambda: main.get_current_price("BTC-USDT"), runs)
+    main.markt_daten.abonnieren("BTC-USDT")
+    ende = time.monotonic() + 5
+    while main.markt_daten.stream_preis("BTC-USDT") is None and time.monotonic() < ende:
+        time.sleep(0.01)
+    ws = messe("WebSocket-Cache (markt_daten)", lambda: main.markt_daten.preis("BTC-USDT"), runs)
+    print(f"Faktor: {rest / ws:.0f}x   (Cache-Treffer {main.zaehler.stand('marktpreis_abfragen', quelle='stream')}, "
+          f"REST-Fallbacks {main.zaehler.stand('marktpreis_abfragen', quelle='rest')})")
+
+
+def benchmark_order_wiederholung(runs):
+    # jede zweite Market-Order: Order wird ausgeführt, die Antwort geht aber verloren (HTTP 504)
+    print(f"--- Market-Order mit verlorener Antwort, {runs} Orders ---")
+    main.ORDER_BACKOFF = 0.02
+    for name, mit_id in (("ohne clientOrderID", False), ("mit clientOrderID", True)):
+        mock_exchange.reset()
+        fehler = 0
+        for i in range(runs):
+            mock_exchange.verlorene_antworten = i % 2
+            client_id = main.client_order_id("Bench_Bot", i, "bench") if mit_id else None
+            antwort = main.place_market_order("bench-key", "bench-secret", "BTC-USDT", 10, "LONG", client_id)
+            if antwort.get("code") != 0:
+                fehler += 1
+        ausgefuehrt = mock_exchange.naechste_id - 1
+        print(f"{name:<28} bestätigt {runs - fehler}/{runs}, ausgeführt {ausgefuehrt}, doppelt {ausgefuehrt - runs}")
+
+
+def benchmark_telegram(bots, meldungen, fenster=0.3, rate=5):
+    # ein fehlschlagendes Signal meldet sich mehrmals hintereinander: bots × meldungen Aufrufe von sende_telegram_nachricht
+    print(f"--- Telegram: {bots} Bots mit je {meldungen} Meldungen, Fenster {fenster}s, {rate}/s ---")
+    bisher = bots * meldungen * MockTelegram.delay * 1000
+    print(f"{'bisher (synchron, je Meldung)':<28} {bisher:8.2f} ms Blockierung, {bots * meldungen} Nachrichten")
+
+    main.telegram_versand = main.TelegramVersand(fenster=fenster, rate=rate)
+    MockTelegram.eingang.clear()
+    MockTelegram.ablehnen[:] = [429]
+    beginn = time.monotonic()
+    start = time.perf_counter()
+    for i in range(meldungen):
+        for b in range(bots):
+            main.sende_telegram_nachricht(f"Bench_Bot{b}", f"Meldung {i}")
+    blockiert = (time.perf_counter() - start) * 1000
+    ende = time.monotonic() + 10
+    while len(MockTelegram.eingang) < bots and time.monotonic() < ende:
+        time.sleep(0.01)
+    main.telegram_versand.stop()
+
+    eingang = list(MockTelegram.eingang)
+    abstaende = [b[0] - a[0] for a, b in zip(eingang, eingang[1:])]
+    vollstaendig = all(text.count("Meldung") == meldungen for _, _, text in eingang)
+    print(f"{'Warteschlange (gebündelt)':<28} {blockiert:8.2f} ms Blockierung, {len(eingang)} Nachrichten, "
+          f"alle Meldungen enthalten: {vollstaendig}")
+    if abstaende:
+        print(f"kleinster Abstand im Chat {min(abstaende) * 1000:.0f} ms (Grenze {1000 / rate:.0f} ms), "
+              f"erste Nachricht nach {(eingang[0][0] - beginn) * 1000:.0f} ms (Fenster + 429 mit retry_after 0.3s)")
+    assert len(eingang) == bots and vollstaendig
+    assert min(abstaende, default=1 / rate) >= 1 / rate * 0.9
+
+
+def benchmark_lesepfad(runs):
+    args = ("bench-key", "bench-secret", "BTC-USDT")
+    print(f"--- Lese-Aufrufe pro Signal (Position, Balance, Open Orders, MA, Kaufsummen), {runs} Läufe ---")
+    seq = messe("sequentiell", lambda: lese_sequentiell(*args), runs)
+    par = messe("parallel (lade_parallel)", lambda: lese_parallel(*args), runs)
+    print(f"Faktor: {seq / par:.1f}x")
+
+
+def signiere_bisher(secret_key, params_dict):
+    # Stand vor BingXSigner: Secret bei jeder Order neu kodieren, Felder neu sortieren, HMAC neu aufsetzen
+    query_string = "&".join(f"{k}={params_dict[k]}" for k in sorted(params_dict))
+    params_dict["signature"] = hmac.new(secret_key.encode(), query_string.encode(), hashlib.sha256).hexdigest()
+    return params_dict
+
+
+def benchmark_signatur(anzahl):
+    # reine CPU-Zeit pro Order (ohne Netzwerk): Query-String bauen und signieren
+    secret_key = "bench-secret-" + "x" * 51
+    order = {"symbol": "BTC-USDT", "side": "SELL", "type": "LIMIT", "quantity": 0.0123, "price": 61234.5,
+             "timeInForce": "GTC", "positionSide": "LONG", "timestamp": 1700000000000}
+    assert signiere_bisher(secret_key, dict(order)) == main.signierer(secret_key).signiere(dict(order))
+    print(f"--- Signatur pro Order, {anzahl} Orders ---")
+    ergebnisse = {}
+    for name, funktion in (("bisher (sorted + hmac.new)", lambda: signiere_bisher(secret_key, dict(order))),
+                           ("BingXSigner (Kopie)", lambda: main.signierer(secret_key).signiere(dict(order)))):
+        start = time.perf_counter()
+        for _ in range(anzahl):
+            funktion()
+        ergebnisse[name] = (time.perf_counter() - start) / anzahl * 1e6
+        print(f"{name:<28} {ergebnisse[name]:8.2f} µs pro Order")
+    bisher, neu = ergebnisse.values()
+    print(f"Faktor: {bisher / neu:.1f}x   ({bisher - neu:.2f} µs weniger pro Order)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delay", type=float, default=0.05, help="simulierte Latenz pro Aufruf in Sekunden")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--signaturen", type=int, default=50000, help="Anzahl Orders für den Signatur-Vergleich")
+    parser.add_argument("--ticks", help="aufgezeichnete Ticks (JSON pro Zeile) für den Ticker-Stream")
+    args = parser.parse_args()
+
+    benchmark_signatur(args.signaturen)   # reine CPU-Zeit, braucht keine Mock-Börse
+    server = starte_mock_exchange(args.delay)
+    ticks = None
+    if args.ticks:
+        with open(args.ticks) as f:
+            ticks = [json.loads(zeile) for zeile in f if zeile.strip()]
+    stream = None
+    try:
+        benchmark_lesepfad(args.runs)   # ohne Streams: reine REST-/Firebase-Latenz
+        stream = starte_ticker_stream(ticks)
+        benchmark_preis(args.runs)
+        benchmark_order_wiederholung(args.runs)
+        telegram = starte_telegram(args.delay)
+        benchmark_telegram(bots=5, meldungen=4)
+        telegram.shutdown()
+    finally:
+        main.markt_daten.stop()
+        main.konten.stop()
+        if stream:
+            stream.shutdown()
+        server.shutdown()
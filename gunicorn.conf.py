@@ -0,0 +1,37 @@
+# Produktionsstart: gunicorn -c gunicorn.conf.py main:app
+import os
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Bot-Zustand, Job-Queue (ein Job pro Bot gleichzeitig) und Webhook-Duplikate liegen im Speicher des Prozesses.
+# Mehr als ein Worker nur, wenn jeder Bot immer beim selben Worker landet.
+workers = int(os.environ.get("WEB_WORKERS", "1"))
+worker_class = "gthread"
+# /webhook antwortet sofort mit 202 (die Arbeit machen WEBHOOK_WORKERS Threads der Job-Queue);
+# nur ?wait=1 hält einen HTTP-Thread bis zum Ende des Jobs
+threads = int(os.environ.get("WEB_THREADS", "16"))
+backlog = int(os.environ.get("WEB_BACKLOG", "2048"))   # Alarm-Spitzen in der Listen-Queue auffangen
+keepalive = int(os.environ.get("WEB_KEEPALIVE", "5"))
+timeout = int(os.environ.get("WEB_TIMEOUT", "120"))
+
+# Hintergrund-Threads (Firebase Write-Behind, WebSockets) überleben kein fork → App im Worker laden
+preload_app = False
+# Beim Herunterfahren laufen die eingereihten Webhooks noch bis JOB_DRAIN_TIMEOUT, danach der Rest
+graceful_timeout = int(float(os.environ.get("JOB_DRAIN_TIMEOUT", "25"))) + 10
+
+accesslog = os.environ.get("WEB_ACCESSLOG") or None
+errorlog = "-"
+
+
+def post_worker_init(worker):
+    import main
+    main.starten()
+
+
+def worker_exit(server, worker):
+    # gunicorn ruft den Hook teils auch im Master auf (kill_worker/ESRCH) → nur drainen, wo die App läuft
+    main = sys.modules.get("main")
+    if main is None or not main._betrieb["bereit"]:
+        return
+    main.herunterfahren()
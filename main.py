@@ -54,6 +54,8 @@
 #    "sl": 10, Stop Loss bei x Prozent setzen
 #    "ma": 1, bei StopLoss muss ma 1 sein. Ansonsten 0
 #    "beenden": "nein" wenn ja, wird keine neue Position nach dem Schliessen der aktuellen Position geöffnet
+#    "time": {{time}} optional, Balkenzeit; gleicher Alarm (vyn, botname, time, price) innerhalb WEBHOOK_DEDUP_TTL wird nur einmal ausgeführt,
+#            ohne "time" wird jeder Alarm ausgeführt
 #    }}
 
 
@@ -62,69 +64,1859 @@
 
 
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from datetime import datetime, timezone
+from dataclasses import dataclass, field, fields
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
+import asyncio
+import atexit
+import bisect
+import functools
+import gzip
+import json
+import random
+import re
+import sqlite3
+import threading
 import time
+import uuid
+import copy
+from urllib.parse import urlparse, quote
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
 import hmac
 import hashlib
 import requests
+from requests.adapters import HTTPAdapter
 import os
 
+try:
+    import websocket   # websocket-client, optional: ohne Paket werden Preise per REST abgefragt
+except ImportError:
+    websocket = None
+
 app = Flask(__name__)
 
 BASE_URL = "https://open-api.bingx.com"
+BINGX_POOL_SIZE = int(os.environ.get("BINGX_POOL_SIZE", "20"))     # max. Keep-Alive-Verbindungen zu BingX
+BINGX_TIMEOUT = float(os.environ.get("BINGX_TIMEOUT", "10"))       # Sekunden pro Aufruf
+WEBHOOK_WORKERS = int(os.environ.get("WEBHOOK_WORKERS", "8"))     # parallel verarbeitete Bots
+JOB_HISTORY = int(os.environ.get("JOB_HISTORY", "1000"))            # so viele Job-Ergebnisse bleiben abrufbar
+JOB_DRAIN_TIMEOUT = float(os.environ.get("JOB_DRAIN_TIMEOUT", "25"))   # so lange laufen eingereihte Webhooks beim Herunterfahren noch
+PORT = int(os.environ.get("PORT", "5000"))
+# Preis-Stream für diese Symbole schon beim Start abonnieren, z.B. "BTC-USDT,ETH-USDT"
+VORLADEN_SYMBOLE = [s.strip() for s in os.environ.get("VORLADEN_SYMBOLE", "").split(",") if s.strip()]
+WEBHOOK_DEDUP_TTL = float(os.environ.get("WEBHOOK_DEDUP_TTL", "900"))   # Sekunden, in denen ein wiederholter Alarm als Duplikat gilt
+WEBHOOK_DEDUP_MAX = int(os.environ.get("WEBHOOK_DEDUP_MAX", "10000"))   # höchstens so viele Alarme im Index
+FILL_TIMEOUT = float(os.environ.get("FILL_TIMEOUT", "3"))           # Obergrenze Warten auf Ausführung der Market-Order
+LEVERAGE_TIMEOUT = float(os.environ.get("LEVERAGE_TIMEOUT", "1"))   # Obergrenze Warten auf übernommenen Hebel
+POLL_START_INTERVALL = 0.05                                         # erstes Abfrage-Intervall, wird jeweils verdoppelt
+POLL_MAX_INTERVALL = 0.4
 BALANCE_ENDPOINT = "/openApi/swap/v2/user/balance"
 ORDER_ENDPOINT = "/openApi/swap/v2/trade/order"
 PRICE_ENDPOINT = "/openApi/swap/v2/quote/price"
 OPEN_ORDERS_ENDPOINT = "/openApi/swap/v2/trade/openOrders"
+BATCH_ORDERS_ENDPOINT = "/openApi/swap/v2/trade/batchOrders"
+CONTRACTS_ENDPOINT = "/openApi/swap/v2/quote/contracts"
+KONTRAKT_REFRESH = float(os.environ.get("KONTRAKT_REFRESH", "3600"))   # Sekunden zwischen zwei Ladevorgängen der Kontraktdaten
+MARKT_WS_URL = os.environ.get("MARKT_WS_URL", "wss://open-api-swap.bingx.com/swap-market")   # leer = nur REST
+PREIS_MAX_ALTER = float(os.environ.get("PREIS_MAX_ALTER", "5"))       # älter → REST-Abfrage statt Cache
+USER_WS_URL = os.environ.get("USER_WS_URL", "wss://open-api-swap.bingx.com/swap-market")    # leer = Konto nur per REST
+USER_STREAM_ENDPOINT = "/openApi/user/auth/userDataStream"
+KONTO_MAX_ALTER = float(os.environ.get("KONTO_MAX_ALTER", "30"))      # Höchstalter Position/Balance/Open Orders aus dem Speicher
+KONTO_MAX = int(os.environ.get("KONTO_MAX", "50"))                    # so viele API-Keys bleiben mit Client/Stream im Speicher
+KONTO_LEERLAUF = float(os.environ.get("KONTO_LEERLAUF", "3600"))      # Sekunden ohne Aufruf, danach wird das Konto entfernt
+KONTO_POOL_SIZE = int(os.environ.get("KONTO_POOL_SIZE", "10"))        # Keep-Alive-Verbindungen pro API-Key
+KONTO_MAX_PARALLEL = int(os.environ.get("KONTO_MAX_PARALLEL", "8"))   # gleichzeitige BingX-Aufrufe pro API-Key
+# BingX-Aufrufe pro Sekunde und Konto je Endpunkt-Gruppe; gesamt = alle Gruppen eines Kontos zusammen (0 = ohne Limit)
+BINGX_LIMITS = os.environ.get("BINGX_LIMITS", "handel=10,abfrage=20,markt=20,gesamt=30")
+BINGX_LIMIT_PAUSE = float(os.environ.get("BINGX_LIMIT_PAUSE", "1"))              # Pause nach 429 ohne Retry-After
+BINGX_LIMIT_WIEDERHOLUNGEN = int(os.environ.get("BINGX_LIMIT_WIEDERHOLUNGEN", "3"))   # Wiederholungen eines abgelehnten Aufrufs
+ORDER_WIEDERHOLUNGEN = int(os.environ.get("ORDER_WIEDERHOLUNGEN", "3"))   # Wiederholungen einer Order bei Timeout / 5xx
+ORDER_BACKOFF = float(os.environ.get("ORDER_BACKOFF", "0.2"))              # Basis des exponentiellen Backoffs in Sekunden
+ORDER_BACKOFF_MAX = float(os.environ.get("ORDER_BACKOFF_MAX", "2"))
 FIREBASE_URL = os.environ.get("FIREBASE_URL", "")
+STATE_DB = os.environ.get("STATE_DB", "bot_state.sqlite3")   # lokales Journal / Zustand; ":memory:" z.B. für Tests
+FIREBASE_FLUSH_INTERVALL = float(os.environ.get("FIREBASE_FLUSH_INTERVALL", "0.2"))  # Sammelfenster für Firebase-Schreibzugriffe
+# so lange (Sekunden) wartet ein Journal-Eintrag ohne bekanntes Secret, danach → firebase_abgelehnt
+FIREBASE_JOURNAL_TTL = float(os.environ.get("FIREBASE_JOURNAL_TTL", "86400"))
+# Gültigkeit der gecachten Firebase-Metadaten in Sekunden pro Knoten, z.B. "MA=60,ordergroesse=300"
+FIREBASE_CACHE_TTL = os.environ.get("FIREBASE_CACHE_TTL", "MA=60,ordergroesse=300,base_order_time=3600,aktueller_Bot=60")
+FIREBASE_CACHE_TTL_STANDARD = float(os.environ.get("FIREBASE_CACHE_TTL_STANDARD", "30"))
+
+LOG_STUFE = os.environ.get("LOG_STUFE", "info").lower()   # "debug": Rohdaten von BingX und alle Bot-Zustände in der Antwort
 
 TELEGRAM_TOKEN = os.environ.get("TELEGRAM_TOKEN", "")
 TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID", "")
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_FENSTER = float(os.environ.get("TELEGRAM_FENSTER", "2"))          # Sekunden, in denen Meldungen eines Bots gesammelt werden
+TELEGRAM_RATE = float(os.environ.get("TELEGRAM_RATE", "1"))                # Nachrichten pro Sekunde in den Chat
+TELEGRAM_WIEDERHOLUNGEN = int(os.environ.get("TELEGRAM_WIEDERHOLUNGEN", "3"))
+TELEGRAM_MAX_OFFEN = int(os.environ.get("TELEGRAM_MAX_OFFEN", "500"))      # darüber werden neue Meldungen verworfen
+
+
+
+def _lese_ttls(text):
+    ttls = {}
+    for teil in text.split(","):
+        if "=" in teil:
+            knoten, sekunden = teil.split("=", 1)
+            ttls[knoten.strip()] = float(sekunden)
+    return ttls
+
+
+### Protokoll
+# Die logs eines Webhook-Laufs gehen in jede Antwort. Ereignisse (append) stehen immer drin; Rohdaten von
+# BingX (debug) nur bei LOG_STUFE=debug, ?debug=1 bzw. "debug": true im Payload – und werden nur dann formatiert.
+
+class Protokoll(list):
+    def __init__(self, ausfuehrlich=None):
+        super().__init__()
+        self.ausfuehrlich = LOG_STUFE == "debug" if ausfuehrlich is None else ausfuehrlich
+
+    def debug(self, vorlage, *args):
+        if self.ausfuehrlich:
+            self.append(vorlage.format(*args) if args else vorlage)
+
+
+def log_debug(logs, vorlage, *args):
+    # für Hilfsfunktionen, die logs=None oder eine einfache Liste bekommen
+    if isinstance(logs, Protokoll):
+        logs.debug(vorlage, *args)
+    elif logs is not None and LOG_STUFE == "debug":
+        logs.append(vorlage.format(*args))
+
+
+### Zähler
+# Prozessweite Zähler mit Labels, z.B. zaehler.erhoehen("fallbacks", art="bingx_avg_price"); /metrics gibt sie aus.
+
+class Zaehler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._werte = {}   # (name, ((label, wert), ...)) → Zahl
+
+    def erhoehen(self, name, wert=1, **labels):
+        schluessel = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._werte[schluessel] = self._werte.get(schluessel, 0) + wert
+
+    def werte(self):
+        with self._lock:
+            return sorted(self._werte.items())
+
+    def stand(self, name, **labels):
+        schluessel = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            return self._werte.get(schluessel, 0)
+
+
+zaehler = Zaehler()
+
+
+### Latenz-Messung
+# stufe(name) misst die Dauer eines Blocks: jeder ausgehende Aufruf (bingx.<gruppe>, firebase.<methode>,
+# telegram), jede Wartezeit (bingx.limit, warten.*) und jede Stufe der DCA-Engine (stufe.<name>).
+# Die Dauer geht in die Histogramme (latenzen, prozessweit, zusätzlich nach ziel = Endpunkt bzw. Firebase-Knoten)
+# und in die Messung des laufenden Webhook-Jobs (thread-lokal; lade_parallel reicht sie an die Worker-Threads
+# weiter). Parallele Aufrufe werden summiert.
+
+LATENZ_GRENZEN_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatenzHistogramme:
+    def __init__(self, grenzen=LATENZ_GRENZEN_MS):
+        self.grenzen = grenzen
+        self._lock = threading.Lock()
+        self._daten = {}   # (name, ziel) → [Anzahl je Bucket (letzter = über der höchsten Grenze), Summe ms, Anzahl]
+
+    def erfassen(self, name, ms, ziel=""):
+        bucket = bisect.bisect_left(self.grenzen, ms)
+        with self._lock:
+            daten = self._daten.get((name, ziel))
+            if daten is None:
+                daten = self._daten[(name, ziel)] = [[0] * (len(self.grenzen) + 1), 0.0, 0]
+            daten[0][bucket] += 1
+            daten[1] += ms
+            daten[2] += 1
+
+    def statistik(self):
+        # kumulierte Buckets wie bei Prometheus: Anzahl Messungen <= Grenze
+        with self._lock:
+            kopie = {schluessel: (list(buckets), summe, anzahl) for schluessel, (buckets, summe, anzahl) in self._daten.items()}
+        ergebnis = {}
+        for schluessel, (buckets, summe, anzahl) in sorted(kopie.items()):
+            kumuliert, laufend = {}, 0
+            for grenze, wert in zip(self.grenzen + ("+Inf",), buckets):
+                laufend += wert
+                kumuliert[str(grenze)] = laufend
+            ergebnis[schluessel] = {"anzahl": anzahl, "summe_ms": round(summe, 3), "buckets": kumuliert}
+        return ergebnis
+
+
+class Messung:
+    # Zeiten eines Webhook-Jobs: name → [Summe ms, Anzahl]
+    __slots__ = ("start", "stufen", "_lock")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stufen = {}
+        self._lock = threading.Lock()
+
+    def erfassen(self, name, ms):
+        with self._lock:
+            eintrag = self.stufen.setdefault(name, [0.0, 0])
+            eintrag[0] += ms
+            eintrag[1] += 1
+
+    def als_dict(self):
+        with self._lock:
+            stufen = {name: {"ms": round(ms, 2), "anzahl": anzahl} for name, (ms, anzahl) in self.stufen.items()}
+        return {"gesamt_ms": round((time.perf_counter() - self.start) * 1000, 2), "stufen": stufen}
+
+
+latenzen = LatenzHistogramme()
+_messung = threading.local()
+
+
+def aktuelle_messung():
+    return getattr(_messung, "wert", None)
+
+
+def aktuelle_zeiten():
+    # Zwischenstand der laufenden Messung für die Webhook-Antwort
+    messung = aktuelle_messung()
+    return messung.als_dict() if messung is not None else None
+
+
+@contextmanager
+def messung_starten():
+    vorher = aktuelle_messung()
+    messung = _messung.wert = Messung()
+    try:
+        yield messung
+    finally:
+        _messung.wert = vorher
+
+
+@contextmanager
+def stufe(name, ziel=""):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        latenzen.erfassen(name, ms, ziel)
+        messung = aktuelle_messung()
+        if messung is not None:
+            messung.erfassen(name, ms)
+
+
+def mit_messung(messung, funktion):
+    # funktion in einem anderen Thread ausführen und dabei in die Messung des Aufrufers schreiben
+    @functools.wraps(funktion)
+    def aufruf(*args, **kwargs):
+        vorher = aktuelle_messung()
+        _messung.wert = messung
+        try:
+            return funktion(*args, **kwargs)
+        finally:
+            _messung.wert = vorher
+    return aufruf
+
+
+### BingX Rate-Limit
+# Vor jedem BingX-Aufruf wird pro Konto ein Token aus dem Bucket der Endpunkt-Gruppe und aus dem
+# Gesamt-Bucket genommen. Orders/Cancels/Hebel (Gruppe "handel") haben im Gesamt-Bucket Vorrang vor Abfragen.
+# Lehnt BingX einen Aufruf wegen Rate-Limit ab (HTTP 429 bzw. Code 100410), wird der Bucket der Gruppe
+# geleert und bis Retry-After gesperrt; der Aufruf wird danach wiederholt (hat BingX ihn doch nicht ausgeführt).
+# Bleibt es bei 429 (Wiederholungen aufgebraucht oder Retry-After über 3 s), wirft request() eine Exception.
+
+BINGX_LIMIT_CODE = re.compile(rb'^\s*\{\s*"code"\s*:\s*100410\b')
+
+
+def endpunkt_gruppe(method, url):
+    pfad = urlparse(url).path
+    if "/quote/" in pfad:
+        return "markt"
+    if "/trade/" in pfad and method != "GET":
+        return "handel"
+    return "abfrage"
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self.tokens = self.burst
+        self._stand = time.monotonic()
+        self._gesperrt_bis = 0.0
+        self._vorrang_wartend = 0
+        self._cond = threading.Condition()
+
+    def _auffuellen(self, jetzt):
+        self.tokens = min(self.burst, self.tokens + (jetzt - self._stand) * self.rate)
+        self._stand = jetzt
+
+    def nehmen(self, vorrang=False):
+        # blockiert, bis ein Token frei ist (Abfragen zusätzlich, solange eine Vorrang-Order wartet); Rückgabe: Wartezeit
+        start = time.monotonic()
+        with self._cond:
+            if vorrang:
+                self._vorrang_wartend += 1
+            try:
+                while True:
+                    jetzt = time.monotonic()
+                    self._auffuellen(jetzt)
+                    if jetzt >= self._gesperrt_bis and self.tokens >= 1 and (vorrang or not self._vorrang_wartend):
+                        self.tokens -= 1
+                        return jetzt - start
+                    self._cond.wait(max(self._gesperrt_bis - jetzt, (1 - self.tokens) / self.rate, 0.005))
+            finally:
+                if vorrang:
+                    self._vorrang_wartend -= 1
+                    self._cond.notify_all()
+
+    def sperren(self, sekunden):
+        with self._cond:
+            self._gesperrt_bis = max(self._gesperrt_bis, time.monotonic() + sekunden)
+            self.tokens = 0
+
+
+class RateLimiter:
+    def __init__(self, limits=None):
+        limits = _lese_ttls(BINGX_LIMITS) if limits is None else limits
+        self._gesamt = TokenBucket(limits["gesamt"]) if limits.get("gesamt") else None
+        self._gruppen = {gruppe: TokenBucket(rate) for gruppe, rate in limits.items() if gruppe != "gesamt" and rate > 0}
+        self.gewartet = 0          # Aufrufe, die auf ein Token warten mussten
+        self.wartezeit = 0.0       # Summe der Wartezeit in Sekunden
+        self.abgelehnt = 0         # Rate-Limit-Antworten von BingX
+
+    def nehmen(self, gruppe):
+        vorrang = gruppe == "handel"
+        wartezeit = 0.0
+        for bucket in (self._gruppen.get(gruppe), self._gesamt):
+            if bucket is not None:
+                wartezeit += bucket.nehmen(vorrang)
+        if wartezeit > 0.001:
+            self.gewartet += 1
+            self.wartezeit += wartezeit
+            zaehler.erhoehen("bingx_limit_gewartet", gruppe=gruppe)
+
+    def abgelehnt_von_bingx(self, gruppe, sekunden):
+        self.abgelehnt += 1
+        zaehler.erhoehen("bingx_limit_abgelehnt", gruppe=gruppe)
+        bucket = self._gruppen.get(gruppe) or self._gesamt
+        if bucket is not None:
+            bucket.sperren(sekunden)
+
+
+def limit_pause(response):
+    # Sekunden Pause, wenn BingX den Aufruf wegen Rate-Limit abgelehnt hat, sonst None
+    if response.status_code == 429:
+        try:
+            return float(response.headers.get("Retry-After", BINGX_LIMIT_PAUSE))
+        except ValueError:
+            return BINGX_LIMIT_PAUSE
+    if response.status_code == 200 and BINGX_LIMIT_CODE.match(response.content[:64]):
+        return BINGX_LIMIT_PAUSE
+    return None
+
+
+class BingXClient:
+    """
+    HTTP-Client für BingX-Aufrufe (öffentliche Marktdaten gemeinsam, sonst einer pro API-Key, siehe KontoRegistry).
+    Eine requests.Session mit Connection-Pool hält die TCP/TLS-Verbindungen offen (Keep-Alive),
+    damit nicht jeder Aufruf einen neuen Handshake zu open-api.bingx.com braucht.
+    max_parallel begrenzt die gleichzeitigen Aufrufe, damit ein Konto mit vielen Signalen die anderen nicht ausbremst;
+    limiter hält die Rate-Limits von BingX ein.
+    """
+
+    def __init__(self, pool_size=BINGX_POOL_SIZE, timeout=BINGX_TIMEOUT, max_parallel=None, limiter=None):
+        self.timeout = timeout
+        self.limiter = limiter
+        self._budget = threading.BoundedSemaphore(max_parallel) if max_parallel else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Connection": "keep-alive"})
+
+    def _senden(self, method, url, timeout, gruppe, **kwargs):
+        # Timeout pro Aufruf überschreibbar, sonst Standard des Clients
+        if self._budget is None:
+            with stufe(f"bingx.{gruppe}", urlparse(url).path):
+                return self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+        with self._budget, stufe(f"bingx.{gruppe}", urlparse(url).path):
+            return self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+
+    def request(self, method, url, timeout=None, **kwargs):
+        gruppe = endpunkt_gruppe(method, url)
+        if self.limiter is None:
+            response = self._senden(method, url, timeout, gruppe, **kwargs)
+        else:
+            for versuch in range(BINGX_LIMIT_WIEDERHOLUNGEN + 1):
+                with stufe("bingx.limit"):
+                    self.limiter.nehmen(gruppe)
+                response = self._senden(method, url, timeout, gruppe, **kwargs)
+                pause = limit_pause(response)
+                if pause is None:
+                    break
+                self.limiter.abgelehnt_von_bingx(gruppe, pause)
+                # länger warten lohnt nicht: der Zeitstempel der Signatur wäre danach abgelaufen
+                if pause > 3:
+                    break
+        if response.status_code == 429:
+            # die Aufrufer erwarten JSON mit "data" – die 429-Antwort nicht als Ergebnis durchreichen
+            raise Exception(f"BingX Rate-Limit: {method} {urlparse(url).path} abgelehnt ({gruppe}), "
+                            f"Retry-After {response.headers.get('Retry-After', '-')}")
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+bingx_client = BingXClient(limiter=RateLimiter())  # öffentliche Endpunkte (Kontrakte, Preise); signierte Aufrufe über konten.client(api_key)
+
+# Thread-Pool für parallele Lese-Aufrufe (gleiche Grösse wie der Connection-Pool)
+io_executor = ThreadPoolExecutor(max_workers=BINGX_POOL_SIZE, thread_name_prefix="io")
+
+
+async def _lade_parallel_async(aufrufe):
+    loop = asyncio.get_running_loop()
+    namen = list(aufrufe)
+    messung = aktuelle_messung()
+    ergebnisse = await asyncio.gather(
+        *(loop.run_in_executor(io_executor, functools.partial(mit_messung(messung, funktion), *args))
+          for funktion, args in aufrufe.values()),
+        return_exceptions=True
+    )
+    return dict(zip(namen, ergebnisse))
+
+
+def lade_parallel(**aufrufe):
+    """
+    Führt voneinander unabhängige Lese-Aufrufe (Balance, Position, Open Orders, Firebase ...) gleichzeitig aus.
+    aufrufe: name=(funktion, (args...))
+    Rückgabe: {name: ergebnis}. Exceptions werden als Wert zurückgegeben und erst
+    in ergebnis_oder_fehler() geworfen, damit jeder Aufrufer sie wie bisher selbst behandelt.
+    Die Dauer entspricht dem langsamsten Aufruf statt der Summe aller Aufrufe.
+    """
+    if not aufrufe:
+        return {}
+    return asyncio.run(_lade_parallel_async(aufrufe))
+
+
+def ergebnis_oder_fehler(wert):
+    if isinstance(wert, BaseException):
+        raise wert
+    return wert
+
+
+### Handelsseiten
+# LONG und SHORT laufen durch dieselbe DCA-Logik (DcaLauf); was sich je Seite unterscheidet, steht hier.
+
+@dataclass(frozen=True, slots=True)
+class Seite:
+    name: str                                  # positionSide
+    oeffnen: str                               # Market-Order zum Eröffnen / Nachkaufen
+    schliessen: str                            # TP, SL und Close
+    richtung: int                              # +1: TP über, SL unter dem Einstieg; -1: umgekehrt
+    pseudo_liquidation: float | None = None    # Faktor auf avgPrice, wenn es bei Hebel 1 keinen Liquidationspreis gibt
+    tp_ohne_prozent: float | None = None       # TP-Faktor auf den Durchschnittspreis, wenn sell_percentage fehlt
+    avg_bei_zeitablauf: bool = False           # nach after_h / after_so den avgPrice von BingX als Basis nehmen
+    tp_sl_pflicht: bool = False                # HTTP 500, wenn TP oder SL nicht gesetzt werden konnte
+
+    def tp_preis(self, durchschnittspreis, sell_percentage):
+        if durchschnittspreis and sell_percentage:
+            return round(float(durchschnittspreis) * (1 + self.richtung * float(sell_percentage) / 100), 6)
+        if durchschnittspreis and sell_percentage is None and self.tp_ohne_prozent:
+            return round(float(durchschnittspreis) * self.tp_ohne_prozent, 6)
+        return 0
+
+    def sl_preis(self, liquidation_price, sl):
+        # sl Prozent vor dem Liquidationspreis (LONG darüber, SHORT darunter)
+        return round(liquidation_price * (1 + self.richtung * sl / 100), 6)
+
+    def avg_fallback(self, avg_price):
+        # Durchschnittspreis von BingX, falls Firebase fehlt: -0.2% (LONG) bzw. +0.2% (SHORT)
+        return round(avg_price * (1 - self.richtung * 0.002), 6)
+
+    def ist_schutz_order(self, order):
+        # bestehende TP- (LIMIT) oder SL-Order (STOP_MARKET) dieser Seite
+        return (order.get("positionSide") == self.name and order.get("side") == self.schliessen
+                and order.get("type") in ("LIMIT", "STOP_MARKET"))
+
+
+SEITEN = {
+    # LONG 1x: kein Liquidationspreis bei BingX → 70% des avgPrice
+    "LONG": Seite("LONG", "BUY", "SELL", 1, pseudo_liquidation=0.70, avg_bei_zeitablauf=True),
+    "SHORT": Seite("SHORT", "SELL", "BUY", -1, tp_ohne_prozent=0.99, tp_sl_pflicht=True),
+}
+
+
+### Bot-Zustand im RAM
+# Ersetzt die früheren globalen Dicts (saved_usdt_amounts, status_fuer_alle, alarm_counter, base_order_times,
+# aktueller_Bot, ma_Wert, recovery_trade, recovery_pending). Jeder Bot bzw. jede bot_nr hat einen eigenen
+# Datensatz mit eigenem Lock; alle Lese-Ändere-Schreibe-Operationen laufen atomar unter diesem Lock.
+# Jede Änderung wird zusätzlich als Snapshot des Datensatzes in STATE_DB geschrieben und beim Start wieder
+# geladen, damit nach einem Redeploy nicht jeder Bot zuerst auf die Firebase-Fallbacks läuft.
+
+@dataclass(slots=True)
+class BotRecord:
+    # Zustand pro botname
+    saved_usdt_amount: float | None = None
+    status: str | None = None                     # "OK" / "Fehler"
+    alarm_counter: int | None = None
+    base_order_time: datetime | None = None
+    # laufende Summen über alle Käufe des aktuellen Zyklus; kauf_anzahl None = unbekannt (z.B. nach Neustart)
+    kauf_summe_wert: float = 0.0                   # Σ price * usdt_amount
+    kauf_summe_menge: float = 0.0                  # Σ usdt_amount
+    kauf_anzahl: int | None = None
+    zyklus: str | None = None                      # zufällige Kennung des DCA-Zyklus, Teil jeder clientOrderID
+
+
+@dataclass(slots=True)
+class BotNrRecord:
+    # Zustand pro bot_nr (Chart)
+    aktueller_bot: str | None = None
+    ma_wert: int | None = None
+    recovery_pending: bool = False
+    recovery_trade: set = field(default_factory=set)   # Seiten ("LONG"/"SHORT"), die als Recovery-Trade laufen
+
+
+def _record_als_json(record):
+    daten = {}
+    for f in fields(record):
+        wert = getattr(record, f.name)
+        if isinstance(wert, datetime):
+            wert = wert.isoformat()
+        elif isinstance(wert, set):
+            wert = sorted(wert)
+        daten[f.name] = wert
+    return json.dumps(daten)
+
+
+def _record_aus_json(klasse, text):
+    daten = json.loads(text)
+    record = klasse()
+    for f in fields(record):
+        if f.name not in daten:
+            continue   # Feld neuer als der Snapshot → Standardwert
+        wert = daten[f.name]
+        if f.name == "base_order_time" and wert:
+            wert = datetime.fromisoformat(wert)
+        elif f.name == "recovery_trade":
+            wert = set(wert or [])
+        setattr(record, f.name, wert)
+    return record
+
+
+def _nr_key(bot_nr):
+    # bot_nr kommt je nach Alarm als "1" oder 1 → einheitlich als int ablegen
+    try:
+        return int(bot_nr)
+    except (TypeError, ValueError):
+        return bot_nr
+
+
+class BotState:
+    def __init__(self, db_pfad=STATE_DB):
+        self._lock = threading.Lock()   # schützt nur die Zuordnung Schlüssel → Datensatz/Lock
+        self._bots = {}
+        self._nrs = {}
+        self._locks = {}
+        self._db = None
+        self._db_lock = threading.Lock()
+        self.aus_snapshot = set()       # ("bot", botname) / ("nr", bot_nr), die noch nicht mit Firebase abgeglichen sind
+        if db_pfad:
+            self._db = sqlite3.connect(db_pfad, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS bot_snapshot (art TEXT NOT NULL, schluessel TEXT NOT NULL, daten TEXT NOT NULL, PRIMARY KEY (art, schluessel))")
+            self._laden()
+
+    def _laden(self):
+        start = time.perf_counter()
+        for art, schluessel, daten in self._db.execute("SELECT art, schluessel, daten FROM bot_snapshot"):
+            try:
+                if art == "bot":
+                    self._bots[schluessel] = _record_aus_json(BotRecord, daten)
+                else:
+                    schluessel = _nr_key(json.loads(schluessel))
+                    self._nrs[schluessel] = _record_aus_json(BotNrRecord, daten)
+                self.aus_snapshot.add((art, schluessel))
+            except Exception as e:
+                print(f"Bot-Zustand: Snapshot-Eintrag {art}/{schluessel} ignoriert: {e}")
+        if self.aus_snapshot:
+            print(f"Bot-Zustand: {len(self._bots)} Bots und {len(self._nrs)} bot_nr aus {STATE_DB} geladen "
+                  f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+    def _speichern(self, art, schluessel, record):
+        if self._db is None:
+            return
+        if art == "nr":
+            schluessel = json.dumps(schluessel)
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO bot_snapshot (art, schluessel, daten) VALUES (?, ?, ?)",
+                (art, schluessel, _record_als_json(record))
+            )
+
+    @contextmanager
+    def _aendern_bot(self, botname):
+        # Datensatz unter seinem Lock ändern und danach in den Snapshot schreiben (nicht bei Exception)
+        record, lock = self._bot(botname)
+        with lock:
+            yield record
+            self._speichern("bot", botname, record)
+
+    @contextmanager
+    def _aendern_nr(self, bot_nr):
+        record, lock = self._nr(bot_nr)
+        with lock:
+            yield record
+            self._speichern("nr", _nr_key(bot_nr), record)
+
+    def nimm_aus_snapshot(self, art, schluessel):
+        # True genau einmal pro Eintrag, der aus dem Snapshot stammt und noch nicht abgeglichen wurde
+        with self._lock:
+            if (art, schluessel) in self.aus_snapshot:
+                self.aus_snapshot.discard((art, schluessel))
+                return True
+            return False
+
+    def hole_felder(self, art, schluessel, felder):
+        record, lock = self._bot(schluessel) if art == "bot" else self._nr(schluessel)
+        with lock:
+            return tuple(getattr(record, f) for f in felder)
+
+    def abgleichen(self, art, schluessel, felder, erwartet, neu):
+        """
+        Werte aus Firebase übernehmen, aber nur wenn die Felder seit dem Lesen nicht lokal geändert wurden
+        (compare-and-set). felder/erwartet/neu sind Tupel gleicher Länge. True, wenn übernommen.
+        """
+        kontext = self._aendern_bot(schluessel) if art == "bot" else self._aendern_nr(schluessel)
+        with kontext as record:
+            if tuple(getattr(record, f) for f in felder) != erwartet:
+                return False
+            for f, wert in zip(felder, neu):
+                setattr(record, f, wert)
+            return True
+
+    def _eintrag(self, tabelle, key, fabrik):
+        with self._lock:
+            record = tabelle.get(key)
+            if record is None:
+                record = tabelle[key] = fabrik()
+            lock = self._locks.get((id(tabelle), key))
+            if lock is None:
+                lock = self._locks[(id(tabelle), key)] = threading.RLock()
+            return record, lock
+
+    def _bot(self, botname):
+        return self._eintrag(self._bots, botname, BotRecord)
+
+    def _nr(self, bot_nr):
+        return self._eintrag(self._nrs, _nr_key(bot_nr), BotNrRecord)
+
+    # --- pro botname ---
+    def hole_usdt(self, botname):
+        record, lock = self._bot(botname)
+        with lock:
+            return record.saved_usdt_amount
+
+    def setze_usdt(self, botname, betrag):
+        with self._aendern_bot(botname) as record:
+            record.saved_usdt_amount = betrag
+
+    def loesche_usdt(self, botname):
+        # True, wenn ein Wert vorhanden war
+        with self._aendern_bot(botname) as record:
+            vorhanden = record.saved_usdt_amount is not None
+            record.saved_usdt_amount = None
+            return vorhanden
+
+    def skaliere_usdt(self, botname, faktor):
+        # Nächste Ordergrösse = gespeicherte Ordergrösse * Faktor; None, wenn keine gültige Ordergrösse vorhanden
+        with self._aendern_bot(botname) as record:
+            if not record.saved_usdt_amount or record.saved_usdt_amount <= 0:
+                return None
+            record.saved_usdt_amount = record.saved_usdt_amount * faktor
+            return record.saved_usdt_amount
+
+    def hole_status(self, botname):
+        record, lock = self._bot(botname)
+        with lock:
+            return record.status
+
+    def setze_status(self, botname, status):
+        with self._aendern_bot(botname) as record:
+            record.status = status
+
+    def hole_alarm(self, botname, default=-1):
+        record, lock = self._bot(botname)
+        with lock:
+            return default if record.alarm_counter is None else record.alarm_counter
+
+    def setze_alarm(self, botname, wert):
+        with self._aendern_bot(botname) as record:
+            record.alarm_counter = wert
+
+    def erhoehe_alarm(self, botname):
+        with self._aendern_bot(botname) as record:
+            record.alarm_counter = (-1 if record.alarm_counter is None else record.alarm_counter) + 1
+            return record.alarm_counter
+
+    def hole_base_order_time(self, botname):
+        record, lock = self._bot(botname)
+        with lock:
+            return record.base_order_time
+
+    def setze_base_order_time(self, botname, zeitpunkt):
+        with self._aendern_bot(botname) as record:
+            record.base_order_time = zeitpunkt
+
+    def hole_kaufsummen(self, botname):
+        # (Σ price*usdt_amount, Σ usdt_amount, Anzahl Käufe) oder None, wenn nicht bekannt
+        record, lock = self._bot(botname)
+        with lock:
+            if record.kauf_anzahl is None:
+                return None
+            return record.kauf_summe_wert, record.kauf_summe_menge, record.kauf_anzahl
+
+    def setze_kaufsummen(self, botname, summen):
+        # Wiederherstellung aus Firebase; None = wieder unbekannt
+        with self._aendern_bot(botname) as record:
+            if summen is None:
+                record.kauf_summe_wert, record.kauf_summe_menge, record.kauf_anzahl = 0.0, 0.0, None
+            else:
+                record.kauf_summe_wert, record.kauf_summe_menge, record.kauf_anzahl = summen
+
+    def erfasse_kauf(self, botname, preis, menge, speichern=None):
+        # Summen in O(1) um einen Kauf erweitern. speichern(summen) wird vorher unter dem Lock aufgerufen;
+        # wirft es, bleiben die Summen unverändert. Sind die Summen unbekannt, wird speichern(None) aufgerufen.
+        with self._aendern_bot(botname) as record:
+            if record.kauf_anzahl is None:
+                neu = None
+            else:
+                neu = (record.kauf_summe_wert + preis * menge, record.kauf_summe_menge + menge, record.kauf_anzahl + 1)
+            if speichern:
+                speichern(neu)
+            if neu is not None:
+                record.kauf_summe_wert, record.kauf_summe_menge, record.kauf_anzahl = neu
+            return neu
+
+    def loesche_kaeufe(self, botname):
+        # Kaufpreise gelöscht → Summen sind bekannt und leer
+        self.setze_kaufsummen(botname, (0.0, 0.0, 0))
+
+    def reset_bot(self, botname):
+        # Ordergrösse, Status, Alarmzähler, BO-Zeitpunkt und Zyklus des Bots vergessen
+        with self._aendern_bot(botname) as record:
+            record.saved_usdt_amount = None
+            record.status = None
+            record.alarm_counter = None
+            record.base_order_time = None
+            record.zyklus = None
+
+    def neuer_zyklus(self, botname):
+        # Vor einer neuen Base Order: Status OK, Alarmzähler -1, neue Zyklus-Kennung
+        with self._aendern_bot(botname) as record:
+            record.status = "OK"
+            record.alarm_counter = -1
+            record.zyklus = uuid.uuid4().hex[:12]
+
+    def hole_zyklus(self, botname):
+        # Kennung des laufenden Zyklus; fehlt sie (Zustand verloren, Zyklus von vor dem Update), wird eine neue vergeben
+        with self._aendern_bot(botname) as record:
+            if record.zyklus is None:
+                record.zyklus = uuid.uuid4().hex[:12]
+            return record.zyklus
+
+    def alle_usdt_amounts(self):
+        with self._lock:
+            return {name: r.saved_usdt_amount for name, r in self._bots.items() if r.saved_usdt_amount is not None}
+
+    def alle_status(self):
+        with self._lock:
+            return {name: r.status for name, r in self._bots.items() if r.status is not None}
+
+    # --- pro bot_nr ---
+    def setze_aktueller_bot(self, bot_nr, botname):
+        with self._aendern_nr(bot_nr) as record:
+            record.aktueller_bot = botname
+
+    def entferne_aktueller_bot(self, bot_nr, botname):
+        # Nur löschen, wenn bot_nr noch zu diesem Bot gehört; True, wenn gelöscht
+        with self._aendern_nr(bot_nr) as record:
+            if record.aktueller_bot == botname:
+                record.aktueller_bot = None
+                return True
+            return False
+
+    def hole_ma(self, bot_nr):
+        # None = MA-Wert nicht im RAM (→ Firebase fragen)
+        record, lock = self._nr(bot_nr)
+        with lock:
+            return record.ma_wert
+
+    def setze_ma(self, bot_nr, wert):
+        with self._aendern_nr(bot_nr) as record:
+            record.ma_wert = wert
+
+    def recovery_nach_close(self, bot_nr, position_side, ma):
+        """
+        Recovery-Logik beim Schliessen einer Position.
+        True, wenn diese Seite als Recovery-Trade lief und im SL (ma == 1) endet → Recovery komplett beendet.
+        Sonst wird das Recovery-Flag der Seite aufgeräumt und bei SL (ma == 1) Recovery für den nächsten Trade "gearmt".
+        """
+        with self._aendern_nr(bot_nr) as record:
+            war_recovery = position_side in record.recovery_trade
+            record.recovery_trade.discard(position_side)
+            if war_recovery and ma == 1:
+                record.recovery_pending = False
+                return True
+            if ma == 1:
+                record.recovery_pending = True
+            return False
+
+    def aktiviere_recovery(self, bot_nr, position_side):
+        # Bei MA=1 und vorherigem SL wird der neue Trade als Recovery-Trade markiert; True, wenn aktiviert
+        with self._aendern_nr(bot_nr) as record:
+            if not record.recovery_pending:
+                return False
+            record.recovery_trade.add(position_side)
+            record.recovery_pending = False
+            return True
+
+
+bot_state = BotState()
+
+
+### Firebase Write-Behind
+# Firebase-Schreibzugriffe (PUT/POST/DELETE) werden nicht mehr einzeln im Order-Pfad gesendet, sondern
+# zuerst im lokalen Journal (SQLite, synchron auf Platte) gesichert und dann im Hintergrund gesammelt als
+# ein einziger Multi-Path-PATCH auf die Datenbank-Wurzel übertragen. Ein Auftrag gilt erst als angenommen,
+# wenn er im Journal steht; was beim Beenden noch nicht übertragen war, wird beim nächsten Start gesendet.
+# Das FIREBASE_SECRET steht nicht im Journal, nur sein SHA-256; das Secret selbst bleibt im Speicher. Reste
+# aus einem früheren Lauf gehen deshalb erst raus, wenn ein Webhook das passende Secret wieder mitbringt;
+# bis dahin gelten sie als verwaist (nicht in offen()) und nach FIREBASE_JOURNAL_TTL als abgelehnt.
+# Lehnt Firebase einen PATCH dauerhaft ab (4xx ausser 429), wandern die Aufträge in firebase_abgelehnt und
+# werden als dca_firebase_abgelehnt_total gezählt – sie gehen nicht stillschweigend verloren.
+
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+
+def firebase_push_id():
+    # Chronologisch sortierbare Schlüssel wie bei POST (8 Zeichen Zeit + 12 Zeichen Zufall)
+    ms = int(time.time() * 1000)
+    zeit = ""
+    for _ in range(8):
+        zeit = PUSH_CHARS[ms % 64] + zeit
+        ms //= 64
+    return zeit + "".join(random.choice(PUSH_CHARS) for _ in range(12))
+
+
+def _fuehre_zusammen(updates, pfad, wert):
+    # Multi-Path-PATCH erlaubt keine überlappenden Pfade → spätere Schreibzugriffe in frühere einarbeiten
+    for vorhanden in [p for p in updates if p.startswith(pfad + "/")]:
+        del updates[vorhanden]   # wird durch den neuen Wert komplett ersetzt
+    for vorhanden in updates:
+        if pfad.startswith(vorhanden + "/"):
+            knoten = updates[vorhanden]
+            if not isinstance(knoten, dict):
+                knoten = updates[vorhanden] = {}
+            teile = pfad[len(vorhanden) + 1:].split("/")
+            for teil in teile[:-1]:
+                if not isinstance(knoten.get(teil), dict):
+                    knoten[teil] = {}
+                knoten = knoten[teil]
+            if wert is None:
+                knoten.pop(teile[-1], None)
+            else:
+                knoten[teile[-1]] = wert
+            return
+    updates[pfad] = wert
+
+
+def _secret_hash(firebase_secret):
+    return hashlib.sha256(firebase_secret.encode("utf-8")).hexdigest()
+
+
+JOURNAL_TABELLE = (
+    "CREATE TABLE IF NOT EXISTS firebase_journal ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, secret_hash TEXT NOT NULL, pfad TEXT NOT NULL, wert TEXT, "
+    "erstellt REAL NOT NULL DEFAULT 0)"
+)
+
+
+class FirebaseWriteBehind:
+    def __init__(self, db_pfad=STATE_DB, intervall=FIREBASE_FLUSH_INTERVALL, ttl=FIREBASE_JOURNAL_TTL):
+        self.intervall = intervall
+        self.ttl = ttl
+        self._secrets = {}   # SHA-256 → FIREBASE_SECRET, nur im Speicher
+        self._db = sqlite3.connect(db_pfad, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._secrets_aus_altem_journal()
+        self._db.execute(JOURNAL_TABELLE)
+        if "erstellt" not in [zeile[1] for zeile in self._db.execute("PRAGMA table_info(firebase_journal)")]:
+            # Journal ohne Zeitstempel: vorhandene Einträge zählen ab jetzt
+            self._db.execute("ALTER TABLE firebase_journal ADD COLUMN erstellt REAL NOT NULL DEFAULT 0")
+            self._db.execute("UPDATE firebase_journal SET erstellt = ?", (time.time(),))
+        # abgelehnte Aufträge zur Kontrolle (und für eine manuelle Wiederholung) aufbewahren
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS firebase_abgelehnt ("
+            "id INTEGER PRIMARY KEY, secret_hash TEXT NOT NULL, pfad TEXT NOT NULL, wert TEXT, "
+            "grund TEXT NOT NULL, antwort TEXT, abgelegt REAL NOT NULL)"
+        )
+        self._db_lock = threading.Lock()
+        self._sende_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._signal = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None   # startet mit starte() bzw. beim ersten Schreibzugriff
+        self._verwaiste_ablegen()
+
+    def starte(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None or self._stop.is_set():
+                return
+            self._thread = threading.Thread(target=self._schleife, name="firebase-write-behind", daemon=True)
+            self._thread.start()
+        if self.offen():
+            self._signal.set()   # Reste vom letzten Lauf übertragen
+
+    def _secrets_aus_altem_journal(self):
+        # Journal früherer Versionen mit Secret im Klartext: Secrets in den Speicher, Zeilen mit Hash neu schreiben
+        spalten = [zeile[1] for zeile in self._db.execute("PRAGMA table_info(firebase_journal)")]
+        if "secret" not in spalten:
+            return
+        zeilen = self._db.execute("SELECT id, secret, pfad, wert FROM firebase_journal ORDER BY id").fetchall()
+        for _, secret, _, _ in zeilen:
+            self._secrets[_secret_hash(secret)] = secret
+        self._db.execute("BEGIN IMMEDIATE")
+        self._db.execute("DROP TABLE firebase_journal")
+        self._db.execute(JOURNAL_TABELLE)
+        jetzt = time.time()
+        self._db.executemany("INSERT INTO firebase_journal (id, secret_hash, pfad, wert, erstellt) VALUES (?, ?, ?, ?, ?)",
+                             [(i, _secret_hash(secret), pfad, wert, jetzt) for i, secret, pfad, wert in zeilen])
+        self._db.execute("COMMIT")
+        self._db.execute("VACUUM")   # Klartext auch aus den freien Seiten der Datei entfernen
+
+    def schreiben(self, pfad, wert, firebase_secret):
+        """
+        Merkt einen Schreibzugriff vor (wert=None → löschen). Kehrt zurück, sobald der Auftrag im Journal steht.
+        """
+        secret_hash = _secret_hash(firebase_secret)
+        self._secrets[secret_hash] = firebase_secret
+        with self._db_lock:
+            self._db.execute(
+                "INSERT INTO firebase_journal (secret_hash, pfad, wert, erstellt) VALUES (?, ?, ?, ?)",
+                (secret_hash, pfad.strip("/"), json.dumps(wert), time.time())
+            )
+        self.starte()
+        self._signal.set()
+
+    def _anzahl(self):
+        # (sendbare, verwaiste) Einträge; verwaist = Secret nicht im Speicher
+        with self._db_lock:
+            pro_hash = self._db.execute("SELECT secret_hash, COUNT(*) FROM firebase_journal GROUP BY secret_hash").fetchall()
+        sendbar = sum(anzahl for secret_hash, anzahl in pro_hash if secret_hash in self._secrets)
+        return sendbar, sum(anzahl for _, anzahl in pro_hash) - sendbar
+
+    def offen(self):
+        return self._anzahl()[0]
+
+    def verwaist(self):
+        return self._anzahl()[1]
+
+    def flush(self):
+        # Alle offenen Aufträge sofort übertragen
+        if self.offen():
+            self._sende()
+
+    def vor_lesen(self, pfad):
+        # Read-your-writes: offene Aufträge, die den gelesenen Pfad betreffen, vorher übertragen
+        pfad = pfad.strip("/")
+        with self._db_lock:
+            offene_pfade = [p for p, secret_hash in self._db.execute("SELECT pfad, secret_hash FROM firebase_journal")
+                            if secret_hash in self._secrets]
+        if any(p == pfad or p.startswith(pfad + "/") or pfad.startswith(p + "/") for p in offene_pfade):
+            try:
+                self._sende()
+            except Exception as e:
+                print(f"Firebase Write-Behind: Flush vor dem Lesen von {pfad} fehlgeschlagen: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._signal.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        try:
+            self._sende()
+        except Exception as e:
+            print(f"Firebase Write-Behind: letzter Flush fehlgeschlagen, bleibt im Journal: {e}")
+
+    def _schleife(self):
+        wartezeit = 0
+        while not self._stop.is_set():
+            if not self._signal.wait(timeout=60):
+                self._verwaiste_ablegen()   # läuft auch, wenn länger nichts geschrieben wird
+                continue
+            self._signal.clear()
+            time.sleep(max(self.intervall, wartezeit))   # kurz sammeln, damit ein Signal = ein PATCH
+            try:
+                self._sende()
+                wartezeit = 0
+            except Exception as e:
+                wartezeit = min(max(wartezeit * 2, 1), 30)
+                print(f"Firebase Write-Behind: Übertragung fehlgeschlagen, neuer Versuch in {wartezeit}s: {e}")
+                self._signal.set()
+
+    def _sende(self):
+        with self._sende_lock:
+            with self._db_lock:
+                zeilen = self._db.execute(
+                    "SELECT id, secret_hash, pfad, wert FROM firebase_journal ORDER BY id"
+                ).fetchall()
+            if not zeilen:
+                return
+
+            pro_secret = {}
+            for zeilen_id, secret_hash, pfad, wert in zeilen:
+                secret = self._secrets.get(secret_hash)
+                if secret is None:
+                    continue   # aus einem früheren Lauf; wartet, bis ein Webhook das Secret wieder mitbringt
+                eintrag = pro_secret.setdefault(secret, {"ids": [], "updates": {}})
+                eintrag["ids"].append(zeilen_id)
+                _fuehre_zusammen(eintrag["updates"], pfad, json.loads(wert))
+
+            fehler = None
+            for secret, eintrag in pro_secret.items():
+                response = firebase_session.patch(f"{FIREBASE_URL}/.json?auth={secret}", json=eintrag["updates"], timeout=10)
+                if response.status_code >= 500 or response.status_code == 429:
+                    fehler = f"Status {response.status_code}"
+                    continue   # bleibt im Journal, neuer Versuch
+                if response.status_code != 200:
+                    # dauerhafter Fehler (z.B. ungültiges Secret) → nicht endlos wiederholen, sondern beiseitelegen
+                    print(f"Firebase Write-Behind: PATCH abgelehnt ({response.status_code}), "
+                          f"{len(eintrag['ids'])} Aufträge nach firebase_abgelehnt: {response.text}")
+                    self._ablegen(eintrag["ids"], f"http_{response.status_code}", response.text[:1000])
+                    continue
+                with self._db_lock:
+                    self._db.executemany("DELETE FROM firebase_journal WHERE id = ?", [(i,) for i in eintrag["ids"]])
+            if fehler:
+                raise Exception(fehler)
+
+    def _ablegen(self, ids, grund, antwort=None):
+        # Aufträge aus dem Journal in firebase_abgelehnt verschieben (in einer Transaktion) und zählen
+        with self._db_lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.executemany(
+                "INSERT INTO firebase_abgelehnt (id, secret_hash, pfad, wert, grund, antwort, abgelegt) "
+                "SELECT id, secret_hash, pfad, wert, ?, ?, ? FROM firebase_journal WHERE id = ?",
+                [(grund, antwort, time.time(), i) for i in ids]
+            )
+            self._db.executemany("DELETE FROM firebase_journal WHERE id = ?", [(i,) for i in ids])
+            self._db.execute("COMMIT")
+        zaehler.erhoehen("firebase_abgelehnt", len(ids), grund=grund)
+
+    def _verwaiste_ablegen(self):
+        # Einträge, deren Secret seit ttl Sekunden kein Webhook mehr gebracht hat, aus dem Journal nehmen
+        with self._sende_lock:
+            with self._db_lock:
+                zeilen = self._db.execute("SELECT id, secret_hash FROM firebase_journal WHERE erstellt < ?",
+                                          (time.time() - self.ttl,)).fetchall()
+            ids = [i for i, secret_hash in zeilen if secret_hash not in self._secrets]
+            if ids:
+                print(f"Firebase Write-Behind: {len(ids)} Aufträge ohne Secret älter als {self.ttl:g}s "
+                      f"→ firebase_abgelehnt")
+                self._ablegen(ids, "verwaist")
+
+    def abgelehnt(self):
+        with self._db_lock:
+            return self._db.execute("SELECT COUNT(*) FROM firebase_abgelehnt").fetchone()[0]
+
+
+class FirebaseSession(requests.Session):
+    # jeder Firebase-Aufruf wird als firebase.<methode> gemessen, im Histogramm nach oberstem Knoten getrennt
+    def request(self, method, url, *args, **kwargs):
+        knoten = urlparse(url).path.removesuffix(".json").strip("/").split("/")[0] or "/"
+        with stufe(f"firebase.{method.lower()}", knoten):
+            return super().request(method, url, *args, **kwargs)
+
+
+firebase_session = FirebaseSession()
+firebase_writer = FirebaseWriteBehind()
+atexit.register(firebase_writer.stop)
+
+
+def firebase_vormerken(pfad, wert, firebase_secret):
+    # True, wenn vorgemerkt; False, wenn Firebase nicht konfiguriert ist
+    if not FIREBASE_URL or not firebase_secret:
+        return False
+    firebase_writer.schreiben(pfad, wert, firebase_secret)
+    firebase_cache.geschrieben(pfad, wert, firebase_secret)
+    return True
+
+
+### Firebase Lese-Cache
+# Read-Through-Cache für einzelne Metadaten-Knoten (MA, ordergroesse, base_order_time, aktueller_Bot).
+# Gelesen wird immer nur der eine Pfad; lokale Schreibzugriffe aktualisieren bzw. verwerfen die Einträge.
+
+class FirebaseLeseCache:
+    def __init__(self, ttls=None, standard_ttl=FIREBASE_CACHE_TTL_STANDARD):
+        self.ttls = _lese_ttls(FIREBASE_CACHE_TTL) if ttls is None else ttls
+        self.standard_ttl = standard_ttl
+        self._lock = threading.Lock()
+        self._eintraege = {}        # (secret, pfad) → (gültig_bis, wert)
+        self._treffer = {}          # Knoten → Anzahl
+        self._fehlschlaege = {}
+
+    def ttl(self, pfad):
+        return self.ttls.get(pfad.split("/", 1)[0], self.standard_ttl)
+
+    def lesen(self, pfad, firebase_secret):
+        """
+        Wert eines Pfads aus dem Cache oder (bei Miss/abgelaufen) direkt aus Firebase.
+        Wirft eine Exception bei HTTP-Fehlern; Fehler werden nicht gecacht.
+        """
+        pfad = pfad.strip("/")
+        knoten = pfad.split("/", 1)[0]
+        with self._lock:
+            eintrag = self._eintraege.get((firebase_secret, pfad))
+            if eintrag and eintrag[0] > time.monotonic():
+                self._treffer[knoten] = self._treffer.get(knoten, 0) + 1
+                return eintrag[1]
+            self._fehlschlaege[knoten] = self._fehlschlaege.get(knoten, 0) + 1
+
+        firebase_writer.vor_lesen(pfad)
+        response = firebase_session.get(f"{FIREBASE_URL}/{pfad}.json?auth={firebase_secret}", timeout=5)
+        if response.status_code != 200:
+            raise Exception(f"Firebase Status {response.status_code} für {pfad}")
+        wert = response.json()
+        with self._lock:
+            self._eintraege[(firebase_secret, pfad)] = (time.monotonic() + self.ttl(pfad), wert)
+        return wert
+
+    def geschrieben(self, pfad, wert, firebase_secret):
+        # Eigener Schreibzugriff: gleicher Pfad → neuer Wert, darüber/darunter liegende Pfade verwerfen
+        pfad = pfad.strip("/")
+        with self._lock:
+            for secret, vorhanden in list(self._eintraege):
+                if secret == firebase_secret and (vorhanden.startswith(pfad + "/") or pfad.startswith(vorhanden + "/")):
+                    del self._eintraege[(secret, vorhanden)]
+            self._eintraege[(firebase_secret, pfad)] = (time.monotonic() + self.ttl(pfad), wert)
+
+    def leeren(self):
+        with self._lock:
+            self._eintraege.clear()
+
+    def statistik(self):
+        with self._lock:
+            knoten = sorted(set(self._treffer) | set(self._fehlschlaege))
+            return {
+                "eintraege": len(self._eintraege),
+                "treffer": sum(self._treffer.values()),
+                "fehlschlaege": sum(self._fehlschlaege.values()),
+                "pro_knoten": {k: {"treffer": self._treffer.get(k, 0), "fehlschlaege": self._fehlschlaege.get(k, 0)} for k in knoten},
+            }
+
+
+firebase_cache = FirebaseLeseCache()
+
+
+### Kontrakt-Metadaten
+# Preis-/Mengen-Genauigkeit und Mindestgrössen pro Symbol aus /quote/contracts. Alle Order-Funktionen runden
+# damit statt pauschal auf 6 Stellen, damit BingX die Order beim ersten Versuch annimmt.
+
+class KontraktCache:
+    def __init__(self, refresh=KONTRAKT_REFRESH):
+        self.refresh = refresh
+        self._lock = threading.Lock()
+        self._kontrakte = {}
+        self._geladen = 0.0       # time.monotonic() des letzten erfolgreichen Ladens
+        self._versucht = None     # letzter Ladeversuch aus hole()
+        self._thread = None
+
+    def lade(self):
+        # True, wenn die Kontraktliste geladen wurde; bei Fehlern bleiben die bisherigen Daten gültig
+        try:
+            response = bingx_client.get(f"{BASE_URL}{CONTRACTS_ENDPOINT}")
+            data = response.json()
+            if data.get("code") != 0 or not isinstance(data.get("data"), list):
+                print(f"Kontraktdaten: unerwartete Antwort: {data}")
+                return False
+            kontrakte = {}
+            for k in data["data"]:
+                if not k.get("symbol"):
+                    continue
+                kontrakte[k["symbol"]] = {
+                    "pricePrecision": int(k.get("pricePrecision", 6)),
+                    "quantityPrecision": int(k.get("quantityPrecision", 6)),
+                    "tradeMinQuantity": float(k.get("tradeMinQuantity") or 0),
+                    "tradeMinUSDT": float(k.get("tradeMinUSDT") or 0),
+                }
+            with self._lock:
+                self._kontrakte = kontrakte
+                self._geladen = time.monotonic()
+            return True
+        except Exception as e:
+            print(f"Kontraktdaten konnten nicht geladen werden: {e}")
+            return False
+
+    def _aktualisieren(self):
+        while True:
+            time.sleep(self.refresh)
+            self.lade()
+
+    def starte_aktualisierung(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._aktualisieren, name="kontrakt-refresh", daemon=True)
+        self._thread.start()
+
+    def hole(self, symbol):
+        # Kontraktdaten eines Symbols. Solange nichts geladen ist, wird höchstens einmal pro Minute
+        # synchron geladen; danach aktualisiert der Hintergrund-Thread.
+        with self._lock:
+            kontrakt = self._kontrakte.get(symbol)
+            jetzt = time.monotonic()
+            laden = not self._geladen and (self._versucht is None or jetzt - self._versucht >= 60)
+            if laden:
+                self._versucht = jetzt
+        if laden:
+            self.lade()
+            self.starte_aktualisierung()
+            with self._lock:
+                kontrakt = self._kontrakte.get(symbol)
+        return kontrakt
+
+    def menge(self, symbol, menge):
+        # Menge auf quantityPrecision abrunden (nie mehr als Position/Guthaben); ohne Daten wie bisher 6 Stellen
+        kontrakt = self.hole(symbol)
+        if kontrakt is None:
+            return round(menge, 6)
+        stellen = Decimal(1).scaleb(-kontrakt["quantityPrecision"])
+        return float(Decimal(str(menge)).quantize(stellen, rounding=ROUND_DOWN))
+
+    def preis(self, symbol, preis):
+        kontrakt = self.hole(symbol)
+        if kontrakt is None:
+            return round(preis, 6)
+        stellen = Decimal(1).scaleb(-kontrakt["pricePrecision"])
+        return float(Decimal(str(preis)).quantize(stellen, rounding=ROUND_HALF_UP))
+
+    def pruefe_minimum(self, symbol, menge, preis):
+        # Fehlermeldung, wenn eine eröffnende Order unter Mindestmenge/-wert liegt, sonst None
+        kontrakt = self.hole(symbol)
+        if kontrakt is None:
+            return None
+        if menge <= 0 or menge < kontrakt["tradeMinQuantity"]:
+            return f"Menge {menge} unter Mindestmenge {kontrakt['tradeMinQuantity']} für {symbol}"
+        if kontrakt["tradeMinUSDT"] and menge * preis < kontrakt["tradeMinUSDT"]:
+            return f"Orderwert {round(menge * preis, 4)} USDT unter Minimum {kontrakt['tradeMinUSDT']} USDT für {symbol}"
+        return None
+
+
+kontrakt_cache = KontraktCache()
+
+
+### Marktdaten (WebSocket)
+# Letzter Preis pro Symbol aus dem BingX Swap-WebSocket (@lastPrice). Die Order-Funktionen
+# lesen den Preis für die Mengenberechnung aus dem Speicher; ist er älter als PREIS_MAX_ALTER (oder gibt es
+# keinen Stream), wird wie bisher per REST abgefragt.
+
+class MarktDaten:
+    def __init__(self, url=MARKT_WS_URL, max_alter=PREIS_MAX_ALTER):
+        self.url = url
+        self.max_alter = max_alter
+        self._lock = threading.Lock()
+        self._preise = {}          # symbol → (preis, zeit)
+        self._symbole = set()
+        self._ws = None
+        self._thread = None
+
+    @property
+    def aktiv(self):
+        return bool(self.url) and websocket is not None
+
+    def abonnieren(self, symbol):
+        if not self.aktiv:
+            return
+        with self._lock:
+            neu = symbol not in self._symbole
+            self._symbole.add(symbol)
+            ws = self._ws
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._lauf, name="markt-ws", daemon=True)
+                self._thread.start()
+        if neu and ws is not None:
+            self._sende_abos(ws, [symbol])
+
+    def _sende_abos(self, ws, symbole):
+        try:
+            for symbol in symbole:
+                ws.send(json.dumps({"id": uuid.uuid4().hex, "reqType": "sub", "dataType": f"{symbol}@lastPrice"}))
+        except Exception as e:
+            print(f"Marktdaten: Abo fehlgeschlagen: {e}")
+
+    def _bei_nachricht(self, ws, nachricht):
+        if isinstance(nachricht, bytes):
+            try:
+                nachricht = gzip.decompress(nachricht)
+            except OSError:
+                pass
+            nachricht = nachricht.decode("utf-8")
+        if nachricht == "Ping":
+            ws.send("Pong")
+            return
+        try:
+            daten = json.loads(nachricht)
+        except ValueError:
+            return
+        data_type = daten.get("dataType", "") if isinstance(daten, dict) else ""
+        data = daten.get("data") if isinstance(daten, dict) else None
+        if "@" not in data_type or not isinstance(data, dict):
+            return
+        symbol, kanal = data_type.split("@", 1)
+        if kanal != "lastPrice":
+            return
+        try:
+            self.setze_preis(symbol, float(data["c"]))
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    def setze_preis(self, symbol, preis):
+        with self._lock:
+            self._preise[symbol] = (preis, time.monotonic())
+
+    def _lauf(self):
+        wartezeit = 1
+        while self.url:
+            def bei_open(ws):
+                with self._lock:
+                    self._ws = ws
+                    symbole = list(self._symbole)
+                self._sende_abos(ws, symbole)
+
+            ws = websocket.WebSocketApp(self.url, on_open=bei_open, on_message=self._bei_nachricht)
+            start = time.monotonic()
+            try:
+                ws.run_forever(ping_interval=20, ping_timeout=10)
+            except Exception as e:
+                print(f"Marktdaten: WebSocket-Fehler: {e}")
+            with self._lock:
+                self._ws = None
+            # Verbindung hat eine Weile gehalten → sofort neu verbinden, sonst Backoff
+            wartezeit = 1 if time.monotonic() - start > 60 else min(wartezeit * 2, 30)
+            time.sleep(wartezeit)
+
+    def stream_preis(self, symbol):
+        # Preis aus dem Stream, None wenn keiner da oder älter als max_alter
+        with self._lock:
+            eintrag = self._preise.get(symbol)
+        if eintrag and time.monotonic() - eintrag[1] <= self.max_alter:
+            return eintrag[0]
+        return None
+
+    def preis(self, symbol):
+        # letzter Preis aus dem Stream, sonst REST; abonniert das Symbol für die nächsten Aufrufe
+        self.abonnieren(symbol)
+        preis = self.stream_preis(symbol)
+        if preis is not None:
+            zaehler.erhoehen("marktpreis_abfragen", quelle="stream")
+            return preis
+        zaehler.erhoehen("marktpreis_abfragen", quelle="rest")
+        return get_current_price(symbol)
+
+    def stop(self):
+        with self._lock:
+            ws = self._ws
+            self.url = ""     # _lauf baut keine neue Verbindung mehr auf
+        if ws is not None:
+            ws.close()
+
+
+markt_daten = MarktDaten()
+
+
+### Konto-Stream (User Data Stream)
+# Pro API-Key ein listenKey-WebSocket mit ACCOUNT_UPDATE / ORDER_TRADE_UPDATE. Gespeichert werden die
+# REST-Antworten von Balance, Positionen und Open Orders; der Stream sagt, wann sie nicht mehr stimmen.
+# Regeln, wann eine gespeicherte Antwort verwendet wird:
+#   - der Stream ist verbunden und war es schon, als die REST-Abfrage gestartet wurde
+#   - seit der Abfrage kam kein Ereignis, das sie ändert (Position/Balance mit anderem Wert, Order-Update
+#     für das Symbol), und es lief keine eigene Order/Cancel/Hebel-Änderung für das Symbol
+#   - sie ist höchstens KONTO_MAX_ALTER Sekunden alt
+# Sonst wird per REST gelesen und die Antwort neu gespeichert. Fill-Bestätigungen lesen immer per REST
+# (frisch=True), speichern das Ergebnis aber für die folgenden Aufrufe.
+
+class KontoAnsicht:
+    def __init__(self, api_key, client, url=None, max_alter=KONTO_MAX_ALTER):
+        self.api_key = api_key
+        self.client = client
+        self.url = USER_WS_URL if url is None else url
+        self.max_alter = max_alter
+        self._lock = threading.Lock()
+        self._daten = {}          # (art, symbol) → (zeit, version, antwort)
+        self._versionen = {}      # (art, symbol) → Zähler, wird bei jeder Ungültigkeit erhöht
+        self._epoche = 0          # erhöht bei Verbindungsverlust → alles ungültig
+        self.verbunden_seit = None
+        self._listen_key = None
+        self._ws = None
+        self._stop = threading.Event()
+        threading.Thread(target=self._lauf, name=f"konto-ws-{api_key[:6]}", daemon=True).start()
+        threading.Thread(target=self._verlaengern, name=f"konto-key-{api_key[:6]}", daemon=True).start()
+
+    # --- gespeicherte Antworten ---
+    def version(self, art, symbol=None):
+        with self._lock:
+            return self._epoche, self._versionen.get((art, symbol), 0)
+
+    def hole(self, art, symbol=None):
+        with self._lock:
+            eintrag = self._daten.get((art, symbol))
+            if eintrag is None or self.verbunden_seit is None:
+                return None
+            zeit, version, antwort = eintrag
+            if version != (self._epoche, self._versionen.get((art, symbol), 0)):
+                return None
+            if zeit < self.verbunden_seit or time.monotonic() - zeit > self.max_alter:
+                return None
+            return antwort
+
+    def merke(self, art, symbol, version, antwort, zeit):
+        # zeit/version vom Start der REST-Abfrage: kam inzwischen ein Ereignis, wird nichts gespeichert
+        with self._lock:
+            if self.verbunden_seit is None or zeit < self.verbunden_seit:
+                return
+            if version != (self._epoche, self._versionen.get((art, symbol), 0)):
+                return
+            self._daten[(art, symbol)] = (zeit, version, antwort)
+
+    def ungueltig(self, art, symbol=None):
+        with self._lock:
+            self._versionen[(art, symbol)] = self._versionen.get((art, symbol), 0) + 1
+            self._daten.pop((art, symbol), None)
+
+    def ungueltig_symbol(self, symbol, position=True):
+        # nach eigener Order: Open Orders und Balance (und bei Market-Order/Hebel die Position) neu lesen
+        with self._lock:
+            if symbol is None:
+                self._epoche += 1
+                self._daten.clear()
+                return
+            schluessel_liste = [("open_orders", symbol), ("balance", None)]
+            if position:
+                schluessel_liste.append(("position", symbol))
+            for schluessel in schluessel_liste:
+                self._versionen[schluessel] = self._versionen.get(schluessel, 0) + 1
+                self._daten.pop(schluessel, None)
+
+    # --- Stream-Ereignisse ---
+    def _position_gleich(self, symbol, seite, menge, einstand):
+        with self._lock:
+            eintrag = self._daten.get(("position", symbol))
+        if eintrag is None:
+            return False
+        for pos in eintrag[2].get("data") or []:
+            if pos.get("positionSide", "").upper() == str(seite).upper():
+                try:
+                    return (abs(float(pos.get("positionAmt", 0))) == abs(float(menge))
+                            and float(pos.get("avgPrice", 0)) == float(einstand))
+                except (TypeError, ValueError):
+                    return False
+        return float(menge or 0) == 0
+
+    def _balance_gleich(self, wallet_balance):
+        with self._lock:
+            eintrag = self._daten.get(("balance", None))
+        try:
+            return eintrag is not None and float(eintrag[2]["data"]["balance"]["balance"]) == float(wallet_balance)
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def _bei_nachricht(self, ws, nachricht):
+        if isinstance(nachricht, bytes):
+            try:
+                nachricht = gzip.decompress(nachricht)
+            except OSError:
+                pass
+            nachricht = nachricht.decode("utf-8")
+        if nachricht == "Ping":
+            ws.send("Pong")
+            return
+        try:
+            daten = json.loads(nachricht)
+        except ValueError:
+            return
+        if not isinstance(daten, dict):
+            return
+        ereignis = daten.get("e")
+        if ereignis == "ACCOUNT_UPDATE":
+            konto = daten.get("a") or {}
+            for b in konto.get("B") or []:
+                if b.get("a") == "USDT" and not self._balance_gleich(b.get("wb")):
+                    self.ungueltig("balance")
+            for p in konto.get("P") or []:
+                if not self._position_gleich(p.get("s"), p.get("ps"), p.get("pa", 0), p.get("ep", 0)):
+                    self.ungueltig("position", p.get("s"))
+        elif ereignis == "ORDER_TRADE_UPDATE":
+            # Positions- und Balance-Änderungen durch Fills kommen zusätzlich als ACCOUNT_UPDATE
+            order = daten.get("o") or {}
+            self.ungueltig("open_orders", order.get("s"))
+        elif ereignis == "listenKeyExpired":
+            ws.close()
+
+    # --- Verbindung ---
+    def _hole_listen_key(self):
+        response = self.client.post(f"{BASE_URL}{USER_STREAM_ENDPOINT}", headers={"X-BX-APIKEY": self.api_key})
+        listen_key = response.json().get("listenKey")
+        if not listen_key:
+            raise Exception(f"kein listenKey: {response.text}")
+        return listen_key
+
+    def _lauf(self):
+        wartezeit = 1
+        while not self._stop.is_set() and self.url:
+            try:
+                self._listen_key = self._hole_listen_key()
+            except Exception as e:
+                print(f"Konto-Stream: listenKey fehlgeschlagen: {e}")
+                self._stop.wait(wartezeit)
+                wartezeit = min(wartezeit * 2, 60)
+                continue
+
+            def bei_open(ws):
+                with self._lock:
+                    self._ws = ws
+                    self.verbunden_seit = time.monotonic()
+
+            ws = websocket.WebSocketApp(f"{self.url}?listenKey={self._listen_key}", on_open=bei_open, on_message=self._bei_nachricht)
+            start = time.monotonic()
+            try:
+                ws.run_forever(ping_interval=20, ping_timeout=10)
+            except Exception as e:
+                print(f"Konto-Stream: WebSocket-Fehler: {e}")
+            with self._lock:
+                self._ws = None
+                self.verbunden_seit = None
+                self._epoche += 1
+                self._daten.clear()
+            wartezeit = 1 if time.monotonic() - start > 60 else min(wartezeit * 2, 60)
+            self._stop.wait(wartezeit)
+
+    def _verlaengern(self):
+        # listenKey ist 60 Minuten gültig → alle 30 Minuten verlängern
+        while not self._stop.wait(1800):
+            if self._listen_key:
+                try:
+                    self.client.request("PUT", f"{BASE_URL}{USER_STREAM_ENDPOINT}",
+                                        headers={"X-BX-APIKEY": self.api_key}, params={"listenKey": self._listen_key})
+                except Exception as e:
+                    print(f"Konto-Stream: listenKey verlängern fehlgeschlagen: {e}")
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            ws = self._ws
+        if ws is not None:
+            ws.close()
+
+
+### Konten (ein Satz Ressourcen pro API-Key)
+# Die API-Keys kommen mit jedem Webhook. Pro Key werden beim ersten Aufruf ein eigener BingXClient
+# (Connection-Pool + Budget gleichzeitiger Aufrufe) und die Konto-Ansicht mit User Data Stream angelegt
+# und danach wiederverwendet. Höchstens KONTO_MAX Konten bleiben im Speicher; das am längsten nicht
+# verwendete bzw. jedes seit KONTO_LEERLAUF Sekunden unbenutzte Konto wird entfernt (Stream gestoppt, Pool geschlossen).
+# Ein Konto, für das gerade ein Webhook-Job läuft (konten.benutzen), wird nie entfernt – solange alle Konten
+# belegt sind, können es vorübergehend mehr als KONTO_MAX sein.
+
+class Konto:
+    def __init__(self, api_key, mit_stream):
+        self.api_key = api_key
+        self.client = BingXClient(pool_size=KONTO_POOL_SIZE, max_parallel=KONTO_MAX_PARALLEL, limiter=RateLimiter())
+        self.ansicht = KontoAnsicht(api_key, self.client) if mit_stream else None
+        self.zuletzt = time.monotonic()
+        self.aktiv = 0   # laufende Webhook-Jobs mit diesem Konto (unter dem Lock der Registry)
+
+    def schliessen(self):
+        if self.ansicht is not None:
+            self.ansicht.stop()
+        self.client.close()
+
+
+class KontoRegistry:
+    def __init__(self, max_konten=KONTO_MAX, leerlauf=KONTO_LEERLAUF):
+        self.max_konten = max_konten
+        self.leerlauf = leerlauf
+        self._lock = threading.Lock()
+        self._konten = OrderedDict()   # api_key → Konto, zuletzt verwendetes am Ende
+        self.treffer = 0
+        self.rest_abfragen = 0
+        self.entfernt = 0
+
+    @property
+    def streams_aktiv(self):
+        return bool(USER_WS_URL) and websocket is not None
+
+    def konto(self, api_key, reservieren=False):
+        # legt das Konto beim ersten Zugriff an; entfernt dabei alte, gerade nicht benutzte Konten
+        jetzt = time.monotonic()
+        with self._lock:
+            konto = self._konten.get(api_key)
+            if konto is None:
+                konto = self._konten[api_key] = Konto(api_key, self.streams_aktiv)
+            else:
+                self._konten.move_to_end(api_key)
+            konto.zuletzt = jetzt
+            if reservieren:
+                konto.aktiv += 1
+            alte = []
+            for key, aeltestes in list(self._konten.items()):
+                if aeltestes is konto or aeltestes.aktiv:
+                    continue
+                if len(self._konten) <= self.max_konten and jetzt - aeltestes.zuletzt < self.leerlauf:
+                    break
+                alte.append(self._konten.pop(key))
+            self.entfernt += len(alte)
+        for altes in alte:
+            altes.schliessen()
+        return konto
+
+    @contextmanager
+    def benutzen(self, api_key):
+        # reserviert das Konto für die Dauer eines Webhook-Laufs, damit Client und Stream nicht mittendrin schliessen
+        if not api_key:
+            yield None
+            return
+        konto = self.konto(api_key, reservieren=True)
+        try:
+            yield konto
+        finally:
+            with self._lock:
+                konto.aktiv -= 1
+
+    def client(self, api_key):
+        return self.konto(api_key).client if api_key else bingx_client
+
+    def ansicht(self, api_key):
+        # Konto-Ansicht des API-Keys; None, wenn kein Stream möglich ist
+        if not self.streams_aktiv or not api_key:
+            return None
+        return self.konto(api_key).ansicht
+
+    def nach_trade(self, api_key, symbol, position=True):
+        with self._lock:
+            konto = self._konten.get(api_key)
+        if konto is not None and konto.ansicht is not None:
+            konto.ansicht.ungueltig_symbol(symbol, position)
+
+    def anzahl(self):
+        with self._lock:
+            return len(self._konten)
+
+    def stop(self):
+        with self._lock:
+            alle = list(self._konten.values())
+            self._konten.clear()
+        for konto in alle:
+            konto.schliessen()
+
+
+konten = KontoRegistry()
 
-saved_usdt_amounts = {}  # globales Dict für alle Coins
-status_fuer_alle = {} 
-alarm_counter = {}
-base_order_times = {}
-aktueller_Bot = {}
-ma_Wert = {} 
-recovery_trade = {} 
-recovery_pending = {}
+
+def konto_lesen(api_key, art, symbol, abfrage, frisch=False):
+    """
+    Antwort aus der Konto-Ansicht, wenn sie nach den obigen Regeln gültig ist, sonst abfrage() per REST
+    (die Antwort wird dann für die nächsten Aufrufe gespeichert). Rückgabe ist immer eine eigene Kopie.
+    """
+    konto = konten.ansicht(api_key)
+    if konto is None:
+        return abfrage()
+    antwort = None if frisch else konto.hole(art, symbol)
+    if antwort is not None:
+        konten.treffer += 1
+        return copy.deepcopy(antwort)
+    konten.rest_abfragen += 1
+    version = konto.version(art, symbol)
+    start = time.monotonic()
+    antwort = abfrage()
+    if isinstance(antwort, dict) and antwort.get("code") == 0:
+        konto.merke(art, symbol, version, copy.deepcopy(antwort), start)
+    return antwort
+
+
+### Signatur
+# Feldreihenfolge der signierten Query-Strings: dieselbe alphabetische Reihenfolge wie früher mit sorted(),
+# aber einmal festgelegt statt bei jeder Order neu sortiert
+SIGNATUR_FELDER = ("batchOrders", "clientOrderID", "clientOrderId", "leverage", "orderId", "orderIdList", "positionSide", "price", "quantity",
+                   "side", "stopPrice", "symbol", "timeInForce", "timestamp", "type")
+
+
+class BingXSigner:
+    """
+    Signiert die Anfragen eines Kontos. Der Secret Key wird einmal kodiert und als vorbereitetes
+    HMAC-SHA256-Objekt gehalten; pro Anfrage wird nur eine Kopie davon mit dem Query-String gefüttert.
+    """
+    __slots__ = ("_hmac",)
+
+    def __init__(self, secret_key):
+        self._hmac = hmac.new(secret_key.encode("utf-8"), digestmod=hashlib.sha256)
+
+    def signatur(self, query_string):
+        h = self._hmac.copy()
+        h.update(query_string.encode("utf-8"))
+        return h.hexdigest()
+
+    def query(self, params):
+        # Felder in der festen Reihenfolge; enthält params ein unbekanntes Feld, wie bisher sortieren
+        teile = [f"{k}={params[k]}" for k in SIGNATUR_FELDER if k in params]
+        if len(teile) != len(params):
+            return "&".join(f"{k}={params[k]}" for k in sorted(params))
+        return "&".join(teile)
+
+    def signiere(self, params):
+        # hängt die Signatur an params an (Body bzw. Query einer Order)
+        params["signature"] = self.signatur(self.query(params))
+        return params
+
+
+@functools.lru_cache(maxsize=256)
+def signierer(secret_key):
+    return BingXSigner(secret_key)
 
 
 def generate_signature(secret_key: str, params: str) -> str:
-    return hmac.new(secret_key.encode('utf-8'), params.encode('utf-8'), hashlib.sha256).hexdigest()
+    return signierer(secret_key).signatur(params)
 
 def get_futures_balance(api_key: str, secret_key: str):
-    timestamp = int(time.time() * 1000)
-    params = f"timestamp={timestamp}"
-    signature = generate_signature(secret_key, params)
-    url = f"{BASE_URL}{BALANCE_ENDPOINT}?{params}&signature={signature}"
-    headers = {"X-BX-APIKEY": api_key}
-    response = requests.get(url, headers=headers)
-    return response.json()
+    def abfrage():
+        timestamp = int(time.time() * 1000)
+        params = f"timestamp={timestamp}"
+        signature = generate_signature(secret_key, params)
+        url = f"{BASE_URL}{BALANCE_ENDPOINT}?{params}&signature={signature}"
+        headers = {"X-BX-APIKEY": api_key}
+        response = konten.client(api_key).get(url, headers=headers)
+        return response.json()
+
+    return konto_lesen(api_key, "balance", None, abfrage)
 
 def firebase_speichere_base_order_time(botname, timestamp, firebase_secret):
-    url = f"{FIREBASE_URL}/base_order_time/{botname}.json?auth={firebase_secret}"
-    data = timestamp.isoformat()  # nur der String
-    response = requests.put(url, json=data)
-    return f"Base-Order-Zeit für {botname} gespeichert: {timestamp}, Status: {response.status_code}"
+    # gleiches Format wie SHORT, damit firebase_lese_base_order_time() den Wert lesen kann
+    data = {"base_order_time": timestamp.isoformat()}
+    if not firebase_vormerken(f"base_order_time/{botname}", data, firebase_secret):
+        return "Firebase nicht konfiguriert"
+    return f"Base-Order-Zeit für {botname} vorgemerkt: {timestamp}"
 
 def get_current_price(symbol: str):
     url = f"{BASE_URL}{PRICE_ENDPOINT}?symbol={symbol}"
-    response = requests.get(url)
+    response = bingx_client.get(url)
     data = response.json()
     if data.get("code") == 0 and "data" in data and "price" in data["data"]:
         return float(data["data"]["price"])
     else:
         return None
 
-def close_open_position(api_key, secret_key, symbol, position_side="LONG"):
+### Order-Wiederholung
+# Jede Order bekommt eine clientOrderID, die nur von Bot, Schritt und Signal abhängt (client_order_id()).
+# Timeouts, Verbindungsfehler und 5xx werden mit exponentiellem Backoff + Jitter wiederholt; vor jeder
+# Wiederholung wird bei BingX nach der clientOrderID gesucht. Ist die Order schon da, wird sie zurückgegeben
+# statt erneut gesendet – ein verlorenes Antwortpaket führt so nicht zu einem doppelten Kauf.
+
+def client_order_id(botname, schritt, signal, zyklus=""):
+    # höchstens 40 Zeichen, nur Buchstaben/Ziffern; zyklus trennt gleiche Schritte verschiedener DCA-Zyklen
+    return "dca" + hashlib.sha256(f"{botname}|{zyklus}|{schritt}|{signal}".encode("utf-8")).hexdigest()[:32]
+
+
+def order_backoff(versuch):
+    return random.uniform(0, min(ORDER_BACKOFF_MAX, ORDER_BACKOFF * 2 ** versuch))
+
+
+def hole_order_per_client_id(api_key, secret_key, symbol, client_order_id):
+    # Order zur clientOrderID oder None, wenn BingX sie nicht kennt (Exception bei Verbindungsfehler)
+    # beim Setzen heisst der Parameter clientOrderID, bei der Abfrage clientOrderId
+    signer = signierer(secret_key)
+    query = signer.query({"symbol": symbol, "clientOrderId": client_order_id, "timestamp": int(time.time() * 1000)})
+    url = f"{BASE_URL}{ORDER_ENDPOINT}?{query}&signature={signer.signatur(query)}"
+    antwort = konten.client(api_key).get(url, headers={"X-BX-APIKEY": api_key}).json()
+    if antwort.get("code") != 0:
+        return None
+    return (antwort.get("data") or {}).get("order")
+
+
+def sende_order(api_key, secret_key, params_dict):
+    """
+    Setzt eine Order (POST /trade/order) mit frischem Zeitstempel und Signatur pro Versuch.
+    Wiederholt nur, wenn params_dict eine clientOrderID hat, sonst ein einziger Versuch wie bisher.
+    Rückgabe: Antwort von BingX; nach dem letzten Fehlversuch die 5xx-Antwort bzw. die Exception.
+    """
+    client_id = params_dict.get("clientOrderID")
+    url = f"{BASE_URL}{ORDER_ENDPOINT}"
+    headers = {
+        "X-BX-APIKEY": api_key,
+        "Content-Type": "application/json"
+    }
+    versuche = ORDER_WIEDERHOLUNGEN + 1 if client_id else 1
+    fehler = None
+    for versuch in range(versuche):
+        if versuch:
+            zaehler.erhoehen("order_wiederholungen")
+            with stufe("warten.backoff"):
+                time.sleep(order_backoff(versuch))
+            try:
+                vorhanden = hole_order_per_client_id(api_key, secret_key, params_dict["symbol"], client_id)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                # unklar, ob die Order existiert → nicht blind erneut senden
+                fehler = e
+                continue
+            if vorhanden:
+                return {"code": 0, "msg": "", "data": {"order": vorhanden}}
+        params = dict(params_dict, timestamp=int(time.time() * 1000))
+        signierer(secret_key).signiere(params)
+        try:
+            response = konten.client(api_key).post(url, headers=headers, json=params)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            fehler = e
+            continue
+        finally:
+            # eigene Order: gespeicherte Konto-Ansicht nicht mehr verwenden (auch ohne Antwort, die Order kann stehen);
+            # Limit-/Stop-Orders ändern die Position nicht (Fills kommen als ACCOUNT_UPDATE)
+            konten.nach_trade(api_key, params["symbol"], params.get("type", "MARKET") == "MARKET")
+        if response.status_code >= 500:
+            fehler = response
+            continue
+        try:
+            return response.json()
+        except ValueError as e:
+            return {"code": -1, "msg": f"Fehler beim Parsen der API-Antwort: {e}", "raw_response": response.text}
+    if isinstance(fehler, Exception):
+        raise fehler
+    return {"code": -1, "msg": f"BingX HTTP {fehler.status_code}", "raw_response": fehler.text}
+
+
+def close_open_position(api_key, secret_key, symbol, position_side="LONG", client_order_id=None, ausfuehrlich=None):
     """
     Schließt die offene Position sofort per Market Order.
     position_side: "LONG" oder "SHORT"
     """
-    logs = []
+    logs = Protokoll(ausfuehrlich)
 
     # 1. Aktuelle Positionsgröße und Liquidationspreis abfragen
     position_size, _, liquidation_price = get_current_position(api_key, secret_key, symbol, position_side, logs=logs)
@@ -134,93 +1926,62 @@ def close_open_position(api_key, secret_key, symbol, position_side="LONG"):
         return {"code": 1, "msg": "Keine offene Position", "logs": logs}
 
     # 2. Market Sell/Buy zum Schließen der Position
-    side = "SELL" if position_side.upper() == "LONG" else "BUY"
+    side = SEITEN[position_side.upper()].schliessen
 
-    timestamp = int(time.time() * 1000)
     params_dict = {
         "symbol": symbol,
         "side": side,
         "type": "MARKET",
-        "quantity": round(position_size, 6),
-        "positionSide": position_side.upper(),
-        "timestamp": timestamp
-    }
-
-    query_string = "&".join(f"{k}={params_dict[k]}" for k in sorted(params_dict))
-    signature = generate_signature(secret_key, query_string)
-    params_dict["signature"] = signature
-
-    url = f"{BASE_URL}{ORDER_ENDPOINT}"
-    headers = {
-        "X-BX-APIKEY": api_key,
-        "Content-Type": "application/json"
+        "quantity": kontrakt_cache.menge(symbol, position_size),
+        "positionSide": position_side.upper()
     }
+    if client_order_id:
+        params_dict["clientOrderID"] = client_order_id
 
-    response = requests.post(url, headers=headers, json=params_dict)
-    try:
-        result = response.json()
-    except Exception as e:
-        result = {"code": -1, "msg": f"Fehler beim Parsen der API-Antwort: {e}", "raw_response": response.text}
+    result = sende_order(api_key, secret_key, params_dict)
 
     logs.append(f"Schließen der Position: {result}")
     return {"result": result, "logs": logs}
 
-def place_market_order(api_key, secret_key, symbol, usdt_amount, position_side="LONG"):
-    price = get_current_price(symbol)
+def place_market_order(api_key, secret_key, symbol, usdt_amount, position_side="LONG", client_order_id=None):
+    # eröffnet bzw. vergrössert die Position: LONG → BUY, SHORT → SELL
+    price = markt_daten.preis(symbol)
     if price is None:
         return {"code": 99999, "msg": "Failed to get current price"}
 
-    quantity = round(usdt_amount / price, 6)
-    timestamp = int(time.time() * 1000)
+    quantity = kontrakt_cache.menge(symbol, usdt_amount / price)
+    fehler = kontrakt_cache.pruefe_minimum(symbol, quantity, price)
+    if fehler:
+        return {"code": 99998, "msg": fehler}
 
     params_dict = {
         "symbol": symbol,
-        "side": "BUY",
+        "side": SEITEN[position_side.upper()].oeffnen,
         "type": "MARKET",
         "quantity": quantity,
-        "positionSide": position_side,
-        "timestamp": timestamp
-    }
-
-    query_string = "&".join(f"{k}={params_dict[k]}" for k in sorted(params_dict))
-    signature = generate_signature(secret_key, query_string)
-    params_dict["signature"] = signature
-
-    url = f"{BASE_URL}{ORDER_ENDPOINT}"
-    headers = {
-        "X-BX-APIKEY": api_key,
-        "Content-Type": "application/json"
+        "positionSide": position_side.upper()
     }
 
-    response = requests.post(url, headers=headers, json=params_dict)
-    return response.json()
+    if client_order_id:
+        params_dict["clientOrderID"] = client_order_id
+    return sende_order(api_key, secret_key, params_dict)
 
-def place_stop_loss_order(api_key, secret_key, symbol, quantity, stop_price, position_side="LONG"):
-    timestamp = int(time.time() * 1000)
+def place_stop_loss_order(api_key, secret_key, symbol, quantity, stop_price, position_side="LONG", client_order_id=None):
+    # SL schliesst die Position: LONG → SELL STOP_MARKET unter, SHORT → BUY STOP_MARKET über dem Einstieg
 
     params_dict = {
         "symbol": symbol,
-        "side": "SELL",
+        "side": SEITEN[position_side.upper()].schliessen,
         "type": "STOP_MARKET",
-        "stopPrice": round(stop_price, 6),
-        "quantity": round(quantity, 6),
-        "positionSide": position_side,
-        "timestamp": timestamp,
+        "stopPrice": kontrakt_cache.preis(symbol, stop_price),
+        "quantity": kontrakt_cache.menge(symbol, quantity),
+        "positionSide": position_side.upper(),
         "timeInForce": "GTC"
     }
 
-    query_string = "&".join(f"{k}={params_dict[k]}" for k in sorted(params_dict))
-    signature = generate_signature(secret_key, query_string)
-    params_dict["signature"] = signature
-
-    url = f"{BASE_URL}{ORDER_ENDPOINT}"
-    headers = {
-        "X-BX-APIKEY": api_key,
-        "Content-Type": "application/json"
-    }
-
-    response = requests.post(url, headers=headers, json=params_dict)
-    return response.json()
+    if client_order_id:
+        params_dict["clientOrderID"] = client_order_id
+    return sende_order(api_key, secret_key, params_dict)
 
 def send_signed_request(http_method, endpoint, api_key, secret_key, params=None):
     if params is None:
@@ -229,34 +1990,34 @@ def send_signed_request(http_method, endpoint, api_key, secret_key, params=None)
     timestamp = int(time.time() * 1000)
     params['timestamp'] = timestamp
 
-    query_string = "&".join(f"{k}={params[k]}" for k in sorted(params))
-    signature = hmac.new(secret_key.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-    params['signature'] = signature
+    signierer(secret_key).signiere(params)
 
     url = f"{BASE_URL}{endpoint}"
     headers = {"X-BX-APIKEY": api_key}
 
     if http_method == "GET":
-        response = requests.get(url, headers=headers, params=params)
+        response = konten.client(api_key).get(url, headers=headers, params=params)
     elif http_method == "POST":
-        response = requests.post(url, headers=headers, json=params)
+        response = konten.client(api_key).post(url, headers=headers, json=params)
     elif http_method == "DELETE":
-        response = requests.delete(url, headers=headers, params=params)
+        response = konten.client(api_key).delete(url, headers=headers, params=params)
     else:
         raise ValueError("Unsupported HTTP method")
+    if http_method != "GET" and "/trade/" in endpoint:
+        konten.nach_trade(api_key, params.get("symbol"))   # z.B. Hebel: Position neu lesen
 
     return response.json()
 
-def get_current_position(api_key, secret_key, symbol, position_side, logs=None):
+def get_current_position(api_key, secret_key, symbol, position_side, logs=None, frisch=False):
+    # frisch=True: immer per REST (z.B. Fill-Bestätigung)
     endpoint = "/openApi/swap/v2/user/positions"
     params = {"symbol": symbol}
-    response = send_signed_request("GET", endpoint, api_key, secret_key, params)
+    response = konto_lesen(api_key, "position", symbol, lambda: send_signed_request("GET", endpoint, api_key, secret_key, params), frisch)
 
     positions = response.get("data", [])
     raw_positions = positions if isinstance(positions, list) else []
 
-    if logs is not None:
-        logs.append(f"Positions Rohdaten: {raw_positions}")
+    log_debug(logs, "Positions Rohdaten: {}", raw_positions)
 
     position_size = 0
     liquidation_price = None
@@ -264,8 +2025,7 @@ def get_current_position(api_key, secret_key, symbol, position_side, logs=None):
     if response.get("code") == 0:
         for pos in positions:
             if pos.get("symbol") == symbol and pos.get("positionSide", "").upper() == position_side.upper():
-                if logs is not None:
-                    logs.append(f"Gefundene Position: {pos}")
+                log_debug(logs, "Gefundene Position: {}", pos)
                 try:
                     position_size = float(pos.get("size", 0)) or float(pos.get("positionAmt", 0))
                     liquidation_price = float(pos.get("liquidationPrice", 0))
@@ -282,80 +2042,186 @@ def get_current_position(api_key, secret_key, symbol, position_side, logs=None):
 
     return position_size, raw_positions, liquidation_price
 
-def place_limit_sell_order(api_key, secret_key, symbol, quantity, limit_price, position_side="LONG"):
-    timestamp = int(time.time() * 1000)
+def place_take_profit_order(api_key, secret_key, symbol, quantity, limit_price, position_side="LONG", client_order_id=None):
+    # TP schliesst die Position: LONG → SELL LIMIT über, SHORT → BUY LIMIT unter dem Durchschnittspreis
 
     params_dict = {
         "symbol": symbol,
-        "side": "SELL",
+        "side": SEITEN[position_side.upper()].schliessen,
         "type": "LIMIT",
-        "quantity": round(quantity, 6),
-        "price": round(limit_price, 6),
+        "quantity": kontrakt_cache.menge(symbol, quantity),
+        "price": kontrakt_cache.preis(symbol, limit_price),
         "timeInForce": "GTC",
-        "positionSide": position_side,
-        "timestamp": timestamp
+        "positionSide": position_side.upper()
     }
 
-    query_string = "&".join(f"{k}={params_dict[k]}" for k in sorted(params_dict))
-    signature = generate_signature(secret_key, query_string)
-    params_dict["signature"] = signature
-
-    url = f"{BASE_URL}{ORDER_ENDPOINT}"
-    headers = {
-        "X-BX-APIKEY": api_key,
-        "Content-Type": "application/json"
-    }
-
-    response = requests.post(url, headers=headers, json=params_dict)
-    return response.json()
+    if client_order_id:
+        params_dict["clientOrderID"] = client_order_id
+    return sende_order(api_key, secret_key, params_dict)
 
 def firebase_loesche_base_order_time(botname, firebase_secret):
     #    Löscht den Base-Order-Zeitpunkt eines Bots in Firebase.
     try:
-        url = f"{FIREBASE_URL}/base_order_time/{botname}.json?auth={firebase_secret}"
-        response = requests.delete(url)
-        response.raise_for_status()
-        return f"Base-Order-Zeitpunkt für {botname} gelöscht, Status: {response.status_code}"
+        if not firebase_vormerken(f"base_order_time/{botname}", None, firebase_secret):
+            return "Firebase nicht konfiguriert"
+        return f"Base-Order-Zeitpunkt für {botname} zum Löschen vorgemerkt"
     except Exception as e:
         return f"Fehler beim Löschen des Base-Order-Zeitpunkts für {botname}: {e}"
     
 
+### Telegram
+# Meldungen werden nur vorgemerkt; ein Hintergrund-Thread sammelt sie pro Bot TELEGRAM_FENSTER Sekunden lang
+# und schickt sie als eine Nachricht. Gesendet wird höchstens mit TELEGRAM_RATE Nachrichten pro Sekunde und Chat;
+# bei 429 wird retry_after abgewartet, bei 5xx / Verbindungsfehlern bis TELEGRAM_WIEDERHOLUNGEN mal wiederholt.
+
+TELEGRAM_MAX_LAENGE = 4096
+
+
+def _telegram_teile(text):
+    # Telegram nimmt höchstens 4096 Zeichen pro Nachricht
+    return [text[i:i + TELEGRAM_MAX_LAENGE] for i in range(0, len(text), TELEGRAM_MAX_LAENGE)] or [""]
+
+
+class TelegramVersand:
+    def __init__(self, fenster=TELEGRAM_FENSTER, rate=TELEGRAM_RATE, max_offen=TELEGRAM_MAX_OFFEN):
+        self.fenster = fenster
+        self.max_offen = max_offen
+        self.rate = rate
+        self._buckets = {}   # chat_id → TokenBucket ohne Burst: Nachrichten in denselben Chat im Abstand 1/rate
+        self._session = requests.Session()
+        self._cond = threading.Condition()
+        self._offen = OrderedDict()   # botname → [fällig, [Texte]]; gleiches Fenster → Reihenfolge = Fälligkeit
+        self._anzahl = 0
+        self._stop = False
+        self._thread = None
+        self.gesendet = 0
+        self.verworfen = 0
+
+    def melden(self, botname, text):
+        # False, wenn die Warteschlange voll ist
+        with self._cond:
+            if self._anzahl >= self.max_offen or self._stop:
+                self.verworfen += 1
+                zaehler.erhoehen("fehler", art="telegram_verworfen")
+                return False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._schleife, name="telegram", daemon=True)
+                self._thread.start()
+            eintrag = self._offen.get(botname)
+            if eintrag is None:
+                eintrag = self._offen[botname] = [time.monotonic() + self.fenster, []]
+                self._cond.notify()
+            eintrag[1].append(text)
+            self._anzahl += 1
+        return True
+
+    def offen(self):
+        with self._cond:
+            return self._anzahl
+
+    def stop(self, timeout=10):
+        # Offenes sofort senden und den Thread beenden
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _schleife(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._offen:
+                        botname, (faellig, texte) = next(iter(self._offen.items()))
+                        warten = faellig - time.monotonic()
+                        if warten <= 0 or self._stop:
+                            del self._offen[botname]
+                            self._anzahl -= len(texte)
+                            break
+                    elif self._stop:
+                        return
+                    else:
+                        warten = None
+                    self._cond.wait(warten)
+            for teil in _telegram_teile(f"[{botname}] " + "\n\n".join(texte)):
+                self._senden(teil)
+
+    def _bucket(self, chat_id):
+        # nur der Versand-Thread greift zu
+        if self.rate <= 0:
+            return None
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self.rate, burst=1)
+        return bucket
+
+    def _senden(self, text):
+        url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_TOKEN}/sendMessage"
+        payload = {"chat_id": TELEGRAM_CHAT_ID, "text": text}
+        bucket = self._bucket(TELEGRAM_CHAT_ID)
+        fehler = None
+        for versuch in range(TELEGRAM_WIEDERHOLUNGEN + 1):
+            if versuch:
+                time.sleep(order_backoff(versuch))
+            if bucket is not None:
+                bucket.nehmen()
+            try:
+                with stufe("telegram"):
+                    response = self._session.post(url, json=payload, timeout=10)
+            except requests.RequestException as e:
+                fehler = e
+                continue
+            if response.status_code == 200:
+                self.gesendet += 1
+                return True
+            fehler = f"Status {response.status_code}: {response.text[:200]}"
+            if response.status_code == 429:
+                try:
+                    pause = float(response.json().get("parameters", {}).get("retry_after", 1))
+                except (ValueError, AttributeError):
+                    pause = 1.0
+                if bucket is not None:
+                    bucket.sperren(pause)
+                else:
+                    time.sleep(pause)
+            elif response.status_code < 500:
+                break   # dauerhafter Fehler (z.B. falscher Token oder Chat)
+        zaehler.erhoehen("fehler", art="telegram")
+        print(f"Telegram: Nachricht nicht gesendet: {fehler}")
+        return False
+
+
+telegram_versand = TelegramVersand()
+atexit.register(telegram_versand.stop)
+
+
 def sende_telegram_nachricht(botname, text):
+    # blockiert nicht: die Nachricht geht gebündelt aus dem Hintergrund-Thread raus
     if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
         return "Telegram nicht konfiguriert"
-    full_text = f"[{botname}] {text}"
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": full_text}
-    response = requests.post(url, json=payload)
-    return f"Telegram Antwort: {response.status_code}"
-
-    query_string = "&".join(f"{k}={params_dict[k]}" for k in sorted(params_dict))
-    signature = generate_signature(secret_key, query_string)
-    params_dict["signature"] = signature
-
-    url = f"{BASE_URL}{ORDER_ENDPOINT}"
-    headers = {
-        "X-BX-APIKEY": api_key,
-        "Content-Type": "application/json"
-    }
+    if not telegram_versand.melden(botname, text):
+        return "Telegram Warteschlange voll, Nachricht verworfen"
+    return "Telegram vorgemerkt"
 
-    response = requests.post(url, headers=headers, json=params_dict)
-    return response.json()
 
 def get_open_orders(api_key, secret_key, symbol):
-    timestamp = int(time.time() * 1000)
-    params = f"symbol={symbol}&timestamp={timestamp}"
-    signature = generate_signature(secret_key, params)
-    url = f"{BASE_URL}{OPEN_ORDERS_ENDPOINT}?{params}&signature={signature}"
-    headers = {"X-BX-APIKEY": api_key}
-    response = requests.get(url, headers=headers)
+    def abfrage():
+        timestamp = int(time.time() * 1000)
+        params = f"symbol={symbol}&timestamp={timestamp}"
+        signature = generate_signature(secret_key, params)
+        url = f"{BASE_URL}{OPEN_ORDERS_ENDPOINT}?{params}&signature={signature}"
+        headers = {"X-BX-APIKEY": api_key}
+        response = konten.client(api_key).get(url, headers=headers)
 
-    try:
-        data = response.json()
-    except ValueError:
-        return {"code": -1, "msg": "Ungültige API-Antwort", "raw_response": response.text}
+        try:
+            data = response.json()
+        except ValueError:
+            return {"code": -1, "msg": "Ungültige API-Antwort", "raw_response": response.text}
 
-    return data
+        return data
+
+    return konto_lesen(api_key, "open_orders", symbol, abfrage)
 
 def cancel_order(api_key, secret_key, symbol, order_id):
     timestamp = int(time.time() * 1000)
@@ -363,65 +2229,147 @@ def cancel_order(api_key, secret_key, symbol, order_id):
     signature = generate_signature(secret_key, params)
     url = f"{BASE_URL}{ORDER_ENDPOINT}?{params}&signature={signature}"
     headers = {"X-BX-APIKEY": api_key}
-    response = requests.delete(url, headers=headers)
+    try:
+        response = konten.client(api_key).delete(url, headers=headers)
+    finally:
+        konten.nach_trade(api_key, symbol, position=False)
     return response.json()
 
+def cancel_orders_batch(api_key, secret_key, symbol, order_ids):
+    """
+    Löscht alle übergebenen Orders eines Symbols mit einem einzigen Aufruf (BingX batchOrders DELETE).
+    Rückgabe pro Order: {orderId: {"ok": True/False, "msg": ...}}.
+    Lehnt BingX den Sammelaufruf ab, werden die Orders wie bisher einzeln mit cancel_order() gelöscht.
+    """
+    order_ids = [str(order_id) for order_id in order_ids if order_id is not None]
+    if not order_ids:
+        return {}
+    ergebnisse = {}
+    try:
+        timestamp = int(time.time() * 1000)
+        params = f"orderIdList=[{','.join(order_ids)}]&symbol={symbol}&timestamp={timestamp}"
+        signature = generate_signature(secret_key, params)
+        url = f"{BASE_URL}{BATCH_ORDERS_ENDPOINT}?{params}&signature={signature}"
+        headers = {"X-BX-APIKEY": api_key}
+        try:
+            antwort = konten.client(api_key).delete(url, headers=headers).json()
+        finally:
+            konten.nach_trade(api_key, symbol, position=False)
+        if isinstance(antwort, dict) and antwort.get("code") == 0:
+            daten = antwort.get("data") or {}
+            for order in daten.get("success") or []:
+                ergebnisse[str(order.get("orderId"))] = {"ok": True, "msg": order.get("status", "CANCELLED")}
+            for order in daten.get("failed") or []:
+                ergebnisse[str(order.get("orderId"))] = {"ok": False, "msg": f"{order.get('errorCode')}: {order.get('errorMessage')}"}
+            for order_id in order_ids:
+                ergebnisse.setdefault(order_id, {"ok": False, "msg": "keine Rückmeldung im Sammelaufruf"})
+            return ergebnisse
+    except Exception:
+        pass
+
+    # Fallback: einzeln löschen
+    for order_id in order_ids:
+        try:
+            antwort = cancel_order(api_key, secret_key, symbol, order_id)
+            ergebnisse[order_id] = {"ok": antwort.get("code") == 0, "msg": antwort.get("msg") or (antwort.get("data") or {}).get("order", {}).get("status")}
+        except Exception as e:
+            ergebnisse[order_id] = {"ok": False, "msg": str(e)}
+    return ergebnisse
+
+def ersetze_schutz_orders(api_key, secret_key, symbol, position_side, quantity, tp_preis, sl_preis, alte_order_ids,
+                          tp_client_id=None, sl_client_id=None):
+    """
+    Ersetzt Take-Profit (LIMIT) und Stop-Loss (STOP_MARKET) einer Position mit zwei Aufrufen:
+    neue TP- und SL-Order zusammen per batchOrders POST setzen, danach die alten Orders per batchOrders DELETE löschen.
+    Was der Sammelauftrag nicht setzen konnte, wird wie bisher nach dem Löschen einzeln gesetzt.
+    tp_preis / sl_preis = None → diese Order wird nicht gesetzt. tp_client_id / sl_client_id: clientOrderID der neuen Orders.
+    Rückgabe: (tp_antwort, sl_antwort, cancel_ergebnisse); Antworten im Format der Einzel-Order {"code": 0, "data": {"order": {...}}}.
+    """
+    seite = SEITEN[position_side.upper()].schliessen
+    neue = {}
+    if tp_preis:
+        neue["LIMIT"] = {"symbol": symbol, "side": seite, "positionSide": position_side.upper(), "type": "LIMIT",
+                         "quantity": kontrakt_cache.menge(symbol, quantity), "price": kontrakt_cache.preis(symbol, tp_preis),
+                         "timeInForce": "GTC"}
+    if sl_preis:
+        neue["STOP_MARKET"] = {"symbol": symbol, "side": seite, "positionSide": position_side.upper(), "type": "STOP_MARKET",
+                               "quantity": kontrakt_cache.menge(symbol, quantity), "stopPrice": kontrakt_cache.preis(symbol, sl_preis),
+                               "timeInForce": "GTC"}
+    client_ids = {"LIMIT": tp_client_id, "STOP_MARKET": sl_client_id}
+    for typ, order in neue.items():
+        if client_ids[typ]:
+            order["clientOrderID"] = client_ids[typ]
+
+    antworten = {}
+    unklar = False   # Sammelauftrag ohne Antwort: die Orders können trotzdem gesetzt worden sein
+    if neue:
+        try:
+            batch = json.dumps(list(neue.values()), separators=(",", ":"))
+            timestamp = int(time.time() * 1000)
+            signature = generate_signature(secret_key, f"batchOrders={batch}&timestamp={timestamp}")
+            url = f"{BASE_URL}{BATCH_ORDERS_ENDPOINT}?batchOrders={quote(batch, safe='')}&timestamp={timestamp}&signature={signature}"
+            headers = {"X-BX-APIKEY": api_key}
+            try:
+                antwort = konten.client(api_key).post(url, headers=headers).json()
+            finally:
+                konten.nach_trade(api_key, symbol, position=False)   # TP/SL ändern die Position nicht
+            if isinstance(antwort, dict) and antwort.get("code") == 0:
+                for order in (antwort.get("data") or {}).get("orders") or []:
+                    if order.get("type") in neue and order.get("orderId"):
+                        antworten[order["type"]] = {"code": 0, "msg": "", "data": {"order": order}}
+        except (requests.Timeout, requests.ConnectionError):
+            unklar = True
+        except Exception:
+            pass
+
+    cancel_ergebnisse = cancel_orders_batch(api_key, secret_key, symbol, alte_order_ids)
+
+    if unklar:
+        for typ in neue:
+            if client_ids[typ]:
+                try:
+                    order = hole_order_per_client_id(api_key, secret_key, symbol, client_ids[typ])
+                except Exception:
+                    order = None
+                if order:
+                    antworten[typ] = {"code": 0, "msg": "", "data": {"order": order}}
+
+    # Fallback: nicht gesetzte Orders einzeln (wie vor dem Sammelauftrag)
+    if "LIMIT" in neue and "LIMIT" not in antworten:
+        antworten["LIMIT"] = place_take_profit_order(api_key, secret_key, symbol, quantity, tp_preis, position_side, tp_client_id)
+    if "STOP_MARKET" in neue and "STOP_MARKET" not in antworten:
+        antworten["STOP_MARKET"] = place_stop_loss_order(api_key, secret_key, symbol, quantity, sl_preis, position_side, sl_client_id)
+    return antworten.get("LIMIT"), antworten.get("STOP_MARKET"), cancel_ergebnisse
+
 # --- Firebase Funktionen jetzt mit botname statt asset ---
 def firebase_speichere_ordergroesse(botname, betrag, firebase_secret):
-    url = f"{FIREBASE_URL}/ordergroesse/{botname}.json?auth={firebase_secret}"
     data = {"usdt_amount": betrag}
-    response = requests.put(url, json=data)
-    return f"Ordergröße für {botname} gespeichert: {betrag}, Status: {response.status_code}"
+    if not firebase_vormerken(f"ordergroesse/{botname}", data, firebase_secret):
+        return "Firebase nicht konfiguriert"
+    return f"Ordergröße für {botname} vorgemerkt: {betrag}"
 
 def firebase_set_aktueller_bot(bot_nr, botname, firebase_secret):
-    url = f"{FIREBASE_URL}/aktueller_Bot/{bot_nr}.json?auth={firebase_secret}"
     data = {
         "botname": botname
     }
-    response = requests.put(url, json=data)
-    return f"aktueller_Bot[{bot_nr}] gesetzt: {botname}, Status: {response.status_code}"
+    if not firebase_vormerken(f"aktueller_Bot/{bot_nr}", data, firebase_secret):
+        return "Firebase nicht konfiguriert"
+    return f"aktueller_Bot[{bot_nr}] vorgemerkt: {botname}"
 
 
 def firebase_delete_aktueller_bot(bot_nr, firebase_secret):
-    url = f"{FIREBASE_URL}/aktueller_Bot/{bot_nr}.json?auth={firebase_secret}"
-    response = requests.delete(url)
-    return f"aktueller_Bot[{bot_nr}] gelöscht, Status: {response.status_code}"
+    if not firebase_vormerken(f"aktueller_Bot/{bot_nr}", None, firebase_secret):
+        return "Firebase nicht konfiguriert"
+    return f"aktueller_Bot[{bot_nr}] zum Löschen vorgemerkt"
 
 
-def firebase_bot_is_active(bot_nr, botname, firebase_secret):
-    url = f"{FIREBASE_URL}/aktueller_Bot.json?auth={firebase_secret}"
+def firebase_lese_ordergroesse(botname, firebase_secret):
     try:
-        response = requests.get(url)
-        if response.status_code != 200:
-            return False  # Fehler beim Zugriff auf Firebase
-
-        aktueller_bot_firebase = response.json()  # sollte dict oder None sein
-        if not aktueller_bot_firebase:
-            return False  # kein Eintrag vorhanden
-
-        # Prüfen, ob bot_nr vorhanden ist
-        if str(bot_nr) in aktueller_bot_firebase:
-            # Prüfen, ob botname übereinstimmt
-            if aktueller_bot_firebase[str(bot_nr)] == botname:
-                return True
-            else:
-                return False
-        else:
-            return False
-
+        data = firebase_cache.lesen(f"ordergroesse/{botname}", firebase_secret)
     except Exception as e:
-        print(f"Fehler bei Firebase-Abfrage: {e}")
-        return False
-
-
-
-def firebase_lese_ordergroesse(botname, firebase_secret):
-    url = f"{FIREBASE_URL}/ordergroesse/{botname}.json?auth={firebase_secret}"
-    response = requests.get(url)
-    if response.status_code != 200:
+        print(f"[Fehler] Firebase ordergroesse/{botname}: {e}")
         return None
     try:
-        data = response.json()
         if isinstance(data, dict) and "usdt_amount" in data:
             return float(data["usdt_amount"])
         elif isinstance(data, (int, float)):
@@ -431,95 +2379,82 @@ def firebase_lese_ordergroesse(botname, firebase_secret):
     return None
 
 def firebase_loesche_ordergroesse(botname, firebase_secret):
-    url = f"{FIREBASE_URL}/ordergroesse/{botname}.json?auth={firebase_secret}"
-    response = requests.delete(url)
-    return f"Ordergröße für {botname} gelöscht, Status: {response.status_code}"
+    if not firebase_vormerken(f"ordergroesse/{botname}", None, firebase_secret):
+        return "Firebase nicht konfiguriert"
+    return f"Ordergröße für {botname} zum Löschen vorgemerkt"
+
+def kaufpreis_eintrag(price, usdt_amount, summen):
+    # Eintrag unter kaufpreise/{botname}; die laufenden Summen werden mitgespeichert,
+    # damit nach einem Neustart der letzte Eintrag genügt
+    data = {"price": price, "usdt_amount": usdt_amount}
+    if summen is not None:
+        data["summe_wert"], data["summe_menge"], data["anzahl"] = summen
+    return data
 
 def firebase_speichere_kaufpreis(botname, price, usdt_amount, firebase_secret):
-    import requests
-
+    def speichern(summen):
+        # wie POST: neuer chronologischer Schlüssel unter kaufpreise/{botname}
+        if not firebase_vormerken(f"kaufpreise/{botname}/{firebase_push_id()}", kaufpreis_eintrag(price, usdt_amount, summen), firebase_secret):
+            raise Exception("Fehler beim Speichern: Firebase nicht konfiguriert")
 
-    # Daten, die gespeichert werden sollen
-    data = {
-        "price": price,
-        "usdt_amount": usdt_amount
-    }
-
-    # URL zusammenbauen mit Authentifizierung
-    url = f"{FIREBASE_URL}/kaufpreise/{botname}.json?auth={firebase_secret}"
-
-    # HTTP PUT oder POST, je nach Bedarf
-    response = requests.post(url, json=data)
-
-    if response.status_code == 200:
-        return f"Kaufpreis für {botname} erfolgreich gespeichert."
-    else:
-        raise Exception(f"Fehler beim Speichern: {response.text}")
+    bot_state.erfasse_kauf(botname, price, usdt_amount, speichern)
+    return f"Kaufpreis für {botname} erfolgreich vorgemerkt."
 
 def firebase_loesche_kaufpreise(botname, firebase_secret):
-    url = f"{FIREBASE_URL}/kaufpreise/{botname}.json?auth={firebase_secret}"
-    response = requests.delete(url)
-    if response.status_code == 200:
-        return f"Kaufpreise für {botname} gelöscht."
-    return f"Fehler beim Löschen der Kaufpreise für {botname}: Status {response.status_code}"
+    if firebase_vormerken(f"kaufpreise/{botname}", None, firebase_secret):
+        bot_state.loesche_kaeufe(botname)
+        return f"Kaufpreise für {botname} zum Löschen vorgemerkt."
+    return f"Fehler beim Löschen der Kaufpreise für {botname}: Firebase nicht konfiguriert"
 
-def firebase_lese_kaufpreise(botname, firebase_secret):
+def firebase_lese_kaufsummen(botname, firebase_secret):
+    """
+    Laufende Summen (Σ price*usdt_amount, Σ usdt_amount, Anzahl) nach einem Neustart wiederherstellen.
+    Zuerst nur den letzten Eintrag lesen (Push-IDs sind chronologisch); nur wenn dieser noch keine
+    Summen enthält (ältere Einträge), wird die ganze Liste geladen. None bei Fehler.
+    """
+    firebase_writer.vor_lesen(f"kaufpreise/{botname}")
     try:
         url = f"{FIREBASE_URL}/kaufpreise/{botname}.json?auth={firebase_secret}"
-        r = requests.get(url)
-        print(f"Firebase Antwort Status: {r.status_code}")
-        print(f"Firebase Antwort Inhalt: {r.text}")
-        daten = r.json()
-        if not daten:
-            print("Keine Daten unter kaufpreise/{botname} gefunden")
-            return []
-        # Werte in Liste umwandeln
-        return [{"price": float(v.get("price", 0)), "usdt_amount": float(v.get("usdt_amount", 0))} for v in daten.values()]
+        r = firebase_session.get(url, params={"orderBy": '"$key"', "limitToLast": 1}, timeout=5)
+        if r.status_code != 200:
+            return None
+        letzter = r.json()
+        if not letzter:
+            return 0.0, 0.0, 0
+        eintrag = next(iter(letzter.values()))
+        if isinstance(eintrag, dict) and "anzahl" in eintrag:
+            return float(eintrag["summe_wert"]), float(eintrag["summe_menge"]), int(eintrag["anzahl"])
+
+        r = firebase_session.get(url, timeout=5)
+        if r.status_code != 200:
+            return None
+        daten = r.json() or {}
+        return kaufsummen_aus_liste([{"price": float(v.get("price", 0)), "usdt_amount": float(v.get("usdt_amount", 0))} for v in daten.values()])
     except Exception as e:
-        print(f"Fehler beim Lesen der Kaufpreise: {e}")
-        return []
+        print(f"Fehler beim Lesen der Kaufsummen für {botname}: {e}")
+        return None
 
 
 def firebase_setze_ma_wert(bot_nr, wert, firebase_secret):
     try:
-        url = f"{FIREBASE_URL}/MA/{bot_nr}.json?auth={firebase_secret}"
-        response = requests.put(url, json=wert)  # <-- sauber
-        return f"MA/{bot_nr} = {wert} gesetzt. Status: {response.status_code}, Body: {response.text}"
+        if not firebase_vormerken(f"MA/{bot_nr}", wert, firebase_secret):
+            return "Firebase nicht konfiguriert"
+        return f"MA/{bot_nr} = {wert} vorgemerkt."
     except Exception as e:
         return f"Exception beim Setzen von MA/{bot_nr}: {e}"
 
-def firebase_loesche_ma_bot(bot_nr, firebase_secret):
-    try:
-        url = f"{FIREBASE_URL}/MA/{bot_nr}.json?auth={firebase_secret}"
-        response = requests.delete(url)
-
-        if response.status_code == 200:
-            return f"MA/{bot_nr} erfolgreich gelöscht."
-        else:
-            return f"Fehler beim Löschen von MA/{bot_nr}: Status {response.status_code}"
-
-    except Exception as e:
-        return f"Exception beim Löschen von MA/{bot_nr}: {e}"
-
 def firebase_lese_ma_wert(bot_nr, firebase_secret):
     try:
-        url = f"{FIREBASE_URL}/MA/{bot_nr}.json?auth={firebase_secret}"
-        r = requests.get(url, timeout=5)
-        if r.status_code != 200:
-            return 0
-        val = r.json()
+        val = firebase_cache.lesen(f"MA/{bot_nr}", firebase_secret)
         return int(val) if val is not None else 0
     except Exception as e:
         print(f"Fehler beim Lesen von MA/{bot_nr}: {e}")
         return 0
         
 
-def berechne_durchschnittspreis(käufe):
-    if not käufe:
-        return None
-
-    gesamtwert = 0
-    gesamtmenge = 0
+def kaufsummen_aus_liste(käufe):
+    gesamtwert = 0.0
+    gesamtmenge = 0.0
 
     for kauf in käufe:
         preis = float(kauf.get("price", 0))
@@ -527,17 +2462,19 @@ def berechne_durchschnittspreis(käufe):
         gesamtwert += preis * menge
         gesamtmenge += menge
 
+    return gesamtwert, gesamtmenge, len(käufe)
+
+def durchschnitt_aus_summen(summen):
+    if not summen:
+        return None
+    gesamtwert, gesamtmenge, _ = summen
     if gesamtmenge == 0:
         return None
-
     return round(gesamtwert / gesamtmenge, 6)
 
 def firebase_lese_base_order_time(botname, firebase_secret):
     try:
-        url = f"{FIREBASE_URL}/base_order_time/{botname}.json?auth={firebase_secret}"
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = firebase_cache.lesen(f"base_order_time/{botname}", firebase_secret)
         if data:
             return data.get("base_order_time")  # ISO-Zeitstring
         return None
@@ -557,1837 +2494,1245 @@ def set_leverage(api_key, secret_key, symbol, leverage, position_side="LONG"):
     return send_signed_request("POST", endpoint, api_key, secret_key, params)
 
 
-### SHORT Funktionen
-# === Hilfsfunktionen ===
-# === SHORT Hilfsfunktionen ===
-def SHORT_generate_signature(secret_key: str, params: str) -> str:
-    return hmac.new(secret_key.encode('utf-8'), params.encode('utf-8'), hashlib.sha256).hexdigest()
+def poll_mit_backoff(abfrage, erfuellt, max_wartezeit):
+    """
+    Ruft abfrage() so lange mit exponentiell wachsendem Abstand auf, bis erfuellt(ergebnis) True ist
+    oder max_wartezeit (Sekunden) erreicht ist. Rückgabe: (letztes Ergebnis, erfüllt ja/nein)
+    """
+    deadline = time.monotonic() + max_wartezeit
+    intervall = POLL_START_INTERVALL
+    while True:
+        ergebnis = abfrage()
+        if erfuellt(ergebnis):
+            return ergebnis, True
+        rest = deadline - time.monotonic()
+        if rest <= 0:
+            return ergebnis, False
+        with stufe("warten.poll"):
+            time.sleep(min(intervall, rest))
+        intervall = min(intervall * 2, POLL_MAX_INTERVALL)
+
+
+def warte_auf_hebel(api_key, secret_key, symbol, leverage, position_side="LONG", max_wartezeit=LEVERAGE_TIMEOUT):
+    # Ersetzt das feste sleep nach set_leverage: fragt den Hebel ab, bis BingX den neuen Wert liefert
+    endpoint = "/openApi/swap/v2/trade/leverage"
+    feld = "longLeverage" if position_side.upper() == "LONG" else "shortLeverage"
 
-def SHORT_send_signed_request(http_method, endpoint, api_key, secret_key, params=None):
-    if params is None:
-        params = {}
-    timestamp = int(time.time() * 1000)
-    params['timestamp'] = timestamp
-    # create canonical query string by sorting keys
-    query_string = "&".join(f"{k}={params[k]}" for k in sorted(params))
-    signature = hmac.new(secret_key.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-    params['signature'] = signature
-    url = f"{BASE_URL}{endpoint}"
-    headers = {"X-BX-APIKEY": api_key}
-    if http_method == "GET":
-        response = requests.get(url, headers=headers, params=params)
-    elif http_method == "POST":
-        response = requests.post(url, headers=headers, json=params)
-    elif http_method == "DELETE":
-        response = requests.delete(url, headers=headers, params=params)
-    else:
-        raise ValueError("Unsupported HTTP method")
-    try:
-        return response.json()
-    except Exception:
-        return {"code": -1, "msg": "Ungültige API-Antwort", "raw": response.text}
+    def uebernommen(response):
+        try:
+            return response.get("code") == 0 and int(float(response.get("data", {}).get(feld, 0))) == int(leverage)
+        except (ValueError, TypeError, AttributeError):
+            return False
 
-def SHORT_get_futures_balance(api_key: str, secret_key: str):
-    timestamp = int(time.time() * 1000)
-    params = f"timestamp={timestamp}"
-    signature = generate_signature(secret_key, params)
-    url = f"{BASE_URL}{BALANCE_ENDPOINT}?{params}&signature={signature}"
-    headers = {"X-BX-APIKEY": api_key}
-    resp = requests.get(url, headers=headers)
-    try:
-        return resp.json()
-    except Exception:
-        return {"code": -1, "msg": "Ungültige Balance-Antwort", "raw": resp.text}
+    _, ok = poll_mit_backoff(
+        lambda: send_signed_request("GET", endpoint, api_key, secret_key, {"symbol": symbol}),
+        uebernommen,
+        max_wartezeit
+    )
+    return ok
 
-def SHORT_get_current_price(symbol: str):
-    url = f"{BASE_URL}{PRICE_ENDPOINT}?symbol={symbol}"
-    resp = requests.get(url)
-    try:
-        data = resp.json()
-        if data.get("code") == 0 and "data" in data and "price" in data["data"]:
-            return float(data["data"]["price"])
-    except Exception:
-        pass
-    return None
 
-# === Firebase helper functions (kopiert / angepasst) ===
-def SHORT_firebase_speichere_base_order_time(botname, timestamp, firebase_secret):
+def warte_auf_fill(api_key, secret_key, symbol, position_side, order_response, vorher_size, max_wartezeit=FILL_TIMEOUT, logs=None):
+    """
+    Ersetzt das feste sleep nach der Market-Order.
+    Fragt die Position ab, bis sie um die ausgeführte Menge (executedQty) bzw. überhaupt gewachsen ist,
+    höchstens max_wartezeit Sekunden lang.
+    Rückgabe: (position_size, raw_positions, liquidation_price) der letzten Abfrage, damit der Aufrufer
+    die Position nicht noch einmal lesen muss.
+    """
     try:
-        url = f"{FIREBASE_URL}/base_order_time/{botname}.json?auth={firebase_secret}"
-        data = {"base_order_time": timestamp.isoformat()}
-        response = requests.put(url, json=data)
-        return f"Base-Order-Zeit für {botname} gespeichert: {timestamp}, Status: {response.status_code}"
-    except Exception as e:
-        return f"Fehler beim Speichern der Base-Order-Zeit: {e}"
+        executed_qty = float(order_response.get("data", {}).get("order", {}).get("executedQty") or 0)
+    except (ValueError, TypeError, AttributeError):
+        executed_qty = 0.0
+    vorher = abs(float(vorher_size or 0))
+    ziel = vorher + executed_qty * 0.999 if executed_qty > 0 else None
+
+    def gefuellt(position):
+        size = abs(float(position[0] or 0))
+        return size >= ziel if ziel is not None else size > vorher
+
+    start = time.monotonic()
+    position, ok = poll_mit_backoff(
+        lambda: get_current_position(api_key, secret_key, symbol, position_side, frisch=True),
+        gefuellt,
+        max_wartezeit
+    )
+    if logs is not None:
+        dauer = time.monotonic() - start
+        if ok:
+            logs.append(f"Fill bestätigt nach {dauer:.2f}s: Position {vorher} → {position[0]}, Liquidation price: {position[2]}")
+        else:
+            logs.append(f"⚠️ Fill nach {dauer:.2f}s nicht bestätigt (Obergrenze {max_wartezeit}s): Position {position[0]}")
+        log_debug(logs, "Positions Rohdaten: {}", position[1])
+    return position
 
-def SHORT_firebase_loesche_base_order_time(botname, firebase_secret):
-    try:
-        url = f"{FIREBASE_URL}/base_order_time/{botname}.json?auth={firebase_secret}"
-        r = requests.delete(url)
-        return f"Base-Order-Zeitpunkt für {botname} gelöscht, Status: {r.status_code}"
-    except Exception as e:
-        return f"Fehler beim Löschen base_order_time: {e}"
 
-def SHORT_firebase_speichere_ordergroesse(botname, betrag, firebase_secret):
-    try:
-        url = f"{FIREBASE_URL}/ordergroesse/{botname}.json?auth={firebase_secret}"
-        data = {"usdt_amount": betrag}
-        r = requests.put(url, json=data)
-        return f"Ordergröße für {botname} gespeichert: {betrag}, Status: {r.status_code}"
-    except Exception as e:
-        return f"Fehler beim Speichern ordergroesse: {e}"
+### Abgleich Snapshot ↔ Firebase
+# Nach einem Neustart arbeitet jeder Bot sofort mit dem lokalen Snapshot. Beim ersten Signal eines Bots
+# (erst dann ist das FIREBASE_SECRET bekannt) werden im Hintergrund die in Firebase gespiegelten Felder
+# verglichen; nur abweichende Werte (z.B. von Hand in Firebase geändert) werden übernommen.
 
-def SHORT_firebase_lese_ordergroesse(botname, firebase_secret):
-    try:
-        url = f"{FIREBASE_URL}/ordergroesse/{botname}.json?auth={firebase_secret}"
-        r = requests.get(url)
-        if r.status_code != 200:
-            return None
-        data = r.json()
-        if isinstance(data, dict) and "usdt_amount" in data:
-            return float(data["usdt_amount"])
-        elif isinstance(data, (int, float)):
-            return float(data)
-    except Exception:
-        pass
+def _firebase_usdt_amount(wert):
+    if isinstance(wert, dict) and "usdt_amount" in wert:
+        return float(wert["usdt_amount"])
+    if isinstance(wert, (int, float)):
+        return float(wert)
     return None
 
-def SHORT_firebase_speichere_kaufpreis(botname, price, usdt_amount, firebase_secret):
-    try:
-        url = f"{FIREBASE_URL}/kaufpreise/{botname}.json?auth={firebase_secret}"
-        data = {"price": price, "usdt_amount": usdt_amount}
-        r = requests.post(url, json=data)
-        if r.status_code == 200:
-            return f"Kaufpreis für {botname} erfolgreich gespeichert."
-        else:
-            return f"Fehler beim Speichern Kaufpreis: {r.status_code} {r.text}"
-    except Exception as e:
-        return f"Fehler beim Speichern Kaufpreis: {e}"
-
-def SHORT_firebase_loesche_kaufpreise(botname, firebase_secret):
-    try:
-        url = f"{FIREBASE_URL}/kaufpreise/{botname}.json?auth={firebase_secret}"
-        r = requests.delete(url)
-        if r.status_code == 200:
-            return f"Kaufpreise für {botname} gelöscht."
-        return f"Fehler beim Löschen Kaufpreise: Status {r.status_code}"
-    except Exception as e:
-        return f"Fehler beim Löschen Kaufpreise: {e}"
-
-def SHORT_firebase_lese_kaufpreise(botname, firebase_secret):
-    try:
-        url = f"{FIREBASE_URL}/kaufpreise/{botname}.json?auth={firebase_secret}"
-        r = requests.get(url)
-        if r.status_code != 200:
-            return []
-        daten = r.json()
-        if not daten:
-            return []
-        return [{"price": float(v.get("price", 0)), "usdt_amount": float(v.get("usdt_amount", 0))} for v in daten.values()]
-    except Exception:
-        return []
 
-def SHORT_berechne_durchschnittspreis(käufe):
-    if not käufe:
-        return None
-    gesamtwert = 0.0
-    gesamtmenge = 0.0
-    for kauf in käufe:
-        preis = float(kauf.get("price", 0))
-        menge = float(kauf.get("usdt_amount", 0))
-        gesamtwert += preis * menge
-        gesamtmenge += menge
-    if gesamtmenge == 0:
+def _firebase_base_order_time(wert):
+    if not isinstance(wert, dict) or not wert.get("base_order_time"):
         return None
-    return round(gesamtwert / gesamtmenge, 6)
-
-# === Telegram ===
-def SHORT_sende_telegram_nachricht(botname, text):
-    if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
-        return "Telegram nicht konfiguriert"
-    full_text = f"[{botname}] {text}"
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": full_text}
-    try:
-        r = requests.post(url, json=payload, timeout=10)
-        return f"Telegram Antwort: {r.status_code}"
-    except Exception as e:
-        return f"Telegram Fehler: {e}"
+    zeitpunkt = datetime.fromisoformat(wert["base_order_time"])
+    if zeitpunkt.tzinfo is None:
+        zeitpunkt = zeitpunkt.replace(tzinfo=timezone.utc)
+    return zeitpunkt
 
-# === Order-Funktionen (SHORT-optimiert) ===
-def SHORT_set_leverage(api_key, secret_key, symbol, leverage, position_side="LONG"):
-    endpoint = "/openApi/swap/v2/trade/leverage"
 
-    params = {
-        "symbol": symbol,
-        "leverage": int(leverage),
-        "side": position_side.upper()  # LONG oder SHORT
-    }
+def _firebase_aktueller_bot(wert):
+    if isinstance(wert, dict):
+        return wert.get("botname")
+    return wert
 
-    return send_signed_request("POST", endpoint, api_key, secret_key, params)
 
-def SHORT_place_market_order(api_key, secret_key, symbol, usdt_amount, position_side="SHORT"):
-    """
-    Platzieren einer Market-Order zum ÖFFNEN einer SHORT-Position.
-    Für SHORT: side="SELL"
-    """
-    price = get_current_price(symbol)
-    if price is None:
-        return {"code": 99999, "msg": "Failed to get current price"}
-    quantity = round(float(usdt_amount) / price, 6)
-    timestamp = int(time.time() * 1000)
-    params_dict = {
-        "symbol": symbol,
-        "side": "SELL",  # SHORT eröffnen
-        "type": "MARKET",
-        "quantity": quantity,
-        "positionSide": position_side.upper(),
-        "timestamp": timestamp
+def gleiche_snapshot_ab(botname, bot_nr, firebase_secret):
+    logs = []
+    pruefungen = []   # (art, schluessel, felder, lade_funktion → Tupel der Firebase-Werte oder None)
+    if bot_state.nimm_aus_snapshot("bot", botname):
+        pruefungen += [
+            ("bot", botname, ("saved_usdt_amount",),
+             lambda: (_firebase_usdt_amount(firebase_cache.lesen(f"ordergroesse/{botname}", firebase_secret)),)),
+            ("bot", botname, ("base_order_time",),
+             lambda: (_firebase_base_order_time(firebase_cache.lesen(f"base_order_time/{botname}", firebase_secret)),)),
+            ("bot", botname, ("kauf_summe_wert", "kauf_summe_menge", "kauf_anzahl"),
+             lambda: firebase_lese_kaufsummen(botname, firebase_secret)),
+        ]
+    nr = _nr_key(bot_nr)
+    if bot_nr is not None and bot_state.nimm_aus_snapshot("nr", nr):
+        pruefungen += [
+            ("nr", nr, ("ma_wert",), lambda: (int(firebase_cache.lesen(f"MA/{nr}", firebase_secret) or 0),)),
+            ("nr", nr, ("aktueller_bot",),
+             lambda: (_firebase_aktueller_bot(firebase_cache.lesen(f"aktueller_Bot/{nr}", firebase_secret)),)),
+        ]
+
+    for art, schluessel, felder, laden in pruefungen:
+        try:
+            lokal = bot_state.hole_felder(art, schluessel, felder)
+            firebase = laden()
+            if firebase is None or lokal == tuple(firebase):
+                continue   # nicht lesbar (Snapshot behalten) oder gleich
+            if bot_state.abgleichen(art, schluessel, felder, lokal, tuple(firebase)):
+                logs.append(f"{art}/{schluessel} {', '.join(felder)}: Snapshot {lokal} → Firebase {tuple(firebase)}")
+        except Exception as e:
+            logs.append(f"Abgleich {art}/{schluessel} {', '.join(felder)} fehlgeschlagen: {e}")
+    if logs:
+        print("Snapshot-Abgleich:\n" + "\n".join(logs))
+    return logs
+
+
+### Job-Queue für Webhooks
+# /webhook nimmt das Signal nur an und reiht es pro botname ein; die eigentliche Handelslogik
+# läuft in einem Worker-Pool. Jobs desselben Bots werden strikt nacheinander abgearbeitet,
+# verschiedene Bots laufen parallel.
+
+def webhook_labels(data):
+    # Labels für die Zähler: action (base/increase/close) und Seite, unbekannte Werte zusammengefasst
+    render = data.get("RENDER") or {}
+    action = str((data.get("vyn") or {}).get("action") or "").lower() or "base"
+    seite = str(render.get("position_side") or render.get("positionSide") or "LONG").upper()
+    return {
+        "action": action if action in ("base", "increase", "close") else "andere",
+        "seite": seite if seite in SEITEN else "andere",
     }
-    query_string = "&".join(f"{k}={params_dict[k]}" for k in sorted(params_dict))
-    params_dict["signature"] = generate_signature(secret_key, query_string)
-    url = f"{BASE_URL}{ORDER_ENDPOINT}"
-    headers = {"X-BX-APIKEY": api_key, "Content-Type": "application/json"}
-    resp = requests.post(url, headers=headers, json=params_dict)
-    try:
-        return resp.json()
-    except Exception:
-        return {"code": -1, "msg": "Ungültige API-Antwort", "raw": resp.text}
 
-def SHORT_place_market_order_close(api_key, secret_key, symbol, position_amt, position_side="SHORT"):
-    """
-    Schließt eine Position via MARKET (für SHORT -> BUY)
-    position_amt: Menge (positiv)
-    """
-    side = "BUY"  # Short schließen = buy
-    timestamp = int(time.time() * 1000)
-    params = {
-        "symbol": symbol,
-        "side": side,
-        "type": "MARKET",
-        "quantity": round(abs(position_amt), 6),
-        "positionSide": position_side.upper(),
-        "timestamp": timestamp
-    }
-    query_string = "&".join(f"{k}={params[k]}" for k in sorted(params))
-    params["signature"] = generate_signature(secret_key, query_string)
-    url = f"{BASE_URL}{ORDER_ENDPOINT}"
-    headers = {"X-BX-APIKEY": api_key, "Content-Type": "application/json"}
-    resp = requests.post(url, headers=headers, json=params)
-    try:
-        return resp.json()
-    except Exception:
-        return {"code": -1, "msg": "Ungültige API-Antwort", "raw": resp.text}
 
-def SHORT_place_limit_buy_order(api_key, secret_key, symbol, quantity, limit_price, position_side="SHORT"):
-    """
-    TP für SHORT: BUY Limit (unter Entry).
-    """
-    timestamp = int(time.time() * 1000)
-    params_dict = {
-        "symbol": symbol,
-        "side": "BUY",        # um Short zu schließen -> BUY
-        "type": "LIMIT",
-        "quantity": round(quantity, 6),
-        "price": round(limit_price, 6),
-        "timeInForce": "GTC",
-        "positionSide": position_side.upper(),
-        "timestamp": timestamp
-    }
-    query_string = "&".join(f"{k}={params_dict[k]}" for k in sorted(params_dict))
-    params_dict["signature"] = generate_signature(secret_key, query_string)
-    url = f"{BASE_URL}{ORDER_ENDPOINT}"
-    headers = {"X-BX-APIKEY": api_key, "Content-Type": "application/json"}
-    resp = requests.post(url, headers=headers, json=params_dict)
-    try:
-        return resp.json()
-    except Exception:
-        return {"code": -1, "msg": "Ungültige API-Antwort", "raw": resp.text}
+class WebhookJob:
+    __slots__ = ("job_id", "botname", "action", "data", "status", "http_status", "ergebnis", "logs",
+                 "fehler", "erstellt", "gestartet", "beendet", "fertig", "bei_ende", "zeiten")
+
+    def __init__(self, botname, data, bei_ende=None):
+        self.job_id = uuid.uuid4().hex
+        self.botname = botname
+        self.action = data.get("vyn", {}).get("action", "").lower()
+        self.data = data
+        self.status = "queued"   # queued → running → done / error
+        self.http_status = None
+        self.ergebnis = None
+        self.logs = []
+        self.fehler = None
+        self.erstellt = datetime.now(timezone.utc)
+        self.gestartet = None
+        self.beendet = None
+        self.fertig = threading.Event()
+        self.bei_ende = bei_ende   # wird mit dem Job aufgerufen, sobald er fertig ist
+        self.zeiten = None         # Messung.als_dict() des Laufs
+
+    def als_dict(self):
+        return {
+            "job_id": self.job_id,
+            "botname": self.botname,
+            "action": self.action,
+            "status": self.status,
+            "http_status": self.http_status,
+            "erstellt": self.erstellt.isoformat(),
+            "gestartet": self.gestartet.isoformat() if self.gestartet else None,
+            "beendet": self.beendet.isoformat() if self.beendet else None,
+            "fehler": self.fehler,
+            "zeiten": self.zeiten,
+            "result": self.ergebnis,
+            "logs": self.logs
+        }
+
+
+class BotJobQueue:
+    def __init__(self, worker=WEBHOOK_WORKERS, max_jobs=JOB_HISTORY):
+        self.executor = ThreadPoolExecutor(max_workers=worker, thread_name_prefix="webhook")
+        self.max_jobs = max_jobs
+        self.lock = threading.Lock()
+        self.warteschlangen = {}    # botname -> deque der offenen Jobs (erster = läuft gerade)
+        self.jobs = OrderedDict()   # job_id -> WebhookJob, die ältesten fertigen fallen raus
+        self.geschlossen = False
+
+    def einreihen(self, botname, data, bei_ende=None):
+        job = WebhookJob(botname, data, bei_ende)
+        with self.lock:
+            if self.geschlossen:
+                raise RuntimeError("Job-Queue ist geschlossen")
+            self.jobs[job.job_id] = job
+            self._aufraeumen()
+
+            warteschlange = self.warteschlangen.get(botname)
+            if warteschlange is None:
+                # kein Job dieses Bots aktiv → neuen Abarbeiter starten
+                self.warteschlangen[botname] = deque([job])
+                self.executor.submit(self._abarbeiten, botname)
+            else:
+                warteschlange.append(job)
+        return job
+
+    def hole(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _aufraeumen(self):
+        # über max_jobs: die ältesten fertigen Jobs entfernen; eingereihte und laufende bleiben abrufbar
+        ueberschuss = len(self.jobs) - self.max_jobs
+        if ueberschuss <= 0:
+            return
+        fertige = [job_id for job_id, job in self.jobs.items() if job.fertig.is_set()][:ueberschuss]
+        for job_id in fertige:
+            del self.jobs[job_id]
+
+    def stop(self, timeout=JOB_DRAIN_TIMEOUT):
+        # keine neuen Jobs mehr annehmen, die eingereihten höchstens timeout Sekunden fertig laufen lassen;
+        # Rückgabe: Anzahl Jobs, die nicht fertig wurden
+        with self.lock:
+            self.geschlossen = True
+            offen = [job for warteschlange in self.warteschlangen.values() for job in warteschlange]
+        ende = time.monotonic() + timeout
+        for job in offen:
+            if not job.fertig.wait(max(ende - time.monotonic(), 0)):
+                break
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        return sum(1 for job in offen if not job.fertig.is_set())
+
+    def auslastung(self):
+        # (laufende, wartende) Jobs; pro Bot läuft höchstens einer
+        with self.lock:
+            laufend = len(self.warteschlangen)
+            return laufend, sum(len(w) for w in self.warteschlangen.values()) - laufend
+
+    def _abarbeiten(self, botname):
+        while True:
+            with self.lock:
+                warteschlange = self.warteschlangen[botname]
+                if not warteschlange:
+                    del self.warteschlangen[botname]
+                    return
+                job = warteschlange[0]
+            self._ausfuehren(job)
+            with self.lock:
+                warteschlange.popleft()
+
+    def _ausfuehren(self, job):
+        job.status = "running"
+        job.gestartet = datetime.now(timezone.utc)
+        messung = None
+        try:
+            with app.app_context(), messung_starten() as messung, stufe("webhook.gesamt"):
+                rv = verarbeite_webhook(job.data)
+            response, http_status = (rv if isinstance(rv, tuple) else (rv, None))
+            job.ergebnis = response.get_json()
+            job.http_status = http_status or response.status_code
+            job.logs = (job.ergebnis or {}).get("logs", [])
+            job.status = "done"
+        except Exception as e:
+            job.status = "error"
+            job.http_status = 500
+            job.fehler = str(e)
+            print(f"Fehler in Webhook-Job {job.job_id} ({job.botname}): {e}")
+        finally:
+            job.beendet = datetime.now(timezone.utc)
+            zaehler.erhoehen("webhook_jobs", status=job.status, http=job.http_status, **webhook_labels(job.data))
+            if messung is not None:
+                job.zeiten = messung.als_dict()
+            if job.bei_ende is not None:
+                try:
+                    job.bei_ende(job)
+                except Exception as e:
+                    print(f"Fehler nach Webhook-Job {job.job_id}: {e}")
+            job.fertig.set()
+
+
+### Webhook-Duplikate
+# TradingView sendet einen Alarm erneut, wenn die Antwort ausbleibt. Ein Alarm wird über
+# (vyn, botname, Balkenzeit, price) erkannt; innerhalb von WEBHOOK_DEDUP_TTL Sekunden wird er nur einmal
+# eingereiht, jede Wiederholung bekommt die gespeicherte Antwort (bzw. das Ergebnis des ersten Jobs).
+# Ohne Balkenzeit ("time" bzw. "bar_time") wird nicht dedupliziert: ein zweiter Nachkauf zum gleichen Preis
+# wäre sonst nicht von einer Wiederholung zu unterscheiden, und eine verlorene Order wiegt schwerer als eine doppelte.
+# Der Index liegt im RAM (höchstens WEBHOOK_DEDUP_MAX Einträge) und in STATE_DB, damit er einen Neustart übersteht.
+
+def webhook_schluessel(data):
+    # None, wenn der Alarm keine Balkenzeit hat (bzw. der Platzhalter nicht ersetzt wurde)
+    render = data.get("RENDER", {}) or {}
+    balkenzeit = render.get("time") or render.get("bar_time")
+    if balkenzeit in (None, "") or "{{" in str(balkenzeit):
+        return None
+    roh = json.dumps([render.get("botname"), data.get("vyn"), balkenzeit, render.get("price")],
+                     sort_keys=True, default=str)
+    return hashlib.sha256(roh.encode("utf-8")).hexdigest()
+
+
+@dataclass(slots=True)
+class WebhookEintrag:
+    ablauf: float                  # Unix-Zeit
+    job_id: str
+    antwort: dict                  # Antwort an den ersten Alarm (202 + job_id)
+    ergebnis: dict | None = None   # Ergebnis des Jobs, sobald er fertig ist
+    http_status: int | None = None
+
+
+class WebhookIndex:
+    def __init__(self, ttl=WEBHOOK_DEDUP_TTL, max_eintraege=WEBHOOK_DEDUP_MAX, db_pfad=STATE_DB):
+        self.ttl = ttl
+        self.max_eintraege = max_eintraege
+        self._lock = threading.Lock()
+        self._eintraege = OrderedDict()   # schluessel → WebhookEintrag, ältester zuerst
+        self.duplikate = 0
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_pfad:
+            self._db = sqlite3.connect(db_pfad, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS webhook_index (schluessel TEXT PRIMARY KEY, ablauf REAL NOT NULL, "
+                             "job_id TEXT NOT NULL, antwort TEXT NOT NULL, ergebnis TEXT, http_status INTEGER)")
+            self._laden()
+
+    def _laden(self):
+        with self._db_lock:
+            self._db.execute("DELETE FROM webhook_index WHERE ablauf < ?", (time.time(),))
+            zeilen = self._db.execute("SELECT schluessel, ablauf, job_id, antwort, ergebnis, http_status FROM webhook_index "
+                                      "ORDER BY ablauf DESC LIMIT ?", (self.max_eintraege,)).fetchall()
+        for schluessel, ablauf, job_id, antwort, ergebnis, http_status in reversed(zeilen):
+            self._eintraege[schluessel] = WebhookEintrag(ablauf, job_id, json.loads(antwort),
+                                                         json.loads(ergebnis) if ergebnis else None, http_status)
+
+    def _speichern(self, schluessel, eintrag):
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO webhook_index (schluessel, ablauf, job_id, antwort, ergebnis, http_status) VALUES (?, ?, ?, ?, ?, ?)",
+                (schluessel, eintrag.ablauf, eintrag.job_id, json.dumps(eintrag.antwort),
+                 json.dumps(eintrag.ergebnis) if eintrag.ergebnis is not None else None, eintrag.http_status)
+            )
 
-def SHORT_place_stoploss_buy_order(api_key, secret_key, symbol, quantity, stop_price, position_side="SHORT"):
+    def _aufraeumen(self, jetzt):
+        # unter self._lock: abgelaufene und überzählige Einträge entfernen (die ältesten stehen vorne)
+        entfernt = False
+        while self._eintraege:
+            schluessel, eintrag = next(iter(self._eintraege.items()))
+            if eintrag.ablauf >= jetzt and len(self._eintraege) <= self.max_eintraege:
+                break
+            del self._eintraege[schluessel]
+            entfernt = True
+        return entfernt
+
+    def eintragen(self, schluessel, einreihen):
+        """
+        Neuer Alarm: einreihen() aufrufen (gibt (job_id, antwort) zurück) und merken → (True, eintrag).
+        Duplikat innerhalb der TTL: nichts einreihen → (False, gespeicherter eintrag).
+        """
+        jetzt = time.time()
+        with self._lock:
+            eintrag = self._eintraege.get(schluessel)
+            if eintrag is not None and eintrag.ablauf >= jetzt:
+                self.duplikate += 1
+                return False, eintrag
+            job_id, antwort = einreihen()
+            eintrag = self._eintraege[schluessel] = WebhookEintrag(jetzt + self.ttl, job_id, antwort)
+            self._eintraege.move_to_end(schluessel)
+            entfernt = self._aufraeumen(jetzt)
+        self._speichern(schluessel, eintrag)
+        if entfernt and self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM webhook_index WHERE ablauf < ?", (jetzt,))
+        return True, eintrag
+
+    def abschliessen(self, schluessel, job):
+        # Ergebnis des Jobs für spätere Duplikate speichern
+        with self._lock:
+            eintrag = self._eintraege.get(schluessel)
+            if eintrag is None or eintrag.job_id != job.job_id:
+                return
+            eintrag.ergebnis = job.ergebnis if job.status == "done" else job.als_dict()
+            eintrag.http_status = job.http_status
+        self._speichern(schluessel, eintrag)
+
+    def anzahl(self):
+        with self._lock:
+            return len(self._eintraege)
+
+
+webhook_index = WebhookIndex()
+
+
+### Metriken
+# /metrics im Textformat von Prometheus, ohne zusätzliche Abhängigkeit: alle Zähler als dca_<name>_total,
+# die Latenz-Histogramme als dca_dauer_seconds und der aktuelle Stand der Caches und der Job-Queue.
+
+def _metrik_labels(labels):
+    if not labels:
+        return ""
+    def wert(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{wert(v)}"' for k, v in labels) + "}"
+
+
+def metriken_text():
+    zeilen = []
+
+    def metrik(name, typ, hilfe, werte):
+        zeilen.append(f"# HELP {name} {hilfe}")
+        zeilen.append(f"# TYPE {name} {typ}")
+        for labels, wert in werte:
+            zeilen.append(f"{name}{_metrik_labels(labels)} {wert}")
+
+    nach_name = {}
+    for (name, labels), wert in zaehler.werte():
+        nach_name.setdefault(name, []).append((labels, wert))
+    for name, werte in nach_name.items():
+        metrik(f"dca_{name}_total", "counter", f"Zähler {name}", werte)
+
+    laufend, wartend = job_queue.auslastung()
+    metrik("dca_jobs", "gauge", "Webhook-Jobs in Arbeit", [((("zustand", "laufend"),), laufend),
+                                                             ((("zustand", "wartend"),), wartend)])
+    metrik("dca_konto_abfragen_total", "counter", "Konto-Abfragen aus dem User-Stream bzw. per REST",
+           [((("quelle", "stream"),), konten.treffer), ((("quelle", "rest"),), konten.rest_abfragen)])
+    metrik("dca_konten", "gauge", "Konten mit eigenem Client", [((), konten.anzahl())])
+    metrik("dca_konten_entfernt_total", "counter", "wegen Leerlauf oder KONTO_MAX entfernte Konten", [((), konten.entfernt)])
+    cache = firebase_cache.statistik()
+    metrik("dca_firebase_cache_total", "counter", "Lesezugriffe auf den Firebase-Cache",
+           [((("ergebnis", "treffer"),), cache["treffer"]), ((("ergebnis", "fehlschlag"),), cache["fehlschlaege"])])
+    metrik("dca_firebase_journal_offen", "gauge", "noch nicht übertragene Firebase-Schreibaufträge",
+           [((), firebase_writer.offen())])
+    metrik("dca_firebase_journal_verwaist", "gauge", "Firebase-Schreibaufträge, deren Secret nicht im Speicher ist",
+           [((), firebase_writer.verwaist())])
+    metrik("dca_firebase_abgelehnt", "gauge", "von Firebase abgelehnte Schreibaufträge in firebase_abgelehnt",
+           [((), firebase_writer.abgelehnt())])
+    metrik("dca_telegram_offen", "gauge", "vorgemerkte, noch nicht gesendete Telegram-Meldungen",
+           [((), telegram_versand.offen())])
+    metrik("dca_webhook_duplikate_total", "counter", "wiederholte Alarme, die nicht ausgeführt wurden",
+           [((), webhook_index.duplikate)])
+
+    name = "dca_dauer_seconds"
+    zeilen.append(f"# HELP {name} Dauer von Aufrufen, Wartezeiten und Stufen")
+    zeilen.append(f"# TYPE {name} histogram")
+    for (stufe_name, ziel), daten in latenzen.statistik().items():
+        labels = (("stufe", stufe_name),) + ((("ziel", ziel),) if ziel else ())
+        for grenze, anzahl in daten["buckets"].items():
+            le = grenze if grenze == "+Inf" else f"{int(grenze) / 1000:g}"
+            zeilen.append(f"{name}_bucket{_metrik_labels(labels + (('le', le),))} {anzahl}")
+        zeilen.append(f"{name}_sum{_metrik_labels(labels)} {daten['summe_ms'] / 1000:.6f}")
+        zeilen.append(f"{name}_count{_metrik_labels(labels)} {daten['anzahl']}")
+    return "\n".join(zeilen) + "\n"
+
+
+### DCA-Engine
+# Ein Signal durchläuft die Stufen von DcaLauf nacheinander (Nummern wie in den bisherigen Kommentaren).
+# LONG und SHORT teilen sich jede Stufe; seitenabhängig ist nur, was in SEITEN steht.
+
+class DcaLauf:
     """
-    SL für SHORT: BUY STOP_MARKET (über Entry) zum Schließen
+    Verarbeitung eines Webhook-Signals eines Bots. ausfuehren() ruft die Stufen der Reihe nach auf;
+    eine Stufe gibt None zurück oder bricht mit einer Antwort (jsonify bzw. (jsonify, status)) ab.
     """
-    timestamp = int(time.time() * 1000)
-    params_dict = {
-        "symbol": symbol,
-        "side": "BUY",  # Short schließen = buy
-        "type": "STOP_MARKET",
-        "quantity": round(quantity, 6),
-        "stopPrice": round(stop_price, 6),
-        "positionSide": position_side.upper(),
-        "timestamp": timestamp
-    }
-    query_string = "&".join(f"{k}={params_dict[k]}" for k in sorted(params_dict))
-    params_dict["signature"] = generate_signature(secret_key, query_string)
-    url = f"{BASE_URL}{ORDER_ENDPOINT}"
-    headers = {"X-BX-APIKEY": api_key, "Content-Type": "application/json"}
-    resp = requests.post(url, headers=headers, json=params_dict)
-    try:
-        return resp.json()
-    except Exception:
-        return {"code": -1, "msg": "Ungültige API-Antwort", "raw": resp.text}
-
-def SHORT_get_open_orders(api_key, secret_key, symbol):
-    timestamp = int(time.time() * 1000)
-    params = f"symbol={symbol}&timestamp={timestamp}"
-    signature = generate_signature(secret_key, params)
-    url = f"{BASE_URL}{OPEN_ORDERS_ENDPOINT}?{params}&signature={signature}"
-    headers = {"X-BX-APIKEY": api_key}
-    r = requests.get(url, headers=headers)
-    try:
-        return r.json()
-    except Exception:
-        return {"code": -1, "msg": "Ungültige Antwort Open Orders", "raw": r.text}
 
-def SHORT_cancel_order(api_key, secret_key, symbol, order_id):
-    timestamp = int(time.time() * 1000)
-    params = f"symbol={symbol}&orderId={order_id}&timestamp={timestamp}"
-    signature = generate_signature(secret_key, params)
-    url = f"{BASE_URL}{ORDER_ENDPOINT}?{params}&signature={signature}"
-    headers = {"X-BX-APIKEY": api_key}
-    r = requests.delete(url, headers=headers)
-    try:
-        return r.json()
-    except Exception:
-        return {"code": -1, "msg": "Ungültige Antwort Cancel", "raw": r.text}
+    def __init__(self, data):
+        render = data.get("RENDER", {}) or {}
+        self.data = data
+        self.logs = Protokoll(True if data.get("debug") or render.get("debug") else None)
+        self.position_side = str(render.get("position_side") or render.get("positionSide") or "LONG").strip().upper()
+        self.seite = SEITEN.get(self.position_side)
+
+        self.botname = render.get("botname")
+        self.symbol = render.get("symbol", "")
+        self.api_key = render.get("api_key")
+        self.secret_key = render.get("secret_key")
+        self.firebase_secret = render.get("FIREBASE_SECRET")
+        self.action = data.get("vyn", {}).get("action", "").lower()    # kommt von vyn
+        self.bot_nr = render.get("bot_nr")
 
-# === Positionsabfrage ===
-def SHORT_get_current_position(api_key, secret_key, symbol, position_side, logs=None):
-    endpoint = "/openApi/swap/v2/user/positions"
-    params = {"symbol": symbol}
-    response = send_signed_request("GET", endpoint, api_key, secret_key, params)
-    positions = response.get("data", []) if isinstance(response.get("data", []), list) else []
-    raw_positions = positions
-    position_size = 0.0
-    liquidation_price = None
-    if logs is not None:
-        logs.append(f"Positions Rohdaten: {raw_positions}")
-    if response.get("code") == 0:
-        for pos in positions:
-            if pos.get("symbol") == symbol and pos.get("positionSide", "").upper() == position_side.upper():
-                try:
-                    position_size = float(pos.get("size", 0)) or float(pos.get("positionAmt", 0))
-                    liquidation_price = float(pos.get("liquidationPrice", 0)) if pos.get("liquidationPrice") else None
-                    if logs is not None:
-                        logs.append(f"Gefundene Position: size={position_size}, liqPrice={liquidation_price}")
-                except (ValueError, TypeError) as e:
-                    if logs is not None:
-                        logs.append(f"Fehler beim Parsen der Position: {e}")
-                    position_size = 0.0
-                break
-    else:
-        if logs is not None:
-            logs.append(f"API Positions Fehlercode: {response.get('code')}")
-    return position_size, raw_positions, liquidation_price
+        # Eingabewerte
+        self.pyramiding = float(render.get("pyramiding", 1))
+        self.leverageB = float(render.get("leverage", 1))
+        self.leverage2 = int(render.get("leverage2", 0))
+        self.sicherheit = float(render.get("sicherheit", 0))   # wird nicht mit dem Hebel multipliziert
+        self.sell_percentage = render.get("sell_percentage")
+        self.sell_percentage2 = render.get("sell_percentage2")
+        self.price_from_webhook = render.get("price")
+        self.usdt_factor = float(render.get("usdt_factor", 1))
+        self.bo_factor = float(render.get("bo_factor", 0.0001))
+        self.bo_factor2 = float(render.get("bo_factor2", 0.0001))
+        self.base_time2 = render.get("base_time2")
+        self.after_h = render.get("after_h", 48)
+        self.after_so = render.get("after_so", 14)
+        self.beenden = render.get("beenden", "nein")
+        self.sl = render.get("sl")
+        self.ma = int(render.get("ma", 0))
+        self.alarm_trigger = int(render.get("alarm", 0))
+        # Kennung des Signals für die clientOrderIDs: derselbe Webhook ergibt dieselben IDs
+        self.signal = json.dumps([data.get("vyn"), self.price_from_webhook], sort_keys=True, default=str)
+
+        # Zwischenergebnisse der Stufen
+        self.vorab = {}
+        self.position_size = 0
+        self.available_usdt = 0.0
+        self.open_orders = {}
+        self.usdt_amount = 0
+        self.open_sell_orders_exist = False
+        self.order_response = None
+        self.fill_position = None
+        self.sell_quantity = 0
+        self.positions_raw = []
+        self.liquidation_price = None
+        self.stop_loss_price = None
+        self.durchschnittspreis = None
+        self.kaufsummen = None
+        self.base_time = None
+        self.limit_price = 0
+        self.limit_order_response = None
+        self.sl_order_resp = None
+
+    def ausfuehren(self):
+        if not self.botname:
+            return jsonify({"error": True, "msg": "botname ist erforderlich"}), 400
+        if self.seite is None:
+            return jsonify({"error": True, "msg": f"Unbekannte position_side {self.position_side}"}), 400
+        if self.action == "close":
+            return self.schliessen()
+        stufen = (self.vorab_lesen, self.hebel_setzen, self.konto_auswerten, self.ordergroesse, self.market_order,
+                  self.position_nach_fill, self.kaufpreise, self.durchschnitt, self.base_order_zeit,
+                  self.nachkauf_pruefen, self.schutz_orders)
+        for naechste in stufen:
+            with stufe(f"stufe.{naechste.__name__}"):
+                antwort = naechste()
+            if antwort is not None:
+                return antwort
+        return self.antwort()
+
+    def telegram(self, text):
+        return sende_telegram_nachricht(self.botname, text)
+
+    def order_id(self, art, schritt=None):
+        # schritt = Nummer der Order im Zyklus (0 = Base Order), Standard: zuletzt ausgeführte Market-Order
+        if schritt is None:
+            schritt = bot_state.hole_alarm(self.botname)
+        return client_order_id(self.botname, f"{schritt}-{art}", self.signal, bot_state.hole_zyklus(self.botname))
+
+    def _bingx_avg_price(self):
+        # avgPrice der eigenen Position aus der letzten Positionsabfrage, 0.0 wenn nicht vorhanden
+        for pos in self.positions_raw:
+            if pos.get("symbol") == self.symbol and pos.get("positionSide", "").upper() == self.seite.name:
+                return float(pos.get("avgPrice", 0)) or float(pos.get("averagePrice", 0))
+        return 0.0
+
+    def _ma_aktiv(self):
+        ma_aktiv = bot_state.hole_ma(self.bot_nr)
+        if ma_aktiv is not None:
+            self.logs.append(f"MA aus RAM gelesen: {ma_aktiv} (bot_nr={self.bot_nr})")
+        else:
+            # falls nicht vorhanden → Firebase (meist bereits parallel gelesen)
+            ma_aktiv = ergebnis_oder_fehler(self.vorab["ma"]) if "ma" in self.vorab else firebase_lese_ma_wert(self.bot_nr, self.firebase_secret)
+            self.logs.append(f"MA aus Firebase gelesen: {ma_aktiv} (bot_nr={self.bot_nr})")
+        return ma_aktiv
 
-# === Schließen aller Positionen (nur SHORT relevant) ===
-def SHORT_close_all_positions(api_key, secret_key):
-    logs = []
-    closed_positions = []
-    positions_resp = get_open_positions_for_all_symbols(api_key, secret_key)
-    if positions_resp.get("error"):
-        sende_telegram_nachricht("BingX Bot", f"Fehler beim Abrufen der Positionen: {positions_resp.get('msg')}")
-        logs.append("Fehler beim Abrufen der Positionen")
-        return {"error": True, "msg": "Konnte offene Positionen nicht abrufen", "logs": logs}
-    positions = positions_resp.get("data", [])
-    if not positions:
-        logs.append("Keine offenen Positionen")
-        return {"error": False, "msg": "Keine offenen Positionen", "closed": [], "logs": logs}
-    for pos in positions:
-        symbol = pos.get("symbol")
-        position_side = pos.get("positionSide", "").upper()
-        qty = float(pos.get("positionAmt", 0) or pos.get("size", 0) or 0)
-        if position_side != "SHORT":
-            continue  # nur SHORTs schließen
-        if qty == 0:
-            continue
-        try:
-            resp = place_market_order_close(api_key, secret_key, symbol, qty, position_side)
-            logs.append(f"Closed {symbol} {position_side} ({qty}) → {resp}")
-            closed_positions.append({
-                "symbol": symbol,
-                "side": position_side,
-                "quantity": qty,
-                "response": resp
-            })
-        except Exception as e:
-            message = f"⚠️ Fehler beim Schließen von {symbol} {position_side}: {e}"
-            sende_telegram_nachricht("BingX Bot", message)
-            logs.append(message)
-    return {"error": False, "closed": closed_positions, "logs": logs}
+    def _keine_base_order(self, reason):
+        self.logs.append(f"⚠️ Bot {self.botname}: {reason} → KEINE neue Base Order wird eröffnet")
+        return jsonify({
+            "status": "no_base_order_opened",
+            "botname": self.botname,
+            "reason": reason,
+            "logs": self.logs
+        })
 
-def SHORT_get_open_positions_for_all_symbols(api_key, secret_key):
-    endpoint = "/openApi/swap/v2/user/positions"
-    response = send_signed_request("GET", endpoint, api_key, secret_key, {})
-    if response.get("code") != 0:
-        return {"error": True, "msg": response.get("msg", "Fehler beim Abrufen der Positionen"), "data": []}
-    positions = response.get("data", []) or []
-    return {"error": False, "data": positions}
-
-# === Close helper für webhook 'close' action ===
-def SHORT_close_open_position(api_key, secret_key, symbol, position_side="SHORT"):
-    logs = []
-    position_size, _, liquidation_price = get_current_position(api_key, secret_key, symbol, position_side, logs=logs)
-    if position_size == 0:
-        logs.append(f"Keine offene Position für {symbol} ({position_side}) gefunden.")
-        return {"code": 1, "msg": "Keine offene Position", "logs": logs}
-    side = "BUY"  # Short schließen
-    timestamp = int(time.time() * 1000)
-    params_dict = {
-        "symbol": symbol,
-        "side": side,
-        "type": "MARKET",
-        "quantity": round(position_size, 6),
-        "positionSide": position_side.upper(),
-        "timestamp": timestamp
-    }
-    query_string = "&".join(f"{k}={params_dict[k]}" for k in sorted(params_dict))
-    params_dict["signature"] = generate_signature(secret_key, query_string)
-    url = f"{BASE_URL}{ORDER_ENDPOINT}"
-    headers = {"X-BX-APIKEY": api_key, "Content-Type": "application/json"}
-    resp = requests.post(url, headers=headers, json=params_dict)
-    try:
-        result = resp.json()
-    except Exception as e:
-        result = {"code": -1, "msg": f"Fehler beim Parsen der API-Antwort: {e}", "raw_response": resp.text}
-    logs.append(f"Schließen der Position: {result}")
-    return {"result": result, "logs": logs}
+    def schliessen(self):
+        # action=close: Position schließen und den Zyklus dieses Bots zurücksetzen
+        if self.logs.ausfuehrlich:
+            print(f"DEBUG close: action={self.action}, botname={self.botname}, bot_nr={self.bot_nr!r}, ma={self.ma}")
+        ergebnis = close_open_position(self.api_key, self.secret_key, self.symbol, self.seite.name, self.order_id("close"),
+                                       self.logs.ausfuehrlich)
 
+        if self.logs.ausfuehrlich:
+            print(ergebnis.get("logs", []))
+            print(ergebnis.get("result", None))
 
+        # Nur die Daten für diesen Bot zurücksetzen
+        bot_state.reset_bot(self.botname)
 
-@app.route('/webhook', methods=['POST'])
-def webhook():
-    global saved_usdt_amounts
-    global status_fuer_alle
-    global alarm_counter
-    global base_order_times
-    global aktueller_Bot    
-    global ma_Wert
-    global recovery_trade
-    global recovery_pending
-
-    data = request.json
-    logs = []
+        if bot_state.entferne_aktueller_bot(self.bot_nr, self.botname):
+            print(f"Bot {self.botname} mit Nummer {self.bot_nr} wurde aus dem Bot-Zustand gelöscht")
 
-    position_side = data.get("RENDER", {}).get("position_side") or data.get("RENDER", {}).get("positionSide") or "LONG"    #data.get("position_side") or data.get("positionSide") or "LONG"
+        bot_nr = int(self.bot_nr)
 
-    if position_side == "LONG":  
+        # Wenn diese Side als Recovery lief und im SL endet -> Telegram + kompletter Reset
+        # (sonst wird das Recovery-Flag aufgeräumt und bei SL Recovery für den nächsten Trade "gearmt")
+        if bot_state.recovery_nach_close(bot_nr, self.seite.name, self.ma):
+            self.telegram(f"⚠️ Recovery-Trade im StopLoss beendet (close). bot_nr={bot_nr}, side={self.seite.name}")
 
-        data = request.json or {}
-        logs = []
-    
-
-     
-    
-        botname = data.get("RENDER", {}).get("botname")    #data.get("botname")
-        if not botname:
-            return jsonify({"error": True, "msg": "botname ist erforderlich"}), 400
-    
-        symbol = data.get("RENDER", {}).get("symbol", "")  #data.get("symbol", "BTC-USDT")
-        base_asset = symbol.split("-")[0]  # Nur für menschliche Logs
-    
-        # Hole den gespeicherten Wert für den Bot, falls vorhanden
-        saved_usdt_amount = saved_usdt_amounts.get(botname)
-    
-        # Eingabewerte
-        pyramiding = float(data.get("RENDER", {}).get("pyramiding", 1))  #float(data.get("pyramiding", 1))
-        leverageB = float(data.get("RENDER", {}).get("leverage", 1))     #float(data.get("leverage", 1))
-        sicherheit = float(data.get("RENDER", {}).get("sicherheit", 0))  #* leverageB)    #float(data.get("sicherheit", 0) * leverageB)
-        sell_percentage = data.get("RENDER", {}).get("sell_percentage")    #data.get("sell_percentage")
-        api_key = data.get("RENDER", {}).get("api_key")    #data.get("api_key")
-        secret_key = data.get("RENDER", {}).get("secret_key")   #data.get("secret_key")
-        position_side = data.get("RENDER", {}).get("position_side") or data.get("RENDER", {}).get("positionSide") or "LONG"    #data.get("position_side") or data.get("positionSide") or "LONG"
-        firebase_secret = data.get("RENDER", {}).get("FIREBASE_SECRET")    #data.get("FIREBASE_SECRET")
-        price_from_webhook = data.get("RENDER", {}).get("price")    #data.get("price")
-        usdt_factor = float(data.get("RENDER", {}).get("usdt_factor", 1))    #float(data.get("usdt_factor", 1))
-        bo_factor = float(data.get("RENDER", {}).get("bo_factor", 0.0001))    #float(data.get("bo_factor", 0.0001))
-        bo_factor2 = float(data.get("RENDER", {}).get("bo_factor2", 0.0001))    #float(data.get("bo_factor", 0.0001))
-        action = data.get("vyn", {}).get("action", "").lower()    #KOMMT VON VYN     data.get("action", "").lower()
-        base_time2 = data.get("RENDER", {}).get("base_time2")
-        after_h = data.get("RENDER", {}).get("after_h")
-        after_so = data.get("RENDER", {}).get("after_so")
-        sell_percentage2 = data.get("RENDER", {}).get("sell_percentage2")
-        beenden = data.get("RENDER", {}).get("beenden", "nein")
-        sl = data.get("RENDER", {}).get("sl")
-        bot_nr = data.get("RENDER", {}).get("bot_nr")
-        ma = int(data.get("RENDER", {}).get("ma", 0))
-        leverage2 = int(data.get("RENDER", {}).get("leverage2", 0))
-        
-
-      
-
-   
-        
-        if action == "close" and botname:
-            # Position schließen
-            print("DEBUG close reached")
-            print("DEBUG action:", action)
-            print("DEBUG botname:", botname)
-            print("DEBUG bot_nr:", bot_nr, type(bot_nr))
-            print("DEBUG ma raw:", data.get("RENDER", {}).get("ma"), type(data.get("RENDER", {}).get("ma")))
-            print("DEBUG ma int:", ma, type(ma))
-            ergebnis = close_open_position(api_key, secret_key, symbol, position_side)
-            
-            # Logs ausgeben
-            print(ergebnis.get("logs", []))
-            print(ergebnis.get("result", None))
-            
-            # Nur die Daten für diesen Bot zurücksetzen
-            saved_usdt_amounts.pop(botname, None)
-            status_fuer_alle.pop(botname, None)
-            alarm_counter.pop(botname, None)
-            base_order_times.pop(botname, None)
-        
-            if bot_nr in aktueller_Bot and aktueller_Bot[bot_nr] == botname:
-                del aktueller_Bot[bot_nr]  # Eintrag löschen
-                print(f"Bot {botname} mit Nummer {bot_nr} wurde aus der globalen Variable gelöscht")
-
-            position_side = str(position_side).strip().upper()
-            bot_nr = int(bot_nr)
-            key = (bot_nr, position_side)
-            
-            # Wenn diese Side als Recovery lief und im SL endet -> Telegram + kompletter Reset
-            if recovery_trade.get(key) == "ja" and ma == 1:
-                sende_telegram_nachricht(
-                    botname,
-                    f"⚠️ Recovery-Trade im StopLoss beendet (close). bot_nr={bot_nr}, side={position_side}"
-                )
-            
-                # ✅ Recovery komplett beenden
-                recovery_trade.pop(key, None)
-                recovery_pending.pop(bot_nr, None)
-            
-                # ✅ Zurück zu normalem Bot (MA aus)
-                firebase_setze_ma_wert(bot_nr, 0, firebase_secret)
-                ma_Wert[bot_nr] = 0
-            
-            else:
-                # Recovery-Flag dieser Side bei jedem close aufräumen (falls gesetzt)
-                recovery_trade.pop(key, None)
-            
-                # Wenn SL bei einem NICHT-Recovery-Trade -> Recovery für nächsten Trade "armen"
-                if ma == 1:
-                    recovery_pending[bot_nr] = True
-                
-                
-            print(f"MA-Wert für Bot_Nr = {ma}")    
-            if ma == 1:
-                res = firebase_setze_ma_wert(bot_nr, 1, firebase_secret)
-                print("DEBUG firebase_setze_ma_wert:", res)
-                ma_Wert[bot_nr] = 1
-                print(f"MA-Wert auf 1 gesetzt für Bot_Nr {bot_nr}")
-                
-            
-            
-            # Kaufpreise löschen (Firebase oder lokal)
-            if firebase_secret:
-                try:
-                    logs = []
-                    logs.append(firebase_loesche_kaufpreise(botname, firebase_secret))
-                    logs.append(firebase_loesche_ordergroesse(botname, firebase_secret))
-                    logs.append(firebase_loesche_base_order_time(botname, firebase_secret))
-                    logs.append(firebase_delete_aktueller_bot(bot_nr, firebase_secret))
-
-                    
-                    print("\n".join(logs))
-                except Exception as e:
-                    print(f"Fehler beim Löschen von Kaufpreisen/Ordergrößen für {botname}: {e}")
-    
-             # **Hier ein Response zurückgeben**
-            return jsonify({
-                "status": "position_closed",
-                "botname": botname,
-                "logs": ergebnis.get("logs", []),
-                "result": ergebnis.get("result", None)
-            })  # <-- alle Klammern geschlossen
-        else:
+            # ✅ Zurück zu normalem Bot (MA aus)
+            firebase_setze_ma_wert(bot_nr, 0, self.firebase_secret)
+            bot_state.setze_ma(bot_nr, 0)
 
+        print(f"MA-Wert für Bot_Nr = {self.ma}")
+        if self.ma == 1:
+            res = firebase_setze_ma_wert(bot_nr, 1, self.firebase_secret)
+            if self.logs.ausfuehrlich:
+                print("DEBUG firebase_setze_ma_wert:", res)
+            bot_state.setze_ma(bot_nr, 1)
+            print(f"MA-Wert auf 1 gesetzt für Bot_Nr {bot_nr}")
 
+        # Kaufpreise, Ordergröße, Base-Order-Zeit und aktueller_Bot in Firebase löschen
+        if self.firebase_secret:
+            try:
+                logs = [
+                    firebase_loesche_kaufpreise(self.botname, self.firebase_secret),
+                    firebase_loesche_ordergroesse(self.botname, self.firebase_secret),
+                    firebase_loesche_base_order_time(self.botname, self.firebase_secret),
+                    firebase_delete_aktueller_bot(bot_nr, self.firebase_secret),
+                ]
+                print("\n".join(logs))
+            except Exception as e:
+                print(f"Fehler beim Löschen von Kaufpreisen/Ordergrößen für {self.botname}: {e}")
 
+        return jsonify({
+            "status": "position_closed",
+            "botname": self.botname,
+            "logs": ergebnis.get("logs", []),
+            "result": ergebnis.get("result", None),
+            "zeiten": aktuelle_zeiten()
+        })
 
-             # === Hebel NUR vor echter Base Order setzen ===
-            position_size, _, _ = get_current_position(
-                api_key,
-                secret_key,
-                symbol,
-                position_side,
-                logs
-            )
-            
-            if position_size == 0 and action != "increase":
-                try:
+    def vorab_lesen(self):
+        # Unabhängige Lese-Aufrufe parallel: Position, Balance, Open Orders und (je nach action) MA-Wert bzw. Kaufsummen
+        position_logs = Protokoll(self.logs.ausfuehrlich)
+        aufrufe = {
+            "position": (get_current_position, (self.api_key, self.secret_key, self.symbol, self.seite.name, position_logs)),
+            "balance": (get_futures_balance, (self.api_key, self.secret_key)),
+            "open_orders": (get_open_orders, (self.api_key, self.secret_key, self.symbol))
+        }
+        if self.action != "increase" and bot_state.hole_ma(self.bot_nr) is None:
+            aufrufe["ma"] = (firebase_lese_ma_wert, (self.bot_nr, self.firebase_secret))
+        if self.action == "increase" and self.firebase_secret and bot_state.hole_kaufsummen(self.botname) is None:
+            # laufende Summen nach einem Neustart einmalig aus Firebase wiederherstellen
+            aufrufe["kaufsummen"] = (firebase_lese_kaufsummen, (self.botname, self.firebase_secret))
+        self.vorab = lade_parallel(**aufrufe)
+        if isinstance(self.vorab.get("kaufsummen"), tuple):
+            bot_state.setze_kaufsummen(self.botname, self.vorab["kaufsummen"])
+
+        self.position_size, _, _ = ergebnis_oder_fehler(self.vorab["position"])
+        self.logs.extend(position_logs)
+
+    def hebel_setzen(self):
+        # Hebel NUR vor echter Base Order setzen
+        if self.position_size != 0 or self.action == "increase":
+            self.logs.append(f"Hebel NICHT gesetzt (position_size={self.position_size}, action={self.action})")
+            return None
+        try:
+            if self._ma_aktiv() == 1:
+                self.leverageB = self.leverage2
+                self.logs.append(f"Hebel wurde geändert, da MA=1 (bot_nr={self.bot_nr}, position_size={self.position_size})")
+
+            self.logs.append(f"Setze Hebel VOR Base Order auf {self.leverageB}x (position_size={self.position_size})")
+            leverage_response = set_leverage(self.api_key, self.secret_key, self.symbol, self.leverageB, self.seite.name)
+            self.logs.debug("Hebel-Response: {}", leverage_response)
+            if leverage_response.get("code") != 0:
+                raise Exception(leverage_response)
+
+            # BingX Sync: statt fester Pause warten, bis der Hebel übernommen ist
+            if not warte_auf_hebel(self.api_key, self.secret_key, self.symbol, self.leverageB, self.seite.name):
+                self.logs.append(f"⚠️ Hebel {self.leverageB}x nach {LEVERAGE_TIMEOUT}s noch nicht bestätigt")
+        except Exception as e:
+            self.logs.append(f"❌ Hebel konnte nicht gesetzt werden: {e}")
+            return jsonify({
+                "error": True,
+                "msg": "Hebel konnte nicht gesetzt werden",
+                "logs": self.logs
+            })
 
-                    if bot_nr in ma_Wert:
-                        ma_aktiv = ma_Wert.get(bot_nr, 0)
-                        logs.append(f"MA aus RAM gelesen: {ma_aktiv} (bot_nr={bot_nr})")
-                
-                    # 2) falls nicht vorhanden → Firebase
-                    else:
-                        ma_aktiv = firebase_lese_ma_wert(bot_nr, firebase_secret)
-                        logs.append(f"MA aus Firebase gelesen: {ma_aktiv} (bot_nr={bot_nr})")
-                
-                    # 3) wenn MA aktiv → Hebel NICHT setzen
-                    if ma_aktiv == 1:
-                        leverageB = leverage2
-            
-                        logs.append(
-                            f"Hebel wurde geändert, da MA=1 "
-                            f"(bot_nr={bot_nr}, position_size={position_size})"
-                        )
-                    # sauber abbrechen → kein Hebel, aber weiter im Code
-                        pass
-                    else:
-                        
-                        logs.append("Hebel auf {leverageB} gesetzt")
-
-                    
-                    logs.append(
-                        f"Setze Hebel VOR Base Order auf {leverageB}x "
-                        f"(position_size={position_size})"
-                    )
-            
-                    leverage_response = set_leverage(
-                        api_key,
-                        secret_key,
-                        symbol,
-                        leverageB,
-                        position_side
-                    )
-            
-                    logs.append(f"Hebel-Response: {leverage_response}")
-            
-                    time.sleep(0.2)  # BingX Sync
-            
-                    if leverage_response.get("code") != 0:
-                        raise Exception(leverage_response)
-            
-                except Exception as e:
-                    logs.append(f"❌ Hebel konnte nicht gesetzt werden: {e}")
-                    return jsonify({
-                        "error": True,
-                        "msg": "Hebel konnte nicht gesetzt werden",
-                        "logs": logs
-                    })
+    def konto_auswerten(self):
+        # 0. USDT-Guthaben vor Order (mit dem eben gesetzten Hebel)
+        try:
+            balance_response = ergebnis_oder_fehler(self.vorab["balance"])
+            self.logs.debug("Balance Response: {}", balance_response)
+            if balance_response.get("code") == 0:
+                available_margin = float(balance_response.get("data", {}).get("balance", {}).get("availableMargin", 0))
+                self.available_usdt = available_margin * self.leverageB
+                self.logs.append(f"Freies USDT Guthaben: {self.available_usdt}")
             else:
-                logs.append(
-                    f"Hebel NICHT gesetzt "
-                    f"(position_size={position_size}, action={action})"
-                )
+                self.logs.append("Fehler beim Abrufen der Balance.")
+        except Exception as e:
+            self.logs.append(f"Fehler bei Balance-Abfrage: {e}")
+            self.telegram(f"❌❌❌ Keine Verbindung zu BingX bei Balance-Abfrage für Bot: {self.botname}")
+            self.available_usdt = None
 
-            
-    
-            available_usdt = 0.0
-        
-            # 0. USDT-Guthaben vor Order abrufen
+        # 2. Offene Orders (alte TP/SL werden in schutz_orders ersetzt)
+        try:
+            self.open_orders = ergebnis_oder_fehler(self.vorab["open_orders"])
+            self.logs.debug("Open Orders: {}", self.open_orders)
+        except Exception as e:
+            self.logs.append(f"Fehler bei Orderprüfung: {e}")
+            self.telegram(f"Fehler bei Orderprüfung {self.botname}: {e}")
+
+    def ordergroesse(self):
+        # 3. Ordergröße ermitteln (Compounding-Logik)
+        if self.action == "increase":  # Nachkauforder
+            self.logs.append(f"position_size bei increase: {self.position_size}, botname={self.botname}")
+            if self.position_size is None:
+                self.logs.append("❌ Keine Verbindung zur BingX API – Order wird NICHT gesetzt")
+                self.telegram(f"❌❌❌ Keine Verbindung zu BingX für Bot {self.botname}")
+                return jsonify({"error": True, "msg": "Keine Verbindung zu BingX - increase aborted", "logs": self.logs}), 500
+            if self.position_size <= 0:
+                # Position auf BingX bereits geschlossen, in TradingView noch nicht → increase startet keine neue Position
+                return self._keine_base_order("beenden=ja" if self.beenden.lower() == "ja" else "keine offene Position")
+            self.open_sell_orders_exist = True
+
+        self.logs.append(f"action={self.action}, botname={self.botname}, open_sell_orders_exist={self.open_sell_orders_exist}")
+
+        if self.open_sell_orders_exist:
+            # Folgeorder: letzte Ordergröße mal usdt_factor
+            naechster_betrag = bot_state.skaliere_usdt(self.botname, self.usdt_factor)
+            if naechster_betrag:
+                self.usdt_amount = naechster_betrag
+                self.logs.append(f"Nächste Ordergröße mit Faktor {self.usdt_factor} berechnet: {self.usdt_amount}")
+                return None
+            # Fallback aus Firebase
             try:
-                balance_response = get_futures_balance(api_key, secret_key)
-                logs.append(f"Balance Response: {balance_response}")
-                if balance_response.get("code") == 0:
-                    
-                    balance_data_temp = float(balance_response.get("data", {}).get("balance", {}).get("availableMargin", 0))
-                    available_usdt = balance_data_temp * leverageB
-                    logs.append(f"Freies USDT Guthaben: {available_usdt}")
+                usdt_amount = firebase_lese_ordergroesse(self.botname, self.firebase_secret) or 0
+                if usdt_amount > 0:
+                    self.usdt_amount = usdt_amount * self.usdt_factor
+                    bot_state.setze_usdt(self.botname, self.usdt_amount)
+                    self.logs.append(f"Ordergröße aus Firebase gelesen und mit Faktor {self.usdt_factor} multipliziert: {self.usdt_amount}")
+                    zaehler.erhoehen("fallbacks", art="firebase_ordergroesse")
+                    self.telegram(f"ℹ️ Ordergröße aus Firebase verwendet bei Bot: {self.botname}")
                 else:
-                    logs.append("Fehler beim Abrufen der Balance.")
+                    self.logs.append(f"❌ Keine Ordergröße gefunden für {self.botname}")
             except Exception as e:
-                logs.append(f"Fehler bei Balance-Abfrage: {e}")
-                available_usdt = None
-        
-
-
-            
-
-
-
-
-
-
-
-
-
+                bot_state.setze_status(self.botname, "Fehler")
+                self.logs.append(f"Fehler beim Lesen der Ordergröße aus Firebase: {e}")
+                zaehler.erhoehen("fehler", art="firebase_ordergroesse")
+                self.telegram(f"❌ Fehler beim Lesen der Ordergröße aus Firebase {self.botname}: {e}")
+            return None
 
+        # Base Order
+        if self.beenden.lower() == "ja":
+            return self._keine_base_order("beenden=ja")
+
+        bot_state.neuer_zyklus(self.botname)
+        if bot_state.loesche_usdt(self.botname):
+            self.logs.append(f"Ordergröße aus Cache für {self.botname} gelöscht (erste Order)")
+
+        # Balance wurde oben bereits parallel gelesen
+        balance_response = ergebnis_oder_fehler(self.vorab["balance"])
+        balance_data = balance_response.get("data", {}).get("balance", {})
+        available_margin = float(balance_data.get("availableMargin", 0))
+        position_margin = float(balance_data.get("usedMargin", 0))
+        account_size = available_margin + position_margin
+
+        # === BO-Faktor abhängig von MA bestimmen (NUR Baseorder) ===
+        bot_nr = int(self.bot_nr)
+        bo_factor = self.bo_factor
+        if self._ma_aktiv() == 1:
+            bo_factor = self.bo_factor2
+            # ✅ nur wenn zuvor ein SL passiert ist -> das ist wirklich der Recovery-Trade
+            if bot_state.aktiviere_recovery(bot_nr, self.seite.name):
+                self.logs.append(f"Recovery aktiviert für {(bot_nr, self.seite.name)}")
+                self.logs.append(f"bo_factor2 verwendet (MA=1): {bo_factor}")
+            else:
+                # verhindert falsche Recovery-Markierung
+                self.logs.append("MA=1 aber kein recovery_pending -> Recovery NICHT markiert")
+        else:
+            self.logs.append(f"bo_factor verwendet (MA=0): {bo_factor}")
 
+        firebase_setze_ma_wert(bot_nr, 0, self.firebase_secret)
+        bot_state.setze_ma(bot_nr, 0)
 
+        self.logs.debug("RAW balance response: {}", balance_response)
+        self.logs.append(f"Accountgrösse: {account_size}")
+        self.logs.append(f"Verfügbare Marge: {available_margin}")
+        self.logs.append(f"Position Marge: {position_margin}")
 
-            
-            # 2. Offene Orders abrufen
-            open_orders = {}
-            try:
-                open_orders = get_open_orders(api_key, secret_key, symbol)
-                logs.append(f"Open Orders: {open_orders}")
-            except Exception as e:
-                logs.append(f"Fehler bei Orderprüfung: {e}")
-                sende_telegram_nachricht(botname, f"Fehler bei Orderprüfung {botname}: {e}")
-        
-            # 3. Ordergröße ermitteln (Compounding-Logik)
-            usdt_amount = 0
-    
-            
-            
-            open_sell_orders_exist = False
-    
-            
-            if action == "increase":  # Nachkauforder
-                position_size, _, _ = get_current_position(api_key, secret_key, symbol, position_side, logs)
-                logs.append(f"position_size_A={position_size}, botname={botname}, open_sell_orders_exist={open_sell_orders_exist}")
-                if position_size is None:
-                    logs.append("❌ Keine Verbindung zur BingX API – Order wird NICHT gesetzt")
-                    sende_telegram_nachricht(botname, f"❌❌❌ Keine Verbindung zu BingX für Bot {botname}")
-                    raise Exception("Keine Verbindung zu BingX – Bot gestoppt")
-    
-                logs.append(f"position_size_B={position_size}, botname={botname}, open_sell_orders_exist={open_sell_orders_exist}")
-                
-                if position_size > 0:
-                    open_sell_orders_exist = True
-                else: # erste Order, wird ausgeführt wenn auf Bingx die Position bereits geschlossen wurde, aber in Traidingview noch nicht -> increase-Befehl startet keine neue Position
-                    if beenden.lower() == "ja" or position_size == 0:
-                        logs.append(f"⚠️ Bot {botname}: Beenden=ja → KEINE neue Base Order wird eröffnet")
-                        # Nur Status zurückgeben, keine Base Order setzen
-                        return jsonify({
-                            "status": "no_base_order_opened",
-                            "botname": botname,
-                            "reason": "beenden=ja",
-                            "logs": logs
-                        })
-                    else:
-                        open_sell_orders_exist = False
-                        saved_usdt_amounts.pop(botname, None)
-                        status_fuer_alle.pop(botname, None)
-                        alarm_counter.pop(botname, None)
-                        base_order_times.pop(botname, None)
-        
-                        
-        
-                        status_fuer_alle[botname] = "OK"
-                        alarm_counter[botname] = -1
-                        
-                        try:
-                            
-                            logs.append(firebase_loesche_kaufpreise(botname, firebase_secret))
-                            logs.append(firebase_loesche_ordergroesse(botname, firebase_secret))
-                            logs.append(firebase_loesche_base_order_time(botname, firebase_secret))
-                            print("\n".join(logs))
-                        except Exception as e:
-                            print(f"Fehler beim Löschen von Kaufpreisen/Ordergrößen für {botname}: {e}")
-        
-            else:  # erste Order
-                open_sell_orders_exist = False
-            
-            logs.append(f"action={action}, botname={botname}, open_sell_orders_exist={open_sell_orders_exist}")
-            
-            
-            # Wenn keine offene Sell-Limit-Order existiert → erste Order
-            if not open_sell_orders_exist:
-                if beenden.lower() == "ja":
-                    logs.append(f"⚠️ Bot {botname}: Beenden=ja → KEINE neue Base Order wird eröffnet")
-                    # Nur Status zurückgeben, keine Base Order setzen
-                    return jsonify({
-                        "status": "no_base_order_opened",
-                        "botname": botname,
-                        "reason": "beenden=ja",
-                        "logs": logs
-                    })
-                else:
+        if self.available_usdt is not None and self.pyramiding > 0:
+            margin_budget = max((account_size - self.sicherheit) * bo_factor, 0)   # das ist Margin
+            self.usdt_amount = margin_budget * self.leverageB                       # das ist Positionswert
+            bot_state.setze_usdt(self.botname, self.usdt_amount)
+            self.logs.append(f"Erste Ordergröße berechnet: {self.usdt_amount}")
 
-            
-                    status_fuer_alle[botname] = "OK"
-                    alarm_counter[botname] = -1
-                   
-                        
-                    #logs.append(firebase_loesche_ordergroesse(botname, firebase_secret))
-                
-                    if botname in saved_usdt_amounts:
-                        del saved_usdt_amounts[botname]
-                        logs.append(f"Ordergröße aus Cache für {botname} gelöscht (erste Order)")
-
-
-                    balance_response = get_futures_balance(api_key, secret_key)
-                    
-                    balance_data = balance_response.get("data", {}).get("balance", {})
-                    
-                    available_margin = float(balance_data.get("availableMargin", 0))
-                    position_margin = float(balance_data.get("usedMargin", 0))
-                    
-                    account_size = available_margin + position_margin
-
-                    # === BO-Faktor abhängig von MA bestimmen (NUR Baseorder) ===
-                    if bot_nr in ma_Wert:
-                        ma_aktiv = ma_Wert.get(bot_nr, 0)
-                        logs.append(f"MA aus RAM gelesen: {ma_aktiv} (bot_nr={bot_nr})")
-                    else:
-                        ma_aktiv = firebase_lese_ma_wert(bot_nr, firebase_secret)
-                        logs.append(f"MA aus Firebase gelesen: {ma_aktiv} (bot_nr={bot_nr})")
-
-                    position_side = str(position_side).strip().upper()
-                    bot_nr = int(bot_nr)
-                    
-                    if ma_aktiv == 1:
-                        bo_factor = bo_factor2
-                    
-                        # ✅ nur wenn zuvor ein SL passiert ist -> das ist wirklich der Recovery-Trade
-                        if recovery_pending.get(bot_nr) is True:
-                            recovery_trade[(bot_nr, position_side)] = "ja"
-                            recovery_pending.pop(bot_nr, None)
-                            logs.append(f"Recovery aktiviert für {(bot_nr, position_side)}")
-                            logs.append(f"bo_factor2 verwendet (MA=1): {bo_factor2}")
-                        else:
-                            # optional: verhindert falsche Recovery-Markierung
-                            logs.append("MA=1 aber kein recovery_pending -> Recovery NICHT markiert")
-                    
-                    else:
-                        bo_factor = bo_factor
-                        logs.append(f"bo_factor verwendet (MA=0): {bo_factor}")
-
-                    firebase_setze_ma_wert(bot_nr, 0, firebase_secret)
-                    ma_Wert[bot_nr] = 0
-
-
-                    logs.append(f"RAW balance response: {balance_response}")
-                    logs.append(f"Accountgrösse: {account_size}")
-                    logs.append(f"Verfügbare Marge: {available_margin}")
-                    logs.append(f"Position Marge: {position_margin}")
-                                        
-                    if available_usdt is not None and pyramiding > 0:
-                        # Erste Order bleibt unverändert
-                        #usdt_amount = max(((available_usdt - sicherheit) * bo_factor), 0)    #max(((available_usdt - sicherheit) / pyramiding), 0)
-                        #usdt_amount = max((account_size - sicherheit) * bo_factor, 0)
-                        margin_budget = max((account_size - sicherheit) * bo_factor, 0)   # das ist jetzt Margin
-                        usdt_amount   = margin_budget * leverageB                         # das ist Positionswert
-                        saved_usdt_amounts[botname] = usdt_amount
-
-                        saved_usdt_amounts[botname] = usdt_amount
-                        logs.append(f"Erste Ordergröße berechnet: {usdt_amount}")
-                    
-            
-            # Wenn globale Variable vorhanden → nächste Orders
-            else:
-                saved_usdt_amount = saved_usdt_amounts.get(botname, 0)
-                if saved_usdt_amount and saved_usdt_amount > 0:
-                    usdt_amount = saved_usdt_amount * usdt_factor
-                    saved_usdt_amounts[botname] = usdt_amount
-                    logs.append(f"Nächste Ordergröße mit Faktor {usdt_factor} berechnet: {usdt_amount}")
-                   
-                else:
-                    # Fallback aus Firebase
-                    try:
-                        usdt_amount = firebase_lese_ordergroesse(botname, firebase_secret) or 0
-                        if usdt_amount > 0:
-                            saved_usdt_amounts[botname] = usdt_amount * usdt_factor
-                            usdt_amount = saved_usdt_amounts[botname]
-                            logs.append(f"Ordergröße aus Firebase gelesen und mit Faktor {usdt_factor} multipliziert: {usdt_amount}")
-                            sende_telegram_nachricht(botname, f"ℹ️ Ordergröße aus Firebase verwendet bei Bot: {botname}")
-                        else:
-                            logs.append(f"❌ Keine Ordergröße gefunden für {botname}")
-                    except Exception as e:
-                        status_fuer_alle[botname] = "Fehler"
-                        logs.append(f"Fehler beim Lesen der Ordergröße aus Firebase: {e}")
-                        sende_telegram_nachricht(botname, f"❌ Fehler beim Lesen der Ordergröße aus Firebase {botname}: {e}")
-        
-            # 4. Market-Order ausführen
-            try:
-                logs.append(f"Plaziere Market-Order mit {usdt_amount} USDT für {symbol} ({position_side})...")
-                order_response = place_market_order(api_key, secret_key, symbol, float(usdt_amount), position_side)
-                alarm_counter[botname] += 1
-                logs.append(firebase_speichere_ordergroesse(botname, usdt_amount, firebase_secret))
-                time.sleep(2)
-                logs.append(f"Market-Order Antwort: {order_response}")
-    
-                # API-Antwort prüfen
-                if not order_response or order_response.get("code") != 0:
-                    status_fuer_alle[botname] = "Fehler"
-                    logs.append(order_response)
-                    sende_telegram_nachricht(botname, f"❌❌❌ Marketorder konnte nicht gesetzt werden für Bot: {botname}")
-            except Exception as e:
-                logs.append(f"Fehler bei Marketorder: {e}")
-                status_fuer_alle[botname] = "Fehler"
-                sende_telegram_nachricht(botname, f"❌❌❌ Marketorder konnte nicht gesetzt werden für Bot: {botname}")
-                
-                
-            # 5. Positionsgröße und Liquidationspreis ermitteln
-            try:
-                sell_quantity, positions_raw, liquidation_price = get_current_position(api_key, secret_key, symbol, position_side, logs)
-                
-                # ✅ Fallback: LONG + Hebel 1 → "Pseudo-Liquidationspreis" = 20% unter avgPrice
-                for pos in positions_raw:
-                    if pos.get("symbol") == symbol and pos.get("positionSide", "").upper() == position_side.upper():
-                        avg_price = float(pos.get("avgPrice", 0)) or float(pos.get("averagePrice", 0))
-                                                                   
-                if position_side == "LONG" and int(leverageB) == 1:
-                    liquidation_price = avg_price * 0.70 
-                    logs.append(
-                        f"LONG 1x erkannt → pseudo liquidation_price = {liquidation_price} (20% unter avgPrice {avg_price})"
-                    )
-        
-                if sell_quantity == 0:
-                    executed_qty_str = order_response.get("data", {}).get("order", {}).get("executedQty")
-                    if executed_qty_str:
-                        sell_quantity = float(executed_qty_str)
-                        logs.append(f"[Market Order] Ausgeführte Menge aus order_response genutzt: {sell_quantity}")
-        
-                if liquidation_price:
-                    stop_loss_price = round(liquidation_price * (1 + sl / 100), 6)
-                    logs.append(f"Stop-Loss-Preis basierend auf Liquidationspreis {liquidation_price}: {stop_loss_price}")
-                else:
-                    stop_loss_price = None
-                    logs.append("Liquidationspreis nicht verfügbar. Kein Stop-Loss-Berechnung möglich.")
-                    sende_telegram_nachricht(botname, f"❌ Liquidationspreis nicht verfügbar für Bot: {botname}")
-            except Exception as e:
-                sell_quantity = 0
-                stop_loss_price = None
-                logs.append(f"Fehler bei Positions- oder Liquidationspreis-Abfrage: {e}")
-                sende_telegram_nachricht(botname, f"❌ Fehler bei Positions- oder Liquidationspreis-Abfrage {botname}: {e}")
-        
-            # 6. Kaufpreise ggf. löschen
-            if firebase_secret and not open_sell_orders_exist:
-                try:
-                    logs.append(firebase_loesche_kaufpreise(botname, firebase_secret))
-                except Exception as e:
-                    logs.append(f"Fehler beim Löschen der Kaufpreise: {e}")
-                    status_fuer_alle[botname] = "Fehler"
-        
-            # 7. Kaufpreis speichern 
-            if firebase_secret and price_from_webhook:
-                try:
-                    logs.append(firebase_speichere_kaufpreis(botname, float(price_from_webhook), float(usdt_amount), firebase_secret))
-                except Exception as e:
-                    logs.append(f"Fehler beim Speichern des Kaufpreises: {e}")
-                    status_fuer_alle[botname] = "Fehler"
-            
-            
-            # 8. Durchschnittspreis bestimmen
-            durchschnittspreis = None
-            kaufpreise = []
-        
-            if status_fuer_alle.get(botname) == "Fehler":
-                logs.append(f"Status für {botname} ist Fehler, Fallback auf BingX.")
-                try:
-                    for pos in positions_raw:
-                        if pos.get("symbol") == symbol and pos.get("positionSide", "").upper() == position_side.upper():
-                            avg_price = float(pos.get("avgPrice", 0)) or float(pos.get("averagePrice", 0))
-                            if avg_price > 0:
-                                durchschnittspreis = round(avg_price * (1 - 0.002), 6)
-                                logs.append(f"[Fallback] avgPrice von BingX verwendet: {durchschnittspreis}")
-                                sende_telegram_nachricht(botname, f"ℹ️ Durchschnittspreis von BINGX verwendet für Bot: {botname}")
-                            break
-                except Exception as e:
-                    logs.append(f"[Fehler] avgPrice-Fallback fehlgeschlagen: {e}")
+    def market_order(self):
+        # 4. Market-Order ausführen
+        try:
+            self.logs.append(f"Plaziere Market-Order mit {self.usdt_amount} USDT für {self.symbol} ({self.seite.name})...")
+            self.order_response = place_market_order(self.api_key, self.secret_key, self.symbol, float(self.usdt_amount), self.seite.name,
+                                                     self.order_id("market", bot_state.hole_alarm(self.botname) + 1))
+            bot_state.erhoehe_alarm(self.botname)
+            self.logs.append(firebase_speichere_ordergroesse(self.botname, self.usdt_amount, self.firebase_secret))
+            self.logs.debug("Market-Order Antwort: {}", self.order_response)
+
+            if not self.order_response or self.order_response.get("code") != 0:
+                bot_state.setze_status(self.botname, "Fehler")
+                self.logs.append("Marketorder konnte nicht gesetzt werden.")
+                self.telegram(f"❌❌❌ Marketorder konnte nicht gesetzt werden für Bot: {self.botname}")
             else:
-                try:
-                    if firebase_secret:
-                        kaufpreise = firebase_lese_kaufpreise(botname, firebase_secret)
-                        logs.append(f"[Firebase] Gelesene Kaufpreise Rohdaten: {kaufpreise}")
-                        durchschnittspreis = berechne_durchschnittspreis(kaufpreise or [])
-                        if durchschnittspreis:
-                            logs.append(f"[Firebase] Durchschnittspreis berechnet: {durchschnittspreis}")
-                        else:
-                            logs.append("[Firebase] Keine gültigen Kaufpreise gefunden.")
-                            status_fuer_alle[botname] = "Fehler"
-                except Exception as e:
-                    status_fuer_alle[botname] = "Fehler"
-                    logs.append(f"[Fehler] Firebase-Zugriff fehlgeschlagen: {e}")
-        
-                if not durchschnittspreis or durchschnittspreis == 0:
-                    try:
-                        for pos in positions_raw:
-                            if pos.get("symbol") == symbol and pos.get("positionSide", "").upper() == position_side.upper():
-                                avg_price = float(pos.get("avgPrice", 0)) or float(pos.get("averagePrice", 0))
-                                if avg_price > 0:
-                                    durchschnittspreis = round(avg_price * (1 - 0.002), 6)
-                                    logs.append(f"Fallback avgPrice verwendet für Bot: {botname}")
-                                    sende_telegram_nachricht(botname, f"ℹ️ Durchschnittspreis von BINGX verwendet für Bot: {botname}")
-                                    status_fuer_alle[botname] = "Fehler"
-                                else:
-                                    logs.append("[Fallback] Kein gültiger avgPrice vorhanden.")
-                                break
-                    except Exception as e:
-                        logs.append(f"[Fehler] avgPrice-Fallback fehlgeschlagen: {e}")
-                        sende_telegram_nachricht(botname, f"❌ Fallback von BINGX fehlgeschlagen für Bot: {botname}")
-        
-            # 9. Alte Sell-Limit-Orders löschen
-            try:
-                if isinstance(open_orders, dict) and open_orders.get("code") == 0:
-                    for order in open_orders.get("data", {}).get("orders", []):
-                        if order.get("side") == "SELL" and order.get("positionSide") == position_side and order.get("type") == "LIMIT":
-                            cancel_response = cancel_order(api_key, secret_key, symbol, str(order.get("orderId")))
-                            logs.append(f"Gelöschte Order {order.get('orderId')}: {cancel_response}")
-            except Exception as e:
-                logs.append(f"Fehler beim Löschen der Sell-Limit-Orders: {e}")
-                sende_telegram_nachricht(botname, f"Fehler beim Löschen der Sell-Limit-Order {botname}: {e}")
-    
-    
-            if not open_sell_orders_exist: #Zeitpunkt der BO speichern und Botname ergänzen
-                # Firebase löschen
-                try:
-                    logs.append(firebase_delete_aktueller_bot(bot_nr, firebase_secret))
+                # statt fester Pause: warten, bis der Fill in der Position sichtbar ist
+                self.fill_position = warte_auf_fill(self.api_key, self.secret_key, self.symbol, self.seite.name,
+                                                    self.order_response, self.position_size, logs=self.logs)
+        except Exception as e:
+            self.logs.append(f"Fehler bei Marketorder: {e}")
+            bot_state.setze_status(self.botname, "Fehler")
+            self.telegram(f"❌❌❌ Marketorder konnte nicht gesetzt werden für Bot: {self.botname}")
 
+    def position_nach_fill(self):
+        # 5. Positionsgröße und Liquidationspreis ermitteln
+        try:
+            self.sell_quantity, self.positions_raw, self.liquidation_price = (
+                self.fill_position or get_current_position(self.api_key, self.secret_key, self.symbol, self.seite.name, self.logs)
+            )
 
-                except Exception as e:
-                    logs.append(f"Fehler beim Löschen von aktueller_Bot in Firebase: {e}")
-                    sende_telegram_nachricht(botname, f"Fehler beim Löschen von aktueller_Bot in Firebase {botname}: {e}")
-                    
-                aktueller_Bot[bot_nr] = botname
-                
-                logs.append(
-                    f"Aktuelle Baseorder ausgeführt → "
-                    f"bot_nr={bot_nr}, botname={botname}"
+            if self.seite.pseudo_liquidation and int(self.leverageB) == 1:
+                avg_price = self._bingx_avg_price()
+                self.liquidation_price = avg_price * self.seite.pseudo_liquidation
+                self.logs.append(
+                    f"{self.seite.name} 1x erkannt → pseudo liquidation_price = {self.liquidation_price} "
+                    f"({self.seite.pseudo_liquidation} × avgPrice {avg_price})"
                 )
 
-                
-                
-                # 🔥 In Firebase unter aktueller_Bot speichern
-                try:
-                    logs.append(firebase_set_aktueller_bot(bot_nr, botname, firebase_secret))
-                except Exception as e:
-                    logs.append(f"Fehler beim Schreiben von aktueller_Bot in Firebase: {e}")
-                    sende_telegram_nachricht(botname, f"Fehler beim Schreiben von aktueller_Bot in Firebase {botname}: {e}")
-
-
-                
-                 # 1. Zeitpunkt merken
-                now = datetime.now(timezone.utc)
-                base_order_times[botname] = now
-                base_time = now
-                logs.append(f"Base-Order Zeitpunkt gespeichert (global): {now}")
-                #print(firebase_speichere_base_order_time("TEST_BOT", now, firebase_secret))
-                print(logs[-1])
-    
-                
-                # 2. Zeitpunkt in Firebase speichern
-                try:
-                    firebase_loesche_base_order_time
-                    firebase_speichere_base_order_time(botname, now, firebase_secret)  # du musst diese Funktion anlegen
-                    logs.append(f"Base-Order Zeitpunkt in Firebase gespeichert: {now}")
-                    print(logs[-1])
-                except Exception as e:
-                    logs.append(f"Fehler beim Speichern des Base-Order-Zeitpunkts in Firebase: {e}")
-                    print(logs[-1])
+            if self.sell_quantity == 0 and self.order_response:
+                executed_qty_str = self.order_response.get("data", {}).get("order", {}).get("executedQty")
+                if executed_qty_str:
+                    self.sell_quantity = float(executed_qty_str)
+                    self.logs.append(f"[Market Order] Ausgeführte Menge aus order_response genutzt: {self.sell_quantity}")
+
+            if self.liquidation_price:
+                self.stop_loss_price = self.seite.sl_preis(self.liquidation_price, self.sl)
+                self.logs.append(f"Stop-Loss-Preis basierend auf Liquidationspreis {self.liquidation_price}: {self.stop_loss_price}")
             else:
-    
-                # 1. Zeitpunkt aus globaler Variable prüfen #Bei Test wird aus JSON-Webhook genommen
-                if not base_time2:  # leer oder None
-                    base_time = base_order_times.get(botname)
-                else:
-                    try:
-                        # falls base_time2 ein ISO-String ist, in datetime konvertieren
-                        base_time = datetime.fromisoformat(base_time2)
-                
-                        # falls ohne Zeitzone -> auf UTC setzen
-                        if base_time.tzinfo is None:
-                            base_time = base_time.replace(tzinfo=timezone.utc)
-                
-                    except Exception as e:
-                        logs.append(f"Fehler beim Umwandeln von base_time2: {e}")
-                        base_time = None
-                
-                
-                # 2. Wenn nichts in globaler Variable, aus Firebase laden
-                if base_time is None:
-                    try:
-                        base_time_str = firebase_lese_base_order_time(botname, firebase_secret)  # ISO-String zurückgeben
-                        if base_time_str:
-                            base_time = datetime.fromisoformat(base_time_str)
-                
-                            # falls ohne Zeitzone gespeichert -> auf UTC setzen
-                            if base_time.tzinfo is None:
-                                base_time = base_time.replace(tzinfo=timezone.utc)
-                
-                            base_order_times[botname] = base_time  # wieder in global speichern
-                            logs.append(f"Base-Order Zeitpunkt aus Firebase geladen: {base_time}")
-                            print(logs[-1])
-                        else:
-                            logs.append("Keine Base-Order-Zeit in Firebase gefunden.")
-                            print(logs[-1])
-                            base_time = None
-                    except Exception as e:
-                        logs.append(f"Fehler beim Laden des Base-Order-Zeitpunkts aus Firebase: {e}")
-                        print(logs[-1])
-                        base_time = None
-        
-                # Alarm-Infos
-                alarm_trigger = int(data.get("RENDER", {}).get("alarm", 0))
-                if status_fuer_alle.get(botname) == "Fehler":
-                    anzahl_nachkäufe = alarm_counter.get(botname, -1)
-                else:
-                    anzahl_käufe = len(kaufpreise or [])
-                    anzahl_nachkäufe = max(anzahl_käufe - 1, 0)     
-                    
-                logs.append(f"Alarm2 {alarm_trigger - 4}")
-                logs.append(f"Alarm3 {anzahl_nachkäufe}") 
-
-
-                if anzahl_nachkäufe >= alarm_trigger:
-                    try:
-                        nachricht = f"{botname}:\nNachkäufe: {anzahl_nachkäufe}"
-                        telegram_result = sende_telegram_nachricht(botname, nachricht)
-                        logs.append(f"Telegram gesendet: {telegram_result}")
-                    except Exception as e:
-                        logs.append(f"Fehler beim Senden der Telegram-Nachricht: {e}")
-                        sende_telegram_nachricht(botname, f"Fehler beim Senden der Telegram-Nachricht {botname}: {e}")
-
-                
-                # 3. Prüfen, ob 48 Stunden seit Base-Order vergangen sind oder Nachkauforder erreicht ist
-                if base_time is not None:
-                    delta = datetime.now(timezone.utc) - base_time   # immer UTC-aware
-                    if delta.total_seconds() >= after_h * 3600 or anzahl_nachkäufe >= after_so:
-                        sell_percentage = sell_percentage2
-                        try:
-                            for pos in positions_raw:
-                                if pos.get("symbol") == symbol and pos.get("positionSide", "").upper() == position_side.upper():
-                                    avg_price = float(pos.get("avgPrice", 0)) or float(pos.get("averagePrice", 0))
-                                    if avg_price > 0:
-                                        durchschnittspreis = round(avg_price, 6)
-                                        logs.append(f"[Fallback] avgPrice von BingX verwendet: {durchschnittspreis}")
-                                    break
-                        except Exception as e:
-                            logs.append(f"[Fehler] fehlgeschlagen: {e}")
-                        
-                        logs.append(f"Zeit überschritten oder Nachkaufgrenze erreicht → sell_percentage verringert.")
-                        print(logs[-1])
-                    
-            # 10. Neue Limit-Order setzen
-            limit_order_response = None
-        
-            position_size, _, _ = get_current_position(api_key, secret_key, symbol, position_side, logs)
-         
-            try:
-                if durchschnittspreis and sell_percentage:
-                    limit_price = round(durchschnittspreis * (1 + float(sell_percentage) / 100), 6)
-                else:
-                    limit_price = 0
-        
-                sell_quantity = min(sell_quantity, position_size)
-        
-                if sell_quantity > 0 and limit_price > 0:
-                    limit_order_response = place_limit_sell_order(api_key, secret_key, symbol, sell_quantity, limit_price, position_side)
-                    logs.append(f"Limit-Order gesetzt für Bot {botname} (Basis Durchschnittspreis {durchschnittspreis}): {limit_order_response}")
-                else:
-                    logs.append("Ungültige Daten, keine Limit-Order gesetzt.")
-                    sende_telegram_nachricht(botname, f"❌ Ungültige Daten, keine Limit-Order gesetzt für Bot: {botname}")
-            except Exception as e:
-                logs.append(f"Fehler bei Limit-Order: {e}")
-                sende_telegram_nachricht(botname, f"❌ Fehler bei Limit-Order für Bot: {botname}")
-        
-            # 11. Bestehende STOP_MARKET SL-Orders löschen
+                self.stop_loss_price = None
+                self.logs.append("Liquidationspreis nicht verfügbar. Kein Stop-Loss-Berechnung möglich.")
+                self.telegram(f"❌ Liquidationspreis nicht verfügbar für Bot: {self.botname}")
+        except Exception as e:
+            self.sell_quantity = 0
+            self.stop_loss_price = None
+            self.logs.append(f"Fehler bei Positions- oder Liquidationspreis-Abfrage: {e}")
+            self.telegram(f"❌ Fehler bei Positions- oder Liquidationspreis-Abfrage {self.botname}: {e}")
+
+    def kaufpreise(self):
+        # 6. Kaufpreise bei neuer Base Order löschen
+        if self.firebase_secret and not self.open_sell_orders_exist:
             try:
-                for order in open_orders.get("data", {}).get("orders", []):
-                    if order.get("type") == "STOP_MARKET" and order.get("positionSide") == position_side:
-                        cancel_response = cancel_order(api_key, secret_key, symbol, str(order.get("orderId")))
-                        logs.append(f"Bestehende SL-Order gelöscht: {cancel_response}")
+                self.logs.append(firebase_loesche_kaufpreise(self.botname, self.firebase_secret))
             except Exception as e:
-                logs.append(f"Fehler beim Löschen alter Stop-Market-Orders: {e}")
-                sende_telegram_nachricht(botname, f"❌ Fehler beim Löschen des Stop Loss für Bot: {botname}")
-        
-           # Stop Loss: BUY STOP_MARKET über entry
-            sl_order_resp = None
+                self.logs.append(f"Fehler beim Löschen der Kaufpreise: {e}")
+                bot_state.setze_status(self.botname, "Fehler")
+
+        # 7. Kaufpreis speichern
+        if self.firebase_secret and self.price_from_webhook:
             try:
-                if sell_quantity > 0 and stop_loss_price:
-                    sl_order_resp = place_stop_loss_order(api_key, secret_key, symbol, sell_quantity, stop_loss_price, "LONG")
-                    logs.append(f"SL Stop-Market(BUY) Order gesetzt @ {stop_loss_price}: {sl_order_resp}")
-                    if sl_order_resp.get("code") != 0 or sl_order_resp.get("data", {}).get("order", {}).get("status") not in (None, "NEW",):
-                        logs.append("SL Stop-Market konnte nicht gesetzt werden.")
-                        sende_telegram_nachricht(botname, f"⚠️ SL Stop-Market-Order konnte nicht gesetzt werden!\nSymbol: {symbol}\nResponse: {sl_order_resp}")
-                else:
-                    logs.append("Keine SL gesetzt – fehlende Parameter (sell_quantity oder stop_loss_price).")
-                    sende_telegram_nachricht(botname, f"⚠️ Keine SL gesetzt (fehlende Daten) für Bot: {botname}")
+                self.logs.append(firebase_speichere_kaufpreis(self.botname, float(self.price_from_webhook), float(self.usdt_amount), self.firebase_secret))
             except Exception as e:
-                logs.append(f"Fehler beim Setzen der SL-Order: {e}")
-                sende_telegram_nachricht(botname, f"❌ Fehler beim Setzen der SL für Bot: {botname}: {e}")
-
+                self.logs.append(f"Fehler beim Speichern des Kaufpreises: {e}")
+                bot_state.setze_status(self.botname, "Fehler")
 
-        
-            return jsonify({
-                "error": False,
-                "order_result": order_response,
-                "limit_order_result": limit_order_response,
-                "symbol": symbol,
-                "botname": botname,
-                "usdt_amount": usdt_amount,
-                "sell_quantity": sell_quantity,
-                "price_from_webhook": price_from_webhook,
-                "sell_percentage": sell_percentage,
-                "firebase_average_price": durchschnittspreis,
-                "firebase_all_prices": kaufpreise,
-                "usdt_balance_before_order": available_usdt,
-                "stop_loss_price": stop_loss_price if liquidation_price else None,
-                "stop_loss_price": stop_loss_price if 'stop_loss_price' in locals() else None,
-                "saved_usdt_amount": saved_usdt_amounts,
-                "status_fuer_alle": status_fuer_alle,
-                "Botname": botname,
-                "logs": logs
-            })
-        
-#     #      #      #      #      #      #      #      #     #      #      #      #      #      #      #   #     #      #      #      #      #      #      #   #     #      #      #      #      #      #      #   
-
-    if position_side == "SHORT":
-        data = request.json or {}
-        
-        logs = []
-    
-        # Pflicht: botname
-        botname = data.get("RENDER", {}).get("botname")
-        if not botname:
-            return jsonify({"error": True, "msg": "botname ist erforderlich"}), 400
-    
-        # Basis-Parameter
-        symbol = data.get("RENDER", {}).get("symbol", "")
-        api_key = data.get("RENDER", {}).get("api_key")
-        secret_key = data.get("RENDER", {}).get("secret_key")
-        firebase_secret = data.get("RENDER", {}).get("FIREBASE_SECRET")
-        position_side = (data.get("RENDER", {}).get("position_side") or data.get("RENDER", {}).get("positionSide") or "SHORT").upper()
-        # Erzwinge SHORT-only
-        if position_side != "SHORT":
-            return jsonify({"error": True, "msg": "Nur position_side=SHORT erlaubt. Abgebrochen."}), 400
-    
-        # Weitere parameter
-        pyramiding = float(data.get("RENDER", {}).get("pyramiding", 1))
-        leverageB = float(data.get("RENDER", {}).get("leverage", 1))     #float(data.get("leverage", 1))
-        sicherheit = float(data.get("RENDER", {}).get("sicherheit", 0)) # * leverageB)    #float(data.get("sicherheit", 0) * leverageB)
-        leverage = float(data.get("RENDER", {}).get("leverage", 1))
-        sicherheit_param = float(data.get("RENDER", {}).get("sicherheit", 0))
-        # Hinweis: in vielen deiner bisherigen Codes wurde Sicherheiten mit Hebel multipliziert -> beibehalten falls gewünscht
-        ## sicherheit = sicherheit_param * leverage
-        sell_percentage = data.get("RENDER", {}).get("sell_percentage")
-        price_from_webhook = data.get("RENDER", {}).get("price")
-        usdt_factor = float(data.get("RENDER", {}).get("usdt_factor", 1))
-        bo_factor = float(data.get("RENDER", {}).get("bo_factor", 0.0001))
-        bo_factor2 = float(data.get("RENDER", {}).get("bo_factor2", 0.0001))
-        action = data.get("vyn", {}).get("action", "").lower()
-        base_time2 = data.get("RENDER", {}).get("base_time2")
-        after_h = data.get("RENDER", {}).get("after_h", 48)
-        after_so = data.get("RENDER", {}).get("after_so", 14)
-        sell_percentage2 = data.get("RENDER", {}).get("sell_percentage2")
-        beenden = data.get("RENDER", {}).get("beenden", "nein")
-        sl = data.get("RENDER", {}).get("sl")
-        bot_nr = data.get("RENDER", {}).get("bot_nr")
-        ma = int(data.get("RENDER", {}).get("ma", 0))
-        leverage2 = int(data.get("RENDER", {}).get("leverage2", 0))
-        
-        
-    
-        if not api_key or not secret_key:
-            return jsonify({"error": True, "msg": "api_key und secret_key sind erforderlich"}), 400
-    
-            # Check Offene LONG-Position
-        # ------------------------------
-       
-
-    
-        # action == "close" -> sofort close der SHORT position
-        if action == "close":
-
-            # Position schließen
-            print("DEBUG close reached")
-            print("DEBUG action:", action)
-            print("DEBUG botname:", botname)
-            print("DEBUG bot_nr:", bot_nr, type(bot_nr))
-            print("DEBUG ma raw:", data.get("RENDER", {}).get("ma"), type(data.get("RENDER", {}).get("ma")))
-            print("DEBUG ma int:", ma, type(ma))
-            ergebnis = SHORT_close_open_position(api_key, secret_key, symbol, position_side)
-            
-            # Logs ausgeben
-            print(ergebnis.get("logs", []))
-            print(ergebnis.get("result", None))
-            
-            # Nur die Daten für diesen Bot zurücksetzen
-            saved_usdt_amounts.pop(botname, None)
-            status_fuer_alle.pop(botname, None)
-            alarm_counter.pop(botname, None)
-            base_order_times.pop(botname, None)
-            
-            if bot_nr in aktueller_Bot and aktueller_Bot[bot_nr] == botname:
-                del aktueller_Bot[bot_nr]  # Eintrag löschen
-                print(f"Bot {botname} mit Nummer {bot_nr} wurde aus der globalen Variable gelöscht")
-
-            position_side = str(position_side).strip().upper()
-            bot_nr = int(bot_nr)
-            key = (bot_nr, position_side)
-            
-            # Wenn diese Side als Recovery lief und im SL endet -> Telegram + kompletter Reset
-            if recovery_trade.get(key) == "ja" and ma == 1:
-                sende_telegram_nachricht(
-                    botname,
-                    f"⚠️ Recovery-Trade im StopLoss beendet (close). bot_nr={bot_nr}, side={position_side}"
-                )
-            
-                # ✅ Recovery komplett beenden
-                recovery_trade.pop(key, None)
-                recovery_pending.pop(bot_nr, None)
-            
-                # ✅ Zurück zu normalem Bot (MA aus)
-                firebase_setze_ma_wert(bot_nr, 0, firebase_secret)
-                ma_Wert[bot_nr] = 0
-            
-            else:
-                # Recovery-Flag dieser Side bei jedem close aufräumen (falls gesetzt)
-                recovery_trade.pop(key, None)
-            
-                # Wenn SL bei einem NICHT-Recovery-Trade -> Recovery für nächsten Trade "armen"
-                if ma == 1:
-                    recovery_pending[bot_nr] = True
-
-
-            print(f"MA-Wert für Bot_Nr = {ma}")    
-            if ma == 1:
-                res = firebase_setze_ma_wert(bot_nr, 1, firebase_secret)
-                print("DEBUG firebase_setze_ma_wert:", res)
-                ma_Wert[bot_nr] = 1
-                print(f"MA-Wert auf 1 gesetzt für Bot_Nr {bot_nr}")
-            
-            # optional: firebase löschen
-            if firebase_secret:
-                try:
-                    logs.append(SHORT_firebase_loesche_kaufpreise(botname, firebase_secret))
-                    logs.append(firebase_loesche_ordergroesse(botname, firebase_secret))
-                    logs.append(SHORT_firebase_loesche_base_order_time(botname, firebase_secret))
-                    logs.append(firebase_delete_aktueller_bot(bot_nr, firebase_secret))
-
-
-                except Exception as e:
-                    logs.append(f"Fehler beim Löschen in Firebase: {e}")
-            return jsonify({
-                "status": "position_closed",
-                "botname": botname,
-                "logs": ergebnis.get("logs", []),
-                "result": ergebnis.get("result", None)
-            })
-    
-        # sonst: Base Order / Increase / sonstiges (nur SHORT)
-        # 0. Guthaben abfragen
-        available_usdt = 0.0
+    def _avg_fallback(self, status_fehler):
         try:
-            balance_response = SHORT_get_futures_balance(api_key, secret_key)
-            logs.append(f"Balance Response: {balance_response}")
-            if balance_response.get("code") == 0:
-                balance_data_temp = float(balance_response.get("data", {}).get("balance", {}).get("availableMargin", 0))
-                available_usdt = balance_data_temp * leverageB
-                logs.append(f"Freies USDT Guthaben: {available_usdt}")
+            avg_price = self._bingx_avg_price()
+            if avg_price > 0:
+                self.durchschnittspreis = self.seite.avg_fallback(avg_price)
+                self.logs.append(f"[Fallback] avgPrice von BingX verwendet: {self.durchschnittspreis}")
+                zaehler.erhoehen("fallbacks", art="bingx_avg_price")
+                self.telegram(f"ℹ️ Durchschnittspreis von BINGX verwendet für Bot: {self.botname}")
+                if status_fehler:
+                    bot_state.setze_status(self.botname, "Fehler")
             else:
-                logs.append("Fehler beim Abrufen der Balance.")
+                self.logs.append("[Fallback] Kein gültiger avgPrice vorhanden.")
         except Exception as e:
-            logs.append(f"Fehler bei Balance-Abfrage: {e}")
-            SHORT_sende_telegram_nachricht(botname, f"❌❌❌ Keine Verbindung zu BingX bei Balance-Abfrage für Bot: {botname}")            
-            available_usdt = None
-
-        
-
-
-        # === SHORT: Hebel NUR vor echter Base Order setzen ===
-        position_size, _, _ = get_current_position(
-            api_key,
-            secret_key,
-            symbol,
-            "SHORT",
-            logs
-        )
-
-        if position_size == 0 and action != "increase":
-            try:
+            self.logs.append(f"[Fehler] avgPrice-Fallback fehlgeschlagen: {e}")
+            zaehler.erhoehen("fehler", art="bingx_avg_price")
+            self.telegram(f"❌ Fallback von BINGX fehlgeschlagen für Bot: {self.botname}")
+
+    def durchschnitt(self):
+        # 8. Durchschnittspreis aus den laufenden Kaufsummen, sonst avgPrice von BingX
+        if bot_state.hole_status(self.botname) == "Fehler":
+            self.logs.append(f"Status für {self.botname} ist Fehler, Fallback auf BingX.")
+            self._avg_fallback(status_fehler=False)
+            return None
 
-                if bot_nr in ma_Wert:
-                    ma_aktiv = ma_Wert.get(bot_nr, 0)
-                    logs.append(f"MA aus RAM gelesen: {ma_aktiv} (bot_nr={bot_nr})")
-            
-                # 2) falls nicht vorhanden → Firebase
-                else:
-                    ma_aktiv = firebase_lese_ma_wert(bot_nr, firebase_secret)
-                    logs.append(f"MA aus Firebase gelesen: {ma_aktiv} (bot_nr={bot_nr})")
-            
-                # 3) wenn MA aktiv → Hebel NICHT setzen
-                if ma_aktiv == 1:
-                    leverageB = leverage2
-                    logs.append(
-                        f"Hebel wurde geändert, da MA=1 "
-                        f"(bot_nr={bot_nr}, position_size={position_size})"
-                    )
-                # sauber abbrechen → kein Hebel, aber weiter im Code
-                    pass
+        try:
+            if self.firebase_secret:
+                # laufende Summen werden beim Speichern/Löschen der Kaufpreise nachgeführt
+                self.kaufsummen = bot_state.hole_kaufsummen(self.botname)
+                if self.kaufsummen is None:
+                    self.kaufsummen = firebase_lese_kaufsummen(self.botname, self.firebase_secret)
+                    bot_state.setze_kaufsummen(self.botname, self.kaufsummen)
+                    self.logs.append(f"[Firebase] Kaufsummen wiederhergestellt: {self.kaufsummen}")
+                self.logs.append(f"[Firebase] Kaufsummen (Wert, Menge, Anzahl): {self.kaufsummen}")
+                self.durchschnittspreis = durchschnitt_aus_summen(self.kaufsummen)
+                if self.durchschnittspreis:
+                    self.logs.append(f"[Firebase] Durchschnittspreis berechnet: {self.durchschnittspreis}")
                 else:
-                    
-                    logs.append("Hebel auf {leverageB} gesetzt")
+                    self.logs.append("[Firebase] Keine gültigen Kaufpreise gefunden.")
+                    bot_state.setze_status(self.botname, "Fehler")
+        except Exception as e:
+            bot_state.setze_status(self.botname, "Fehler")
+            self.logs.append(f"[Fehler] Firebase-Zugriff fehlgeschlagen: {e}")
 
-                
-                logs.append(
-                    f"Setze Hebel VOR Base Order auf {leverageB}x "
-                    f"(position_size={position_size})"
-                )
-        
-                leverage_response = set_leverage(
-                    api_key,
-                    secret_key,
-                    symbol,
-                    leverageB,
-                    position_side
-                )
-        
-                logs.append(f"Hebel-Response: {leverage_response}")
+        if not self.durchschnittspreis:
+            self._avg_fallback(status_fehler=True)
 
-        
-                time.sleep(0.2)
-        
-                if leverage_response.get("code") != 0:
-                    raise Exception(leverage_response)
-        
-            except Exception as e:
-                logs.append(f"❌ [SHORT] Hebel konnte nicht gesetzt werden: {e}")
-                return jsonify({
-                    "error": True,
-                    "msg": "SHORT Hebel konnte nicht gesetzt werden",
-                    "logs": logs
-                })
-        else:
-            logs.append(
-                f"[SHORT] Hebel NICHT gesetzt "
-                f"(position_size={position_size}, action={action})"
-            )
+    def base_order_zeit(self):
+        # Base Order: Zeitpunkt speichern und Bot als aktuellen Bot der bot_nr eintragen
+        if self.open_sell_orders_exist:
+            self.base_time = self._lade_base_time()
+            return None
 
-    
+        bot_state.setze_aktueller_bot(self.bot_nr, self.botname)
+        self.logs.append(f"Aktuelle Baseorder ausgeführt → bot_nr={self.bot_nr}, botname={self.botname}")
 
-        # 2. Offene Orders abrufen (um alte TP/SL/Limit zu handhaben)
-        open_orders = {}
+        # 🔥 In Firebase unter aktueller_Bot speichern
         try:
-            open_orders = SHORT_get_open_orders(api_key, secret_key, symbol)
-            logs.append(f"Open Orders: {open_orders}")
+            self.logs.append(firebase_set_aktueller_bot(self.bot_nr, self.botname, self.firebase_secret))
         except Exception as e:
-            logs.append(f"Fehler bei Orderprüfung: {e}")
-            SHORT_sende_telegram_nachricht(botname, f"Fehler bei Orderprüfung {botname}: {e}")
-    
-        # 3. Ordergrößen-Logik (Compounding / BO factor)
-        usdt_amount = 0
-        saved_usdt_amount = saved_usdt_amounts.get(botname)
-        open_sell_orders_exist = False
-    
-        if action == "increase":
-            # Nachkauforder: prüfen ob Position noch offen
-            position_size, _, _ = SHORT_get_current_position(api_key, secret_key, symbol, "SHORT", logs)
-            logs.append(f"position_size bei increase: {position_size}")
-            if position_size is None:
-                SHORT_sende_telegram_nachricht(botname, f"Keine Verbindung zu BingX für Bot {botname} - increase aborted")
-                return jsonify({"error": True, "msg": "Keine Verbindung zu BingX - increase aborted", "logs": logs}), 500
-            if position_size > 0:
-                open_sell_orders_exist = True
-            else:
-                # Position bereits geschlossen -> treat as new BO if beenden != "ja"
-                if beenden.lower() == "ja" or position_size == 0:
-                    logs.append("Beenden=ja → Keine neue Base Order")
-                    return jsonify({"status": "no_base_order_opened", "botname": botname, "reason": "beenden=ja", "logs": logs})
-                else:
-                    # Reset caches, proceed to set new BO
-                    saved_usdt_amounts.pop(botname, None)
-                    status_fuer_alle.pop(botname, None)
-                    alarm_counter.pop(botname, None)
-                    base_order_times.pop(botname, None)
-                    status_fuer_alle[botname] = "OK"
-                    alarm_counter[botname] = -1
-                    try:
-                        logs.append(SHORT_firebase_loesche_kaufpreise(botname, firebase_secret))
-                        logs.append(firebase_loesche_ordergroesse(botname, firebase_secret))
-                        logs.append(SHORT_firebase_loesche_base_order_time(botname, firebase_secret))
-                    except Exception as e:
-                        logs.append(f"Fehler beim Löschen in Firebase: {e}")
-                    open_sell_orders_exist = False
-        else:
-            open_sell_orders_exist = False
-    
-        logs.append(f"action={action}, open_sell_orders_exist={open_sell_orders_exist}")
-    
-        # First Base Order
-        if not open_sell_orders_exist:
-            if beenden.lower() == "ja":
-                logs.append("Beenden=ja → Keine neue Base Order")
-                return jsonify({"status": "no_base_order_opened", "botname": botname, "reason": "beenden=ja", "logs": logs})
-            else:
+            self.logs.append(f"Fehler beim Schreiben von aktueller_Bot in Firebase: {e}")
+            self.telegram(f"Fehler beim Schreiben von aktueller_Bot in Firebase {self.botname}: {e}")
 
-                
-                status_fuer_alle[botname] = "OK"
-                alarm_counter[botname] = -1
-                if botname in saved_usdt_amounts:
-                    del saved_usdt_amounts[botname]
-                    logs.append("Ordergröße im Cache gelöscht (erste Order)")
-                if available_usdt is not None and pyramiding > 0:
-
-
-                    balance_response = get_futures_balance(api_key, secret_key)
-                    
-                    balance_data = balance_response.get("data", {}).get("balance", {})
-                    
-                    available_margin = float(balance_data.get("availableMargin", 0))
-                    position_margin = float(balance_data.get("usedMargin", 0))
-                    
-                    account_size = available_margin + position_margin
-
-                    # === BO-Faktor abhängig von MA bestimmen (NUR Baseorder) ===
-                    if bot_nr in ma_Wert:
-                        ma_aktiv = ma_Wert.get(bot_nr, 0)
-                        logs.append(f"MA aus RAM gelesen: {ma_aktiv} (bot_nr={bot_nr})")
-                    else:
-                        ma_aktiv = firebase_lese_ma_wert(bot_nr, firebase_secret)
-                        logs.append(f"MA aus Firebase gelesen: {ma_aktiv} (bot_nr={bot_nr})")
-
-                    position_side = str(position_side).strip().upper()
-                    bot_nr = int(bot_nr)
-                    
-                    if ma_aktiv == 1:
-                        bo_factor = bo_factor2
-                    
-                        # ✅ nur wenn zuvor ein SL passiert ist -> das ist wirklich der Recovery-Trade
-                        if recovery_pending.get(bot_nr) is True:
-                            recovery_trade[(bot_nr, position_side)] = "ja"
-                            recovery_pending.pop(bot_nr, None)
-                            logs.append(f"Recovery aktiviert für {(bot_nr, position_side)}")
-                            logs.append(f"bo_factor2 verwendet (MA=1): {bo_factor2}")
-                        else:
-                            # optional: verhindert falsche Recovery-Markierung
-                            logs.append("MA=1 aber kein recovery_pending -> Recovery NICHT markiert")
-                    
-                    else:
-                        bo_factor = bo_factor
-                        logs.append(f"bo_factor verwendet (MA=0): {bo_factor}")
-
-
-                    
-
-                    firebase_setze_ma_wert(bot_nr, 0, firebase_secret)
-                    ma_Wert[bot_nr] = 0
-
-                    logs.append(f"RAW balance response: {balance_response}")
-                    logs.append(f"Accountgrösse: {account_size}")
-                    logs.append(f"Verfügbare Marge: {available_margin}")
-                    logs.append(f"Position Marge: {position_margin}")
-                    
-                    
-                    #usdt_amount = max((account_size - sicherheit) * bo_factor, 0)   #usdt_amount = max(((available_usdt - sicherheit) * bo_factor), 0)
-                    margin_budget = max((account_size - sicherheit) * bo_factor, 0)   # das ist jetzt Margin
-                    usdt_amount   = margin_budget * leverageB                     # das ist Positionswert
-                    saved_usdt_amounts[botname] = usdt_amount
-                    
-
-                    saved_usdt_amounts[botname] = usdt_amount
-                    logs.append(f"Erste Ordergröße berechnet: {usdt_amount}")
-        else:
-            # Folgeorders: multiplizieren mit usdt_factor
-            saved_usdt_amount = saved_usdt_amounts.get(botname, 0)
-            if saved_usdt_amount and saved_usdt_amount > 0:
-                usdt_amount = saved_usdt_amount * usdt_factor
-                saved_usdt_amounts[botname] = usdt_amount
-                logs.append(f"Nächste Ordergröße mit Faktor {usdt_factor} berechnet: {usdt_amount}")
-            else:
-                # Fallback Firebase
-                try:
-                    usdt_amount = SHORT_firebase_lese_ordergroesse(botname, firebase_secret) or 0
-                    if usdt_amount > 0:
-                        saved_usdt_amounts[botname] = usdt_amount * usdt_factor
-                        usdt_amount = saved_usdt_amounts[botname]
-                        logs.append(f"Ordergröße aus Firebase verwendet und skaliert: {usdt_amount}")
-                        SHORT_sende_telegram_nachricht(botname, f"ℹ️ Ordergröße aus Firebase verwendet bei Bot: {botname}")
-                    else:
-                        logs.append("Keine Ordergröße gefunden (Firebase fallback)")
-                except Exception as e:
-                    status_fuer_alle[botname] = "Fehler"
-                    logs.append(f"Fehler beim Lesen der Ordergröße aus Firebase: {e}")
-                    SHORT_sende_telegram_nachricht(botname, f"❌ Fehler beim Lesen der Ordergröße aus Firebase {botname}: {e}")
-    
-        # 4. Market-Order platzieren (SHORT open)
-        order_response = None
+        now = datetime.now(timezone.utc)
+        bot_state.setze_base_order_time(self.botname, now)
+        self.base_time = now
+        self.logs.append(f"Base-Order Zeitpunkt gespeichert: {now}")
         try:
-            logs.append(f"Plaziere Market-Order (SHORT) mit {usdt_amount} USDT für {symbol}...")
-            order_response = SHORT_place_market_order(api_key, secret_key, symbol, float(usdt_amount), "SHORT")
-            alarm_counter[botname] = alarm_counter.get(botname, -1) + 1
-            logs.append(SHORT_firebase_speichere_ordergroesse(botname, usdt_amount, firebase_secret))
-            time.sleep(1.5)
-            logs.append(f"Market-Order Antwort: {order_response}")
-            if not order_response or order_response.get("code") != 0:
-                status_fuer_alle[botname] = "Fehler"
-                logs.append("Marketorder konnte nicht gesetzt werden.")
-                SHORT_sende_telegram_nachricht(botname, f"❌❌❌ Marketorder konnte nicht gesetzt werden für Bot: {botname}")
+            self.logs.append(firebase_speichere_base_order_time(self.botname, now, self.firebase_secret))
         except Exception as e:
-            logs.append(f"Fehler bei Marketorder: {e}")
-            status_fuer_alle[botname] = "Fehler"
-            SHORT_sende_telegram_nachricht(botname, f"❌❌❌ Marketorder konnte nicht gesetzt werden für Bot: {botname}")
-    
-        # 5. Positionsgröße & liq price
-        try:
-            sell_quantity, positions_raw, liquidation_price = SHORT_get_current_position(api_key, secret_key, symbol, "SHORT", logs)
-            if sell_quantity == 0:
-                executed_qty_str = order_response.get("data", {}).get("order", {}).get("executedQty") if order_response else None
-                if executed_qty_str:
-                    sell_quantity = float(executed_qty_str)
-                    logs.append(f"[Market Order] Ausgeführte Menge aus order_response genutzt: {sell_quantity}")
-    
-            if liquidation_price:
-                # Stop-Loss ist 3% über Liquidationspreis per Vorgabe (short -> SL > entry)
-                stop_loss_price = round(liquidation_price * (1 - sl / 100), 6)
-                logs.append(f"Stop-Loss-Preis basierend auf Liquidationspreis {liquidation_price}: {stop_loss_price}")
-            else:
-                stop_loss_price = None
-                logs.append("Liquidationspreis nicht verfügbar.")
-                SHORT_sende_telegram_nachricht(botname, f"❌ Liquidationspreis nicht verfügbar für Bot: {botname}")
-        except Exception as e:
-            sell_quantity = 0
-            stop_loss_price = None
-            logs.append(f"Fehler bei Positions-/Liquidationsabfrage: {e}")
-            SHORT_sende_telegram_nachricht(botname, f"❌ Fehler bei Positions-/Liquidationsabfrage {botname}: {e}")
-    
-        # 6. Kaufpreise ggf. löschen (bei neuer BO)
-        if firebase_secret and not open_sell_orders_exist:
+            self.logs.append(f"Fehler beim Speichern des Base-Order-Zeitpunkts in Firebase: {e}")
+
+    def _lade_base_time(self):
+        # 1. aus dem Bot-Zustand bzw. beim Testen aus base_time2 im Webhook
+        if not self.base_time2:
+            base_time = bot_state.hole_base_order_time(self.botname)
+        else:
             try:
-                logs.append(SHORT_firebase_loesche_kaufpreise(botname, firebase_secret))
+                base_time = datetime.fromisoformat(self.base_time2)
+                if base_time.tzinfo is None:
+                    base_time = base_time.replace(tzinfo=timezone.utc)
             except Exception as e:
-                logs.append(f"Fehler beim Löschen der Kaufpreise: {e}")
-                status_fuer_alle[botname] = "Fehler"
-    
-        # 7. Kaufpreis speichern in Firebase (falls vorhanden)
-        if firebase_secret and price_from_webhook:
+                self.logs.append(f"Fehler beim Umwandeln von base_time2: {e}")
+                base_time = None
+
+        # 2. sonst aus Firebase
+        if base_time is None and self.firebase_secret:
             try:
-                logs.append(SHORT_firebase_speichere_kaufpreis(botname, float(price_from_webhook), float(usdt_amount), firebase_secret))
+                base_time_str = firebase_lese_base_order_time(self.botname, self.firebase_secret)
+                if base_time_str:
+                    base_time = datetime.fromisoformat(base_time_str)
+                    if base_time.tzinfo is None:
+                        base_time = base_time.replace(tzinfo=timezone.utc)
+                    bot_state.setze_base_order_time(self.botname, base_time)
+                    self.logs.append(f"Base-Order Zeitpunkt aus Firebase geladen: {base_time}")
+                else:
+                    self.logs.append("Keine Base-Order-Zeit in Firebase gefunden.")
             except Exception as e:
-                logs.append(f"Fehler beim Speichern Kaufpreis: {e}")
-                status_fuer_alle[botname] = "Fehler"
-
+                self.logs.append(f"Fehler beim Laden des Base-Order-Zeitpunkts aus Firebase: {e}")
+                base_time = None
+        return base_time
 
+    def nachkauf_pruefen(self):
+        # Nur Folgeorders: Alarm ab x Nachkäufen und nach after_h Stunden / after_so Nachkäufen sell_percentage2
+        if not self.open_sell_orders_exist:
+            return None
 
-    
-        # 8. Durchschnittspreis (Firebase oder BingX fallback)
-        durchschnittspreis = None
-        kaufpreise = []
-        if status_fuer_alle.get(botname) == "Fehler":
-            logs.append("Status Fehler -> Fallback auf BingX avgPrice")
-            try:
-                for pos in positions_raw:
-                    if pos.get("symbol") == symbol and pos.get("positionSide", "").upper() == "SHORT":
-                        avg_price = float(pos.get("avgPrice", 0)) or float(pos.get("averagePrice", 0))
-                        if avg_price > 0:
-                            durchschnittspreis = round(avg_price * (1 - 0.002), 6)
-                            logs.append(f"[Fallback] Durchschnittspreis (BingX, adjust): {durchschnittspreis}")
-                            SHORT_sende_telegram_nachricht(botname, f"ℹ️ Durchschnittspreis von BINGX verwendet für Bot: {botname}")
-                            break
-            except Exception as e:
-                logs.append(f"[Fehler] avgPrice-Fallback fehlgeschlagen: {e}")
+        if bot_state.hole_status(self.botname) == "Fehler":
+            anzahl_nachkäufe = bot_state.hole_alarm(self.botname, -1)
         else:
-            try:
-                if firebase_secret:
-                    kaufpreise = SHORT_firebase_lese_kaufpreise(botname, firebase_secret)
-                    logs.append(f"[Firebase] Kaufpreise: {kaufpreise}")
-                    durchschnittspreis = SHORT_berechne_durchschnittspreis(kaufpreise or [])
-                    if durchschnittspreis:
-                        logs.append(f"[Firebase] Durchschnittspreis berechnet: {durchschnittspreis}")
-                    else:
-                        logs.append("[Firebase] Keine gültigen Kaufpreise gefunden.")
-                        status_fuer_alle[botname] = "Fehler"
-            except Exception as e:
-                status_fuer_alle[botname] = "Fehler"
-                logs.append(f"[Fehler] Firebase-Zugriff fehlgeschlagen: {e}")
-    
-            if not durchschnittspreis or durchschnittspreis == 0:
-                try:
-                    for pos in positions_raw:
-                        if pos.get("symbol") == symbol and pos.get("positionSide", "").upper() == "SHORT":
-                            avg_price = float(pos.get("avgPrice", 0)) or float(pos.get("averagePrice", 0))
-                            if avg_price > 0:
-                                durchschnittspreis = round(avg_price * (1 + 0.002), 6)
-                                logs.append(f"Fallback avgPrice verwendet: {durchschnittspreis}")
-                                SHORT_sende_telegram_nachricht(botname, f"ℹ️ Durchschnittspreis von BINGX verwendet für Bot: {botname}")
-                                status_fuer_alle[botname] = "Fehler"
-                                break
-                except Exception as e:
-                    logs.append(f"[Fehler] avgPrice-Fallback fehlgeschlagen: {e}")
-                    SHORT_sende_telegram_nachricht(botname, f"❌ Fallback avgPrice fehlgeschlagen für Bot: {botname}")
-            
-        # Alte TP (BUY LIMIT) Orders löschen (nur Limit-Buy, Stoploss bleibt)
-        try:
-            if isinstance(open_orders, dict) and open_orders.get("code") == 0:
-                for order in open_orders.get("data", {}).get("orders", []):
-                    # Nur BUY LIMIT für SHORT löschen, STOP_MARKET bleibt erhalten
-                    if order.get("positionSide") == "SHORT" and order.get("type") == "LIMIT" and order.get("side") == "BUY":
-                        cancel_resp = SHORT_cancel_order(api_key, secret_key, symbol, str(order.get("orderId")))
-                        logs.append(f"Gelöschte Limit-Buy-Order {order.get('orderId')}: {cancel_resp}")
-        except Exception as e:
-            logs.append(f"Fehler beim Löschen alter Limit-Buy-Orders: {e}")
-            SHORT_sende_telegram_nachricht(botname, f"❌ Fehler beim Löschen alter Limit-Buy-Orders {botname}: {e}")
+            anzahl_käufe = self.kaufsummen[2] if self.kaufsummen else 0
+            anzahl_nachkäufe = max(anzahl_käufe - 1, 0)
+        self.logs.append(f"Nachkäufe: {anzahl_nachkäufe} (Alarm ab {self.alarm_trigger})")
 
-        # Alte SL (BUY STOP_MARKET) Orders löschen – wichtig für sauberes Update
-        try:
-            if isinstance(open_orders, dict) and open_orders.get("code") == 0:
-                for order in open_orders.get("data", {}).get("orders", []):
-                    # Nur BUY STOP_MARKET (Stoploss) für SHORT löschen
-                    if order.get("positionSide") == "SHORT" and order.get("type") == "STOP_MARKET" and order.get("side") == "BUY":
-                        cancel_resp = SHORT_cancel_order(api_key, secret_key, symbol, str(order.get("orderId")))
-                        logs.append(f"Gelöschte SL Stop-Market-Order {order.get('orderId')}: {cancel_resp}")
-        except Exception as e:
-            logs.append(f"Fehler beim Löschen alter SL Orders: {e}")
-            SHORT_sende_telegram_nachricht(botname, f"❌ Fehler beim Löschen alter SL Orders {botname}: {e}")
-    
-        # Base Order Zeit speichern, falls neue BO
-        if not open_sell_orders_exist:           
-
-            aktueller_Bot[bot_nr] = botname
-            
-            logs.append(
-                f"Aktuelle Baseorder ausgeführt → "
-                f"bot_nr={bot_nr}, botname={botname}"
-            )
+        if anzahl_nachkäufe >= self.alarm_trigger:
+            telegram_result = self.telegram(f"{self.botname}:\nNachkäufe: {anzahl_nachkäufe}")
+            self.logs.append(f"Telegram gesendet: {telegram_result}")
 
-            
-            # 🔥 In Firebase unter aktueller_Bot speichern
-            try:
-                logs.append(firebase_set_aktueller_bot(bot_nr, botname, firebase_secret))
-            except Exception as e:
-                logs.append(f"Fehler beim Schreiben von aktueller_Bot in Firebase: {e}")
-                sende_telegram_nachricht(botname, f"Fehler beim Schreiben von aktueller_Bot in Firebase {botname}: {e}")
-            
-            now = datetime.now(timezone.utc)
-            base_order_times[botname] = now
-            logs.append(f"Base-Order Zeitpunkt gespeichert: {now}")
-            try:
-                logs.append(SHORT_firebase_speichere_base_order_time(botname, now, firebase_secret))
-            except Exception as e:
-                logs.append(f"Fehler beim Speichern base_order_time in Firebase: {e}")
-    
-        else:
-            # Falls Folgeorders: Load/Check base_time
-            if not base_time2:
-                base_time = base_order_times.get(botname)
-            else:
-                try:
-                    base_time = datetime.fromisoformat(base_time2)
-                    if base_time.tzinfo is None:
-                        base_time = base_time.replace(tzinfo=timezone.utc)
-                except Exception:
-                    base_time = None
-            if base_time is None and firebase_secret:
+        if self.base_time is None:
+            return None
+        delta = datetime.now(timezone.utc) - self.base_time   # immer UTC-aware
+        if delta.total_seconds() >= float(self.after_h) * 3600 or anzahl_nachkäufe >= float(self.after_so):
+            self.sell_percentage = self.sell_percentage2
+            if self.seite.avg_bei_zeitablauf:
                 try:
-                    base_time_str = None
-                    # read from firebase
-                    url = f"{FIREBASE_URL}/base_order_time/{botname}.json?auth={firebase_secret}"
-                    r = requests.get(url)
-                    if r.status_code == 200 and r.text:
-                        d = r.json()
-                        base_time_str = d.get("base_order_time") if isinstance(d, dict) else None
-                    if base_time_str:
-                        base_time = datetime.fromisoformat(base_time_str)
-                        if base_time.tzinfo is None:
-                            base_time = base_time.replace(tzinfo=timezone.utc)
-                        base_order_times[botname] = base_time
-                        logs.append(f"Base-Order Zeitpunkt aus Firebase geladen: {base_time}")
+                    avg_price = self._bingx_avg_price()
+                    if avg_price > 0:
+                        self.durchschnittspreis = round(avg_price, 6)
+                        self.logs.append(f"[Fallback] avgPrice von BingX verwendet: {self.durchschnittspreis}")
                 except Exception as e:
-                    logs.append(f"Fehler beim Laden base_time aus Firebase: {e}")
-            # prüfen after_h / after_so & ggf sell_percentage anpassen
-            alarm_trigger = int(data.get("RENDER", {}).get("alarm", 0))
-            if status_fuer_alle.get(botname) == "Fehler":
-                anzahl_nachkäufe = alarm_counter.get(botname, -1)
-            else:
-                anzahl_käufe = len(kaufpreise or [])
-                anzahl_nachkäufe = max(anzahl_käufe - 1, 0)
+                    self.logs.append(f"[Fehler] avgPrice von BingX fehlgeschlagen: {e}")
+            self.logs.append("Zeit überschritten oder Nachkaufgrenze erreicht → sell_percentage2 verwendet.")
 
+    def schutz_orders(self):
+        # 9.-11. Neue TP-Limit- und SL-Order setzen, danach die alten löschen
+        alte_orders = []
+        if isinstance(self.open_orders, dict) and self.open_orders.get("code") == 0:
+            alte_orders = [order.get("orderId") for order in self.open_orders.get("data", {}).get("orders", [])
+                           if self.seite.ist_schutz_order(order)]
 
-            if anzahl_nachkäufe >= alarm_trigger:
-                try:
-                    nachricht = f"{botname}:\nNachkäufe: {anzahl_nachkäufe}"
-                    telegram_result = SHORT_sende_telegram_nachricht(botname, nachricht)
-                    logs.append(f"Telegram gesendet: {telegram_result}")
-                except Exception as e:
-                    logs.append(f"Fehler beim Senden der Telegram-Nachricht: {e}")
-                    SHORT_sende_telegram_nachricht(botname, f"Fehler beim Senden der Telegram-Nachricht {botname}: {e}")
-
-            
-            if base_time is not None:
-                delta = datetime.now(timezone.utc) - base_time
-                if delta.total_seconds() >= int(after_h) * 3600 or anzahl_nachkäufe >= int(after_so):
-                    sell_percentage = sell_percentage2
-                    logs.append("Zeit oder Nachkaufgrenze überschritten -> sell_percentage reduziert (sell_percentage2 verwendet).")
-    
-        # 10. Take-Profit (TP) und Stop-Loss (SL) setzen (SHORT)
-        limit_order_response = None
         try:
-            position_size_now, _, _ = SHORT_get_current_position(api_key, secret_key, symbol, "SHORT", logs)
-            sell_quantity = min(sell_quantity if 'sell_quantity' in locals() else 0, position_size_now)
-            # Für Short: average (durchschnittspreis) sollte > 0
-            if durchschnittspreis and sell_percentage:
-                # sell_percentage for short means how much above/below? In your earlier code sell was for LONG.
-                # For SHORT TP should be under the avg price => TP_price = avg * (1 - sell_percentage/100)
-                limit_price = round(float(durchschnittspreis) * (1 - float(sell_percentage) / 100), 6)
-            elif durchschnittspreis and sell_percentage is None:
-                # fallback if sell_percentage not set: small profit target
-                limit_price = round(float(durchschnittspreis) * 0.99, 6)
-            else:
-                limit_price = 0
-    
-            if sell_quantity > 0 and limit_price > 0:
-                limit_order_response = SHORT_place_limit_buy_order(api_key, secret_key, symbol, sell_quantity, limit_price, "SHORT")
-                logs.append(f"TP Limit(BUY) Order gesetzt @ {limit_price}: {limit_order_response}")
-                # Prüfen ob Limit erfolgreich erstellt
-                if limit_order_response.get("code") != 0 or limit_order_response.get("data", {}).get("order", {}).get("status") not in (None, "NEW",): 
-                    # Abhängig von API kann die Struktur variieren; wir prüfen code != 0 als Fehler
-                    logs.append("TP Limit-Order möglicherweise nicht erfolgreich gesetzt.")
-                    SHORT_sende_telegram_nachricht(botname, f"⚠️ TP Limit-Order konnte nicht gesetzt werden!\nSymbol: {symbol}\nResponse: {limit_order_response}")
-            else:
-                logs.append("Ungültige Daten für TP (kein limit_price oder sell_quantity=0).")
+            position_size, _, _ = get_current_position(self.api_key, self.secret_key, self.symbol, self.seite.name, self.logs)
+            self.sell_quantity = min(self.sell_quantity, position_size)
+            self.limit_price = self.seite.tp_preis(self.durchschnittspreis, self.sell_percentage)
+
+            tp_setzen = self.sell_quantity > 0 and self.limit_price > 0
+            sl_setzen = self.sell_quantity > 0 and bool(self.stop_loss_price)
+            if not tp_setzen:
+                self.logs.append("Ungültige Daten, keine TP Limit-Order gesetzt (kein limit_price oder sell_quantity=0).")
+                self.telegram(f"❌ Ungültige Daten, keine Limit-Order gesetzt für Bot: {self.botname}")
+            if not sl_setzen:
+                self.logs.append("Keine SL gesetzt – fehlende Parameter (sell_quantity oder stop_loss_price).")
+                self.telegram(f"⚠️ Keine SL gesetzt (fehlende Daten) für Bot: {self.botname}")
+
+            self.limit_order_response, self.sl_order_resp, cancel_ergebnisse = ersetze_schutz_orders(
+                self.api_key, self.secret_key, self.symbol, self.seite.name, self.sell_quantity,
+                self.limit_price if tp_setzen else None, self.stop_loss_price if sl_setzen else None, alte_orders,
+                self.order_id("tp"), self.order_id("sl")
+            )
+            for order_id, ergebnis in cancel_ergebnisse.items():
+                self.logs.append(f"Gelöschte Order {order_id}: {ergebnis}")
+            fehlgeschlagen = [order_id for order_id, ergebnis in cancel_ergebnisse.items() if not ergebnis["ok"]]
+            if fehlgeschlagen:
+                self.telegram(f"⚠️ Alte Orders konnten nicht gelöscht werden für Bot {self.botname}: {fehlgeschlagen}")
+
+            for name, antwort, preis in (("TP Limit", self.limit_order_response, self.limit_price),
+                                         ("SL Stop-Market", self.sl_order_resp, self.stop_loss_price)):
+                if antwort is None:
+                    continue
+                self.logs.append(f"{name} Order ({self.seite.schliessen}) gesetzt @ {preis} (Basis Durchschnittspreis {self.durchschnittspreis})")
+                self.logs.debug("{} Antwort: {}", name, antwort)
+                if antwort.get("code") != 0 or antwort.get("data", {}).get("order", {}).get("status") not in (None, "NEW"):
+                    self.logs.append(f"{name}-Order konnte nicht gesetzt werden.")
+                    self.telegram(f"⚠️ {name}-Order konnte nicht gesetzt werden!\nSymbol: {self.symbol}\nResponse: {antwort}")
         except Exception as e:
-            logs.append(f"Fehler bei TP Limit-Order: {e}")
-            SHORT_sende_telegram_nachricht(botname, f"❌ Fehler bei TP Limit-Order für Bot: {botname}")
+            self.logs.append(f"Fehler beim Setzen von TP/SL: {e}")
+            self.telegram(f"❌ Fehler beim Setzen von TP/SL für Bot: {self.botname}: {e}")
+
+        if self.seite.tp_sl_pflicht:
+            # Wenn TP oder SL nicht gesetzt wurden → Fehler melden (Position bleibt offen)
+            tp_ok = ((self.limit_order_response and self.limit_order_response.get("code") == 0)
+                     or (self.limit_order_response is None and self.limit_price == 0))
+            sl_ok = (self.sl_order_resp and self.sl_order_resp.get("code") == 0) or self.open_sell_orders_exist
+            if self.sell_quantity > 0 and (not tp_ok or not sl_ok):
+                self.telegram(f"⚠️ TP oder SL konnte(n) nicht gesetzt werden. Symbol: {self.symbol}")
+                return jsonify({"error": True, "msg": "TP/SL konnte nicht gesetzt werden.", "logs": self.logs}), 500
+
+    def antwort(self):
+        antwort = {
+            "error": False,
+            "order_result": self.order_response,
+            "limit_order_result": self.limit_order_response,
+            "sl_order_result": self.sl_order_resp,
+            "symbol": self.symbol,
+            "botname": self.botname,
+            "position_side": self.seite.name,
+            "usdt_amount": self.usdt_amount,
+            "sell_quantity": self.sell_quantity,
+            "price_from_webhook": self.price_from_webhook,
+            "sell_percentage": self.sell_percentage,
+            "firebase_average_price": self.durchschnittspreis,
+            "usdt_balance_before_order": self.available_usdt,
+            "stop_loss_price": self.stop_loss_price,
+            "Botname": self.botname,
+            "zeiten": aktuelle_zeiten(),
+            "logs": self.logs
+        }
+        if self.logs.ausfuehrlich:
+            # Zustände aller Bots nur auf Anfrage, sonst wächst jede Antwort mit der Anzahl Bots
+            antwort["firebase_kaufsummen"] = self.kaufsummen
+            antwort["saved_usdt_amount"] = bot_state.alle_usdt_amounts()
+            antwort["status_fuer_alle"] = bot_state.alle_status()
+        return jsonify(antwort)
+
+
+def verarbeite_webhook(data):
+    with konten.benutzen((data.get("RENDER") or {}).get("api_key")):
+        return DcaLauf(data).ausfuehren()
 
 
-        
-    
-        # Stop Loss: BUY STOP_MARKET über entry
-        sl_order_resp = None
+@app.route('/webhook', methods=['POST'])
+def webhook():
+    # Nur prüfen und einreihen – TradingView bekommt sofort eine Antwort
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": True, "msg": "JSON-Body erforderlich"}), 400
+    if job_queue.geschlossen:
+        return jsonify({"error": True, "msg": "Server fährt herunter"}), 503
+
+    render = data.get("RENDER", {}) or {}
+    botname = render.get("botname")
+    if not botname:
+        return jsonify({"error": True, "msg": "botname ist erforderlich"}), 400
+    if not render.get("api_key") or not render.get("secret_key"):
+        return jsonify({"error": True, "msg": "api_key und secret_key sind erforderlich"}), 400
+    position_side = str(render.get("position_side") or render.get("positionSide") or "LONG").strip().upper()
+    if position_side not in SEITEN:
+        return jsonify({"error": True, "msg": f"Ungültige position_side: {position_side}"}), 400
+    render["position_side"] = position_side   # normalisiert an Job und Zähler weitergeben
+
+    firebase_secret = render.get("FIREBASE_SECRET")
+    if firebase_secret and bot_state.aus_snapshot:
+        # erster Alarm nach einem Neustart: Snapshot im Hintergrund mit Firebase abgleichen
+        io_executor.submit(gleiche_snapshot_ab, botname, render.get("bot_nr"), firebase_secret)
+
+    zaehler.erhoehen("webhooks", **webhook_labels(data))
+    if request.args.get("debug") in ("1", "true", "ja"):
+        data["debug"] = True
+    schluessel = webhook_schluessel(data)
+
+    def einreihen():
+        bei_ende = (lambda job: webhook_index.abschliessen(schluessel, job)) if schluessel else None
+        job = job_queue.einreihen(botname, data, bei_ende=bei_ende)
+        return job.job_id, {
+            "status": "queued",
+            "job_id": job.job_id,
+            "botname": botname,
+            "status_url": f"/jobs/{job.job_id}"
+        }
 
+    if schluessel is None:
+        neu, eintrag = True, WebhookEintrag(0.0, *einreihen())
+    else:
+        neu, eintrag = webhook_index.eintragen(schluessel, einreihen)
+    warten = request.args.get("wait") in ("1", "true", "ja")
+    if not neu:
+        # wiederholter Alarm: nicht nochmals ausführen, sondern mit der gespeicherten Antwort beantworten
+        job = job_queue.hole(eintrag.job_id)
+        if warten and job is not None:
+            job.fertig.wait()
+        if warten and eintrag.ergebnis is not None:
+            return jsonify(dict(eintrag.ergebnis, duplikat=True)), eintrag.http_status
+        return jsonify(dict(eintrag.antwort, duplikat=True)), 202
+
+    # ?wait=1 → auf das Ergebnis warten (zum Testen), sonst sofort 202
+    if warten:
+        job = job_queue.hole(eintrag.job_id)
+        if job is not None:
+            job.fertig.wait()
+            return jsonify(job.ergebnis if job.status == "done" else job.als_dict()), job.http_status
+
+    return jsonify(eintrag.antwort), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_queue.hole(job_id)
+    if job is None:
+        return jsonify({"error": True, "msg": "Job nicht gefunden"}), 404
+    return jsonify(job.als_dict())
+
+
+@app.route('/cache', methods=['GET'])
+def cache_status():
+    # Treffer/Fehlschläge des Firebase-Lese-Caches (Fehlschlag = Aufruf an Firebase)
+    return jsonify(firebase_cache.statistik())
+
+
+@app.route('/metrics', methods=['GET'])
+def metriken():
+    return Response(metriken_text(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+job_queue = BotJobQueue()
+
+
+### Betrieb
+# Produktion: gunicorn -c gunicorn.conf.py main:app (Worker, Threads und Timeouts dort). starten() wärmt beim
+# Start eines Workers Kontraktdaten und Preis-Stream vor; /ready meldet erst danach 200 und ab herunterfahren()
+# wieder 503. herunterfahren() nimmt keine Webhooks mehr an, lässt die eingereihten fertig laufen und überträgt
+# danach die offenen Telegram-Meldungen und Firebase-Schreibaufträge.
+
+_betrieb = {"bereit": False, "stoppt": False}
+_betrieb_lock = threading.Lock()
+
+
+def vorwaermen():
+    start = time.perf_counter()
+    kontrakte = kontrakt_cache.lade()
+    kontrakt_cache.starte_aktualisierung()
+    for symbol in VORLADEN_SYMBOLE:
+        markt_daten.abonnieren(symbol)
+    _betrieb["bereit"] = True
+    print(f"Vorgewärmt in {(time.perf_counter() - start) * 1000:.0f} ms: Kontraktdaten "
+          f"{'geladen' if kontrakte else 'nicht geladen (werden bei Bedarf nachgeladen)'}, "
+          f"Preis-Stream für {len(VORLADEN_SYMBOLE)} Symbole")
+
+
+def starten():
+    # Beim Import startet kein Hintergrund-Thread; hier bzw. beim ersten Gebrauch.
+    # Vorwärmen im Hintergrund, damit der Worker sofort Anfragen annimmt; /ready zeigt, wann er fertig ist
+    firebase_writer.starte()
+    threading.Thread(target=vorwaermen, name="vorwaermen", daemon=True).start()
+
+
+def herunterfahren(timeout=JOB_DRAIN_TIMEOUT):
+    with _betrieb_lock:
+        if _betrieb["stoppt"]:
+            return
+        _betrieb["stoppt"] = True
+    offen = job_queue.stop(timeout)
+    if offen:
+        print(f"Herunterfahren: {offen} Webhook-Jobs nach {timeout}s nicht fertig")
+    for name, stop in (("Telegram", telegram_versand.stop), ("Firebase", firebase_writer.stop),
+                       ("Marktdaten", markt_daten.stop), ("Konten", konten.stop)):
         try:
-            if sell_quantity > 0 and stop_loss_price:
-                sl_order_resp = SHORT_place_stoploss_buy_order(api_key, secret_key, symbol, sell_quantity, stop_loss_price, "SHORT")
-                logs.append(f"SL Stop-Market(BUY) Order gesetzt @ {stop_loss_price}: {sl_order_resp}")
-                if sl_order_resp.get("code") != 0 or sl_order_resp.get("data", {}).get("order", {}).get("status") not in (None, "NEW",):
-                    logs.append("SL Stop-Market konnte nicht gesetzt werden.")
-                    SHORT_sende_telegram_nachricht(botname, f"⚠️ SL Stop-Market-Order konnte nicht gesetzt werden!\nSymbol: {symbol}\nResponse: {sl_order_resp}")
-            else:
-                logs.append("Keine SL gesetzt – fehlende Parameter (sell_quantity oder stop_loss_price).")
-                SHORT_sende_telegram_nachricht(botname, f"⚠️ Keine SL gesetzt (fehlende Daten) für Bot: {botname}")
+            stop()
         except Exception as e:
-            logs.append(f"Fehler beim Setzen der SL-Order: {e}")
-            SHORT_sende_telegram_nachricht(botname, f"❌ Fehler beim Setzen der SL für Bot: {botname}: {e}")
-    
-        # Wenn TP oder SL nicht gesetzt wurden -> Position schließen & Telegram
-        tp_ok = (limit_order_response and limit_order_response.get("code") == 0) or (limit_order_response is None and limit_price == 0)
-        sl_ok = (sl_order_resp and sl_order_resp.get("code") == 0) or open_sell_orders_exist
-        # Defensive check: wenn neither properly set and we have a position -> close & notify
-        if sell_quantity > 0 and (not tp_ok or not sl_ok):
-            SHORT_sende_telegram_nachricht(botname, f"⚠️ TP oder SL konnte(n) nicht gesetzt werden. Symbol: {symbol}")
-            #close_resp = SHORT_close_all_positions(api_key, secret_key)
-            #logs.append(f"Positionen geschlossen weil TP/SL nicht gesetzt: {close_resp}")
-            return jsonify({
-                "error": True,
-                "msg": "TP/SL konnte nicht gesetzt werden.",
-                "logs": logs
-            }), 500
-    
-        # final response
-        return jsonify({
-            "error": False,
-            "order_result": order_response,
-            "limit_order_result": limit_order_response,
-            "sl_order_result": sl_order_resp,
-            "symbol": symbol,
-            "botname": botname,
-            "usdt_amount": usdt_amount,
-            "sell_quantity": sell_quantity if 'sell_quantity' in locals() else 0,
-            "price_from_webhook": price_from_webhook,
-            "sell_percentage": sell_percentage,
-            "firebase_average_price": durchschnittspreis,
-            "firebase_all_prices": kaufpreise,
-            "usdt_balance_before_order": available_usdt,
-            "stop_loss_price": stop_loss_price if 'stop_loss_price' in locals() else None,
-            "saved_usdt_amount": saved_usdt_amounts.get(botname),
-            "status_fuer_alle": status_fuer_alle.get(botname),
-            "Botname": botname,
-            "logs": logs
-        })
+            print(f"Herunterfahren: {name} konnte nicht beendet werden: {e}")
 
 
+# läuft vor den früher registrierten stop()-Funktionen, damit die Jobs zuerst fertig werden
+atexit.register(herunterfahren)
+
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    laufend, wartend = job_queue.auslastung()
+    bereit = _betrieb["bereit"] and not _betrieb["stoppt"]
+    return jsonify({
+        "bereit": bereit,
+        "stoppt": _betrieb["stoppt"],
+        "jobs": {"laufend": laufend, "wartend": wartend},
+        "firebase_journal_offen": firebase_writer.offen(),
+        "firebase_journal_verwaist": firebase_writer.verwaist(),
+    }), 200 if bereit else 503
 
-        
 
 if __name__ == "__main__":
-    # Achtung: debug=True in Produktion ausschalten
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    # Entwicklungsserver; in Produktion gunicorn (siehe gunicorn.conf.py)
+    starten()
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1", host="0.0.0.0", port=PORT, threaded=True)
         
         
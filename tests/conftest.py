@@ -0,0 +1,11 @@
+# Die Tests laufen ohne Netz: kein Zustand auf Platte, keine Streams, kein Firebase/Telegram.
+import os
+import sys
+
+os.environ.setdefault("STATE_DB", ":memory:")
+os.environ["MARKT_WS_URL"] = ""
+os.environ["USER_WS_URL"] = ""
+os.environ["FIREBASE_URL"] = ""
+os.environ["TELEGRAM_TOKEN"] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
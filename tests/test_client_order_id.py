@@ -0,0 +1,26 @@
+import main
+
+
+def test_gleicher_schritt_in_neuem_zyklus_hat_neue_id():
+    state = main.BotState(db_pfad="")
+    state.neuer_zyklus("Bot_A")
+    erster = state.hole_zyklus("Bot_A")
+    id_1 = main.client_order_id("Bot_A", "bo", "60000", erster)
+    assert main.client_order_id("Bot_A", "bo", "60000", state.hole_zyklus("Bot_A")) == id_1
+
+    state.reset_bot("Bot_A")
+    state.neuer_zyklus("Bot_A")
+    assert state.hole_zyklus("Bot_A") != erster
+    assert main.client_order_id("Bot_A", "bo", "60000", state.hole_zyklus("Bot_A")) != id_1
+
+
+def test_zyklus_wird_bei_bedarf_vergeben():
+    state = main.BotState(db_pfad="")
+    zyklus = state.hole_zyklus("Bot_A")
+    assert zyklus and state.hole_zyklus("Bot_A") == zyklus
+
+
+def test_id_format_fuer_bingx():
+    order_id = main.client_order_id("Bot_A", "so3", "vyn|60000", "abc")
+    assert len(order_id) <= 40 and order_id.isalnum()
+    assert order_id != main.client_order_id("Bot_B", "so3", "vyn|60000", "abc")
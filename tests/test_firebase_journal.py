@@ -0,0 +1,114 @@
+import time
+
+import pytest
+
+import main
+
+
+class Antwort:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+
+
+@pytest.fixture
+def firebase(monkeypatch):
+    # zeichnet die PATCH-Aufrufe auf; status enthält die nächsten Statuscodes (danach 200)
+    aufrufe = []
+    status = []
+
+    def patch(url, json=None, timeout=None):
+        aufrufe.append((url, json))
+        return Antwort(status.pop(0) if status else 200, "abgelehnt")
+
+    monkeypatch.setattr(main, "FIREBASE_URL", "http://firebase.test")
+    monkeypatch.setattr(main.firebase_session, "patch", patch)
+    return aufrufe, status
+
+
+def writer(db, **kwargs):
+    return main.FirebaseWriteBehind(db, intervall=0.01, **kwargs)
+
+
+def test_schreibzugriffe_werden_zu_einem_patch(tmp_path, firebase):
+    aufrufe, _ = firebase
+    w = writer(str(tmp_path / "j.sqlite3"))
+    w.schreiben("kaufpreise/Bot_A/-a", {"price": 1}, "geheim")
+    w.schreiben("status/Bot_A", "OK", "geheim")
+    w.schreiben("kaufpreise/Bot_A/-a/price", 2, "geheim")
+    w.flush()
+    assert aufrufe == [("http://firebase.test/.json?auth=geheim",
+                        {"kaufpreise/Bot_A/-a": {"price": 2}, "status/Bot_A": "OK"})]
+    assert w.offen() == 0
+    w.stop()
+
+
+def test_secret_steht_nicht_in_der_datei(tmp_path, firebase):
+    db = tmp_path / "j.sqlite3"
+    w = writer(str(db))
+    w._stop.set()   # nichts übertragen, der Auftrag bleibt im Journal
+    w.schreiben("status/Bot_A", "OK", "sehr-geheim")
+    w._db.close()
+    for datei in tmp_path.iterdir():
+        assert b"sehr-geheim" not in datei.read_bytes()
+
+
+def test_journal_wird_nach_neustart_mit_secret_gesendet(tmp_path, firebase):
+    aufrufe, _ = firebase
+    db = str(tmp_path / "j.sqlite3")
+    w = writer(db)
+    w._stop.set()
+    w.schreiben("status/Bot_A", "OK", "geheim")
+    w._db.close()
+
+    nach_neustart = writer(db)
+    assert (nach_neustart.offen(), nach_neustart.verwaist()) == (0, 1)
+    nach_neustart.flush()
+    assert aufrufe == []
+
+    nach_neustart.schreiben("status/Bot_B", "OK", "geheim")
+    nach_neustart.flush()
+    assert aufrufe == [("http://firebase.test/.json?auth=geheim", {"status/Bot_A": "OK", "status/Bot_B": "OK"})]
+    assert (nach_neustart.offen(), nach_neustart.verwaist()) == (0, 0)
+    nach_neustart.stop()
+
+
+def test_verwaiste_auftraege_laufen_nach_ttl_ab(tmp_path, firebase):
+    db = str(tmp_path / "j.sqlite3")
+    w = writer(db)
+    w._stop.set()
+    w.schreiben("status/Bot_A", "OK", "geheim")
+    w._db.close()
+
+    vorher = main.zaehler.stand("firebase_abgelehnt", grund="verwaist")
+    time.sleep(0.05)
+    nach_neustart = writer(db, ttl=0.01)
+    assert (nach_neustart.offen(), nach_neustart.verwaist(), nach_neustart.abgelehnt()) == (0, 0, 1)
+    assert main.zaehler.stand("firebase_abgelehnt", grund="verwaist") == vorher + 1
+
+
+def test_abgelehnter_patch_landet_in_firebase_abgelehnt(tmp_path, firebase):
+    _, status = firebase
+    status.append(401)
+    w = writer(str(tmp_path / "j.sqlite3"))
+    vorher = main.zaehler.stand("firebase_abgelehnt", grund="http_401")
+    w.schreiben("status/Bot_A", "OK", "falsch")
+    w.flush()
+    assert (w.offen(), w.abgelehnt()) == (0, 1)
+    assert main.zaehler.stand("firebase_abgelehnt", grund="http_401") == vorher + 1
+    pfad, grund = w._db.execute("SELECT pfad, grund FROM firebase_abgelehnt").fetchone()
+    assert (pfad, grund) == ("status/Bot_A", "http_401")
+    w.stop()
+
+
+def test_serverfehler_bleibt_im_journal(tmp_path, firebase):
+    aufrufe, status = firebase
+    status.append(503)
+    w = writer(str(tmp_path / "j.sqlite3"))
+    w._stop.set()
+    w.schreiben("status/Bot_A", "OK", "geheim")
+    with pytest.raises(Exception):
+        w.flush()
+    assert (w.offen(), w.abgelehnt()) == (1, 0)
+    w.flush()
+    assert w.offen() == 0 and len(aufrufe) == 2
@@ -0,0 +1,74 @@
+import threading
+
+from flask import jsonify
+
+import main
+
+
+def queue_mit_lauf(monkeypatch, lauf, **kwargs):
+    monkeypatch.setattr(main, "verarbeite_webhook", lauf)
+    return main.BotJobQueue(**kwargs)
+
+
+def test_jobs_eines_bots_laufen_nacheinander_in_reihenfolge(monkeypatch):
+    reihenfolge = []
+    gleichzeitig = {"jetzt": 0, "max": 0}
+    lock = threading.Lock()
+
+    def lauf(data):
+        with lock:
+            gleichzeitig["jetzt"] += 1
+            gleichzeitig["max"] = max(gleichzeitig["max"], gleichzeitig["jetzt"])
+        reihenfolge.append(data["n"])
+        with lock:
+            gleichzeitig["jetzt"] -= 1
+        return jsonify({"n": data["n"]})
+
+    queue = queue_mit_lauf(monkeypatch, lauf, worker=4)
+    jobs = [queue.einreihen("Bot_A", {"n": i}) for i in range(20)]
+    for job in jobs:
+        assert job.fertig.wait(5)
+    assert reihenfolge == list(range(20))
+    assert gleichzeitig["max"] == 1
+    assert all(job.status == "done" and job.ergebnis == {"n": i} for i, job in enumerate(jobs))
+
+
+def test_fehler_im_lauf_ergibt_status_error(monkeypatch):
+    def lauf(data):
+        raise ValueError("kaputt")
+
+    queue = queue_mit_lauf(monkeypatch, lauf)
+    job = queue.einreihen("Bot_A", {})
+    assert job.fertig.wait(5)
+    assert (job.status, job.http_status, job.fehler) == ("error", 500, "kaputt")
+
+
+def test_laufende_und_wartende_jobs_werden_nicht_verdraengt(monkeypatch):
+    tor = threading.Event()
+
+    def lauf(data):
+        tor.wait(5)
+        return jsonify({})
+
+    queue = queue_mit_lauf(monkeypatch, lauf, max_jobs=2)
+    jobs = [queue.einreihen("Bot_A", {"n": i}) for i in range(4)]
+    assert all(queue.hole(job.job_id) is job for job in jobs)
+
+    tor.set()
+    assert jobs[-1].fertig.wait(5)
+    neuer = queue.einreihen("Bot_A", {"n": 4})
+    assert neuer.fertig.wait(5)
+    # die ältesten fertigen fallen raus, bis wieder höchstens max_jobs bekannt sind
+    assert [queue.hole(job.job_id) is not None for job in jobs] == [False, False, False, True]
+    assert queue.hole(neuer.job_id) is neuer
+
+
+def test_stop_nimmt_keine_jobs_mehr_an(monkeypatch):
+    queue = queue_mit_lauf(monkeypatch, lambda data: jsonify({}))
+    assert queue.stop(timeout=1) == 0
+    try:
+        queue.einreihen("Bot_A", {})
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("einreihen nach stop() muss fehlschlagen")
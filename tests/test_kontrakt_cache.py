@@ -0,0 +1,42 @@
+import pytest
+
+import main
+
+
+class Antwort:
+    def __init__(self, daten):
+        self._daten = daten
+
+    def json(self):
+        return self._daten
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    kontrakte = [{"symbol": "BTC-USDT", "pricePrecision": 1, "quantityPrecision": 4,
+                  "tradeMinQuantity": "0.0001", "tradeMinUSDT": "2"}]
+    monkeypatch.setattr(main.bingx_client, "get", lambda url, **kwargs: Antwort({"code": 0, "data": kontrakte}))
+    cache = main.KontraktCache()
+    assert cache.lade()
+    return cache
+
+
+def test_menge_wird_abgerundet(cache):
+    assert cache.menge("BTC-USDT", 0.123456) == 0.1234
+    assert cache.menge("BTC-USDT", 0.99999) == 0.9999
+
+
+def test_preis_wird_kaufmaennisch_gerundet(cache):
+    assert cache.preis("BTC-USDT", 60000.25) == 60000.3
+    assert cache.preis("BTC-USDT", 60000.24) == 60000.2
+
+
+def test_unbekanntes_symbol_wie_bisher_sechs_stellen(cache):
+    assert cache.menge("ETH-USDT", 0.12345678) == 0.123457
+    assert cache.pruefe_minimum("ETH-USDT", 0.0, 1) is None
+
+
+def test_mindestmenge_und_mindestwert(cache):
+    assert "Mindestmenge" in cache.pruefe_minimum("BTC-USDT", 0.00005, 60000)
+    assert "Minimum" in cache.pruefe_minimum("BTC-USDT", 0.0001, 10000)
+    assert cache.pruefe_minimum("BTC-USDT", 0.001, 60000) is None
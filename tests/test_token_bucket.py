@@ -0,0 +1,45 @@
+import threading
+import time
+
+import main
+
+
+def test_burst_sofort_danach_nach_rate():
+    bucket = main.TokenBucket(rate=20, burst=2)
+    assert bucket.nehmen() < 0.01
+    assert bucket.nehmen() < 0.01
+    start = time.monotonic()
+    bucket.nehmen()
+    assert 0.03 <= time.monotonic() - start < 0.2
+
+
+def test_sperren_haelt_bis_ablauf_zurueck():
+    bucket = main.TokenBucket(rate=100)
+    bucket.sperren(0.1)
+    assert bucket.nehmen() >= 0.09
+
+
+def test_vorrang_kommt_vor_wartenden_abfragen():
+    bucket = main.TokenBucket(rate=10, burst=1)
+    bucket.nehmen()
+    reihenfolge = []
+
+    def nehmen(name, vorrang):
+        bucket.nehmen(vorrang)
+        reihenfolge.append(name)
+
+    abfrage = threading.Thread(target=nehmen, args=("abfrage", False))
+    abfrage.start()
+    time.sleep(0.01)
+    order = threading.Thread(target=nehmen, args=("order", True))
+    order.start()
+    abfrage.join(2)
+    order.join(2)
+    assert reihenfolge == ["order", "abfrage"]
+
+
+def test_rate_limiter_ohne_limits_wartet_nie():
+    limiter = main.RateLimiter(limits={})
+    for _ in range(100):
+        limiter.nehmen("handel")
+    assert limiter.gewartet == 0
@@ -0,0 +1,71 @@
+import main
+
+
+def alarm(time="1700000000", price=60000, vyn=None):
+    render = {"botname": "Bot_A", "price": price}
+    if time is not None:
+        render["time"] = time
+    return {"vyn": vyn or {"action": "increase"}, "RENDER": render}
+
+
+def test_ohne_balkenzeit_kein_schluessel():
+    assert main.webhook_schluessel(alarm(time=None)) is None
+    assert main.webhook_schluessel(alarm(time="")) is None
+    assert main.webhook_schluessel(alarm(time="{{time}}")) is None
+
+
+def test_schluessel_haengt_an_balkenzeit_preis_und_vyn():
+    schluessel = main.webhook_schluessel(alarm())
+    assert schluessel == main.webhook_schluessel(alarm())
+    assert schluessel != main.webhook_schluessel(alarm(time="1700000060"))
+    assert schluessel != main.webhook_schluessel(alarm(price=60001))
+    assert schluessel != main.webhook_schluessel(alarm(vyn={"action": "close"}))
+
+
+def einreiher(job_ids):
+    def einreihen():
+        job_id = f"job{len(job_ids)}"
+        job_ids.append(job_id)
+        return job_id, {"status": "queued", "job_id": job_id}
+    return einreihen
+
+
+class FertigerJob:
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.status = "done"
+        self.ergebnis = {"error": False}
+        self.http_status = 200
+
+
+def test_wiederholung_wird_nicht_erneut_eingereiht():
+    index = main.WebhookIndex(ttl=60, db_pfad="")
+    job_ids = []
+    neu, eintrag = index.eintragen("k", einreiher(job_ids))
+    assert neu and eintrag.job_id == "job0"
+    neu, wieder = index.eintragen("k", einreiher(job_ids))
+    assert not neu and wieder is eintrag
+    assert job_ids == ["job0"] and index.duplikate == 1
+
+    index.abschliessen("k", FertigerJob("job0"))
+    assert (eintrag.ergebnis, eintrag.http_status) == ({"error": False}, 200)
+
+
+def test_abgelaufener_eintrag_wird_neu_eingereiht():
+    index = main.WebhookIndex(ttl=-1, db_pfad="")
+    job_ids = []
+    index.eintragen("k", einreiher(job_ids))
+    neu, _ = index.eintragen("k", einreiher(job_ids))
+    assert neu and job_ids == ["job0", "job1"]
+
+
+def test_index_uebersteht_neustart(tmp_path):
+    db = str(tmp_path / "state.sqlite3")
+    index = main.WebhookIndex(ttl=60, db_pfad=db)
+    index.eintragen("k", einreiher([]))
+    index.abschliessen("k", FertigerJob("job0"))
+
+    nach_neustart = main.WebhookIndex(ttl=60, db_pfad=db)
+    neu, eintrag = nach_neustart.eintragen("k", einreiher([]))
+    assert not neu
+    assert (eintrag.job_id, eintrag.ergebnis) == ("job0", {"error": False})